@@ -34,4 +34,18 @@ must_any \
   'Revealed type is "llm_lab.clients.openai.OpenAIClient | llm_lab.clients.ollama.OllamaClient"' \
   'Revealed type is "llm_lab.clients.ollama.OllamaClient | llm_lab.clients.openai.OpenAIClient"'
 
+must_any \
+  'Revealed type is "llm_lab.clients.openai_client.AsyncOpenAIClient"' \
+  'Revealed type is "llm_lab.clients.openai.AsyncOpenAIClient"'
+
+must_any \
+  'Revealed type is "llm_lab.clients.ollama_client.AsyncOllamaClient"' \
+  'Revealed type is "llm_lab.clients.ollama.AsyncOllamaClient"'
+
+must_any \
+  'Revealed type is "llm_lab.clients.openai_client.AsyncOpenAIClient | llm_lab.clients.ollama_client.AsyncOllamaClient"' \
+  'Revealed type is "llm_lab.clients.ollama_client.AsyncOllamaClient | llm_lab.clients.openai_client.AsyncOpenAIClient"' \
+  'Revealed type is "llm_lab.clients.openai.AsyncOpenAIClient | llm_lab.clients.ollama.AsyncOllamaClient"' \
+  'Revealed type is "llm_lab.clients.ollama.AsyncOllamaClient | llm_lab.clients.openai.AsyncOpenAIClient"'
+
 echo "mypy-smoke: OK"
@@ -2,8 +2,20 @@
 
 from __future__ import annotations
 
-from .contracts import LLMClient
+from .contracts import (
+    AsyncEmbeddingClient,
+    AsyncLLMClient,
+    AsyncStreamingLLMClient,
+    EmbeddingClient,
+    LLMClient,
+    StreamingLLMClient,
+)
 
 __all__ = [
     "LLMClient",
+    "AsyncLLMClient",
+    "StreamingLLMClient",
+    "AsyncStreamingLLMClient",
+    "EmbeddingClient",
+    "AsyncEmbeddingClient",
 ]
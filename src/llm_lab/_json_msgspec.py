@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+import msgspec
+
+from .json_codec import ResponseBody, StreamEvent, Usage, _StdlibCodec
+
+# Only the Responses API fields the clients read; msgspec skips the rest of the
+# document (reasoning items, tools, metadata) without materializing it.
+
+
+class Content(msgspec.Struct):
+    type: str | None = None
+    text: str | None = None
+
+
+class Item(msgspec.Struct):
+    type: str | None = None
+    role: str | None = None
+    content: list[Content] | None = None
+
+
+class Details(msgspec.Struct):
+    cached_tokens: int | None = None
+
+
+class ResponseUsage(msgspec.Struct):
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    input_tokens_details: Details | None = None
+
+
+class Response(msgspec.Struct):
+    output: list[Item] | None = None
+    usage: ResponseUsage | None = None
+    error: Any = None
+
+
+class Event(msgspec.Struct):
+    type: str | None = None
+    delta: str | None = None
+    response: Response | None = None
+    error: Any = None
+    message: str | None = None
+
+
+class MsgspecCodec(_StdlibCodec):
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        try:  # orjson encodes non-ASCII text several times faster when both are installed
+            import orjson
+
+            self._encode: Callable[[Any], bytes] = orjson.dumps
+        except ImportError:
+            self._encode = msgspec.json.Encoder().encode
+        self._decode = msgspec.json.Decoder().decode
+        self._response = msgspec.json.Decoder(Response).decode
+        self._event = msgspec.json.Decoder(Event).decode
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encode(obj)
+
+    def loads(self, data: bytes | str) -> Any:
+        return self._decode(data)
+
+    def response(self, data: bytes | str) -> ResponseBody:
+        try:
+            return _body(self._response(data))
+        except msgspec.ValidationError:  # off-spec shape: take the lenient path
+            return super().response(data)
+
+    def event(self, data: bytes | str) -> StreamEvent:
+        try:
+            e = self._event(data)
+        except msgspec.ValidationError:
+            return super().event(data)
+        response = _body(e.response) if e.response is not None else None
+        return StreamEvent(e.type, e.delta, response, e.error, e.message)
+
+
+def _body(r: Response) -> ResponseBody:
+    texts = None
+    if r.output is not None:
+        texts = [
+            c.text
+            for item in r.output
+            if item.type == "message" and item.role == "assistant" and item.content
+            for c in item.content
+            if c.type == "output_text" and c.text is not None
+        ]
+    usage = None
+    if (u := r.usage) is not None:
+        cached = u.input_tokens_details.cached_tokens if u.input_tokens_details else None
+        usage = Usage(u.input_tokens, u.output_tokens, cached)
+    return ResponseBody(texts, usage, r.error)
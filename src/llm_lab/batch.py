@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import itertools
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from .contracts import LLMClient
+from .prefix import prefix_order
+from .types import Message
+
+BatchOrder = Literal["input", "completion"]
+
+
+@dataclass(frozen=True, slots=True)
+class BatchItem:
+    line: int
+    id: Any = None
+    messages: list[Message] | None = None
+    error: str | None = None  # set when the input line itself was invalid
+
+
+@dataclass(frozen=True, slots=True)
+class BatchResult:
+    line: int
+    id: Any
+    output: str | None
+    error: str | None
+    elapsed_s: float
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "line": self.line,
+            "id": self.id,
+            "output": self.output,
+            "error": self.error,
+            "elapsed_s": round(self.elapsed_s, 6),
+        }
+
+
+def run_batch(
+    client: LLMClient,
+    items: Iterable[BatchItem],
+    *,
+    concurrency: int = 4,
+    order: BatchOrder = "input",
+    prefix_window: int = 0,
+) -> Iterator[BatchResult]:
+    """Generate for every item over one shared client with a bounded worker pool.
+
+    `items` is consumed lazily: at most `2 * concurrency` requests are queued or
+    running at any time. Failures are reported per item and never stop the run.
+
+    With `prefix_window` > 1, items are read that many at a time and each group is
+    sent grouped by shared message prefix (see prefix_order), so conversations with
+    the same header and history go out back-to-back while the backend still has
+    that prefix cached; up to twice the window is then held in memory. Results
+    still come back in input order with `order="input"`.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+
+    window = max(2 * concurrency, prefix_window)
+    group_size = max(1, prefix_window)
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm-lab-batch")
+    pending: deque[Future[BatchResult]] = deque()
+    it = iter(items)
+    try:
+        while group := list(itertools.islice(it, group_size)):
+            futures: list[Future[BatchResult] | None] = [None] * len(group)
+            for i in prefix_order([item.messages for item in group]) if len(group) > 1 else [0]:
+                futures[i] = pool.submit(_run_one, client, group[i])
+            pending.extend(f for f in futures if f is not None)
+            if len(pending) >= window:
+                yield from _drain(pending, order, keep=window - 1)
+        yield from _drain(pending, order, keep=0)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _drain(
+    pending: deque[Future[BatchResult]],
+    order: BatchOrder,
+    *,
+    keep: int,
+) -> Iterator[BatchResult]:
+    while len(pending) > keep:
+        if order == "input":
+            yield pending.popleft().result()
+            continue
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in [f for f in pending if f in done]:
+            pending.remove(fut)
+            yield fut.result()
+
+
+def _run_one(client: LLMClient, item: BatchItem) -> BatchResult:
+    if item.error is not None or item.messages is None:
+        return BatchResult(item.line, item.id, None, item.error or "no messages", 0.0)
+
+    t0 = time.perf_counter()
+    try:
+        output = client.generate(item.messages)
+    except Exception as e:
+        return BatchResult(
+            item.line, item.id, None, f"{type(e).__name__}: {e}", time.perf_counter() - t0
+        )
+    return BatchResult(item.line, item.id, output, None, time.perf_counter() - t0)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import math
+import platform
+import time
+import tracemalloc
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .clients.pool import HttpPool
+from .contracts import StreamingLLMClient
+from .factory import LLMFactory
+from .fake_upstream import FakeUpstream, FakeUpstreamConfig
+from .json_codec import JsonBackend, available_backends, get_codec
+from .settings import Settings
+from .types import Message, Provider
+
+BENCH_MESSAGES: list[Message] = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "Benchmark prompt. " * 16},
+]
+
+
+@dataclass(frozen=True, slots=True)
+class BenchConfig:
+    providers: tuple[Provider, ...] = ("ollama", "openai")
+    concurrency: tuple[int, ...] = (1, 4, 16)
+    requests: int = 200
+    stream: bool = True
+    alloc_requests: int = 20  # traced separately: tracemalloc would skew latencies
+    upstream: FakeUpstreamConfig = field(default_factory=FakeUpstreamConfig)
+
+
+@dataclass(frozen=True, slots=True)
+class _Sample:
+    ok: bool
+    latency_s: float
+    ttft_s: float | None
+
+
+def percentile(samples: Sequence[float], q: float) -> float | None:
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples: Sequence[float]) -> dict[str, float | None]:
+    return {
+        "mean": sum(samples) / len(samples) if samples else None,
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+
+
+def run_bench(config: BenchConfig | None = None) -> dict[str, Any]:
+    """Drive the real clients against a local FakeUpstream; JSON-ready report."""
+    cfg = config or BenchConfig()
+    results: list[dict[str, Any]] = []
+    with FakeUpstream(cfg.upstream) as upstream:
+        for provider in cfg.providers:
+            for concurrency in cfg.concurrency:
+                with HttpPool() as pool:
+                    client = _client(provider, upstream.url, pool)
+                    _call(client, cfg.stream)  # warm the connection pool
+                    results.append(_run_level(client, provider, concurrency, cfg))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": asdict(cfg),
+        },
+        "results": results,
+    }
+
+
+def _client(provider: Provider, url: str, pool: HttpPool) -> StreamingLLMClient:
+    s = Settings(
+        ollama_host=url,
+        ollama_model="fake",
+        openai_base_url=url,
+        openai_api_key="bench",
+        openai_model="fake",
+        rate_limits={},
+    )
+    return LLMFactory.create(provider, settings=s, pool=pool)
+
+
+def _run_level(
+    client: StreamingLLMClient,
+    provider: Provider,
+    concurrency: int,
+    cfg: BenchConfig,
+) -> dict[str, Any]:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        samples = list(ex.map(lambda _: _call(client, cfg.stream), range(cfg.requests)))
+    wall_s = time.perf_counter() - t0
+
+    ok = [x for x in samples if x.ok]
+    return {
+        "provider": provider,
+        "concurrency": concurrency,
+        "stream": cfg.stream,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_s": wall_s,
+        "throughput_rps": len(ok) / wall_s if wall_s else None,
+        "latency_s": summarize([x.latency_s for x in ok]),
+        "ttft_s": summarize([x.ttft_s for x in ok if x.ttft_s is not None]),
+        "allocations": _allocations(client, cfg),
+    }
+
+
+def _call(client: StreamingLLMClient, stream: bool) -> _Sample:
+    t0 = time.perf_counter()
+    ttft: float | None = None
+    try:
+        if stream:
+            for _ in client.stream(BENCH_MESSAGES):
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+        else:
+            client.generate(BENCH_MESSAGES)
+    except Exception:
+        return _Sample(False, time.perf_counter() - t0, None)
+    return _Sample(True, time.perf_counter() - t0, ttft)
+
+
+def _allocations(client: StreamingLLMClient, cfg: BenchConfig) -> dict[str, float] | None:
+    # Sequential traced calls: peak = extra memory one request needs on top of the
+    # baseline; retained = growth left behind per request (leaks, unbounded caches).
+    if cfg.alloc_requests <= 0:
+        return None
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(cfg.alloc_requests):
+            _call(client, cfg.stream)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib": (peak - baseline) / 1024,
+        "retained_kib_per_request": (current - baseline) / cfg.alloc_requests / 1024,
+    }
+
+
+def run_json_bench(
+    *,
+    turns: int = 32,
+    chars_per_turn: int = 2000,
+    events: int = 256,
+    rounds: int = 200,
+) -> dict[str, Any]:
+    """Per-operation cost of every installed JSON backend on OpenAI-shaped payloads.
+
+    Encodes a `turns`-message request, decodes a completed Responses body (with
+    the reasoning item, tool list and instructions a real one carries) into the
+    fields the client reads, and decodes `events` SSE delta payloads. Best of
+    three runs of `rounds` iterations; speedups are relative to stdlib json.
+    """
+    request = {
+        "model": "bench",
+        "input": [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": _filler(i, chars_per_turn)}
+            for i in range(turns)
+        ],
+        "stream": True,
+    }
+    std = get_codec("json")
+    body = std.dumps(_bench_response(chars_per_turn))
+    deltas = [
+        std.dumps({"type": "response.output_text.delta", "delta": f"t{i} "}).decode()
+        for i in range(events)
+    ]
+
+    results = [_codec_row(name, request, body, deltas, rounds) for name in available_backends()]
+    base = results[-1]  # stdlib json is always available and always last
+    for r in results:
+        r["speedup"] = {
+            k.removesuffix("_us"): round(base[k] / r[k], 2) if r[k] else None
+            for k in ("encode_us", "decode_response_us", "decode_events_us")
+        }
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "request_bytes": len(std.dumps(request)),
+            "response_bytes": len(body),
+            "events": events,
+            "rounds": rounds,
+        },
+        "results": results,
+    }
+
+
+def _codec_row(
+    name: JsonBackend, request: dict[str, Any], body: bytes, deltas: list[str], rounds: int
+) -> dict[str, Any]:
+    codec = get_codec(name)
+    assert codec.response(body).texts == get_codec("json").response(body).texts
+    return {
+        "backend": name,
+        "encode_us": _best_us(lambda: codec.dumps(request), rounds),
+        "decode_response_us": _best_us(lambda: codec.response(body), rounds),
+        "decode_events_us": _best_us(lambda: [codec.event(d) for d in deltas], rounds),
+    }
+
+
+def _filler(seed: int, chars: int) -> str:
+    words = ("latency", "throughput", "кэш", "token", "prefix", "budget", "queue", "slot")
+    out: list[str] = []
+    n = 0
+    while n < chars:
+        w = words[(seed + len(out)) % len(words)]
+        out.append(w)
+        n += len(w) + 1
+    return " ".join(out)
+
+
+def _bench_response(chars: int) -> dict[str, Any]:
+    tool = {
+        "type": "function",
+        "name": "lookup",
+        "description": _filler(1, 200),
+        "parameters": {"type": "object", "properties": {"q": {"type": "string"}}},
+    }
+    return {
+        "id": "resp_bench",
+        "object": "response",
+        "status": "completed",
+        "instructions": _filler(2, chars),
+        "tools": [tool] * 16,
+        "metadata": {},
+        "output": [
+            {
+                "type": "reasoning",
+                "id": "rs_1",
+                "summary": [{"type": "summary_text", "text": _filler(3, chars)}],
+                "encrypted_content": "A" * (4 * chars),
+            },
+            {
+                "type": "message",
+                "id": "msg_1",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": _filler(4, chars), "annotations": []}],
+            },
+        ],
+        "usage": {
+            "input_tokens": 9000,
+            "input_tokens_details": {"cached_tokens": 8192},
+            "output_tokens": 700,
+            "total_tokens": 9700,
+        },
+    }
+
+
+def _best_us(fn: Callable[[], object], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / max(rounds, 1) * 1e6
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .contracts import AsyncLLMClient, LLMClient, iter_stream
+from .observe import Observer, cache_hit_event, emit
+from .types import Message
+
+if TYPE_CHECKING:
+    from .settings import Settings
+
+
+def cache_key(namespace: Mapping[str, Any], messages: list[Message]) -> str:
+    """Stable sha256 over (provider, model, options, normalized messages)."""
+    payload = json.dumps(
+        {"ns": namespace, "messages": [[m["role"], m["content"]] for m in messages]},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def client_namespace(
+    client: LLMClient | AsyncLLMClient, provider: str | None = None
+) -> dict[str, Any]:
+    """Everything about `client` that changes the answer for the same messages."""
+    return {
+        "provider": provider or type(client).__name__,
+        "model": getattr(client, "model", None),
+        "options": getattr(client, "options", None),
+    }
+
+
+class MemoryCache:
+    """Thread-safe LRU with optional TTL."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl_s is not None and self._clock() - stored_at > self.ttl_s:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (self._clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class SQLiteCache:
+    """Persistent tier: one SQLite table, safe to share between threads.
+
+    With a TTL, expired rows are deleted when read, on open and every
+    `prune_every` writes, so the file does not grow without bound.
+    """
+
+    def __init__(
+        self, path: str | Path, ttl_s: float | None = None, *, prune_every: int = 256
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_s = ttl_s
+        self.prune_every = prune_every
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.prune()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if self.ttl_s is not None and time.time() - stored_at > self.ttl_s:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+        return str(value)
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._db.commit()
+            self._writes += 1
+            due = self._writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete expired rows; returns how many went."""
+        if self.ttl_s is None:
+            return 0
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl_s,)
+            )
+            self._db.commit()
+            return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0  # subset of hits served by the persistent tier
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachedLLMClient:
+    """LLMClient wrapper that answers repeated conversations from cache."""
+
+    def __init__(
+        self,
+        inner: LLMClient,
+        *,
+        provider: str | None = None,
+        memory: MemoryCache | None = None,
+        persistent: SQLiteCache | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> None:
+        self._inner = inner
+        self.namespace = client_namespace(inner, provider)
+        self.memory = memory or MemoryCache()
+        self.persistent = persistent
+        self.observers = tuple(observers)
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(
+        cls,
+        inner: LLMClient,
+        settings: Settings,
+        *,
+        provider: str | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> CachedLLMClient:
+        memory = MemoryCache(settings.cache_max_entries, settings.cache_ttl_s)
+        persistent = (
+            SQLiteCache(settings.cache_path, settings.cache_ttl_s) if settings.cache_path else None
+        )
+        return cls(
+            inner, provider=provider, memory=memory, persistent=persistent, observers=observers
+        )
+
+    def key(self, messages: list[Message]) -> str:
+        return cache_key(self.namespace, messages)
+
+    def lookup(self, messages: list[Message]) -> str | None:
+        key = self.key(messages)
+        value = self.memory.get(key)
+        disk_hit = False
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                disk_hit = True
+                self.memory.set(key, value)
+        with self._lock:
+            if value is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+                self.stats.disk_hits += disk_hit
+        return value
+
+    def store(self, messages: list[Message], value: str) -> None:
+        key = self.key(messages)
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def generate(self, messages: list[Message]) -> str:
+        t0 = time.perf_counter()
+        cached = self.lookup(messages)
+        if cached is not None:
+            self._hit("generate", t0)
+            return cached
+        # Stored stripped, like the stream path: a hit returns the same text
+        # whichever of generate() and stream() filled the entry.
+        value = self._inner.generate(messages).strip()
+        self.store(messages, value)
+        return value
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        t0 = time.perf_counter()
+        cached = self.lookup(messages)
+        if cached is not None:
+            self._hit("stream", t0)
+            yield cached
+            return
+        pieces: list[str] = []
+        for piece in iter_stream(self._inner, messages):
+            pieces.append(piece)
+            yield piece
+        # Only a fully consumed stream is a valid answer to cache.
+        self.store(messages, "".join(pieces).strip())
+
+    def _hit(self, operation: str, started: float) -> None:
+        if self.observers:
+            event = cache_hit_event(
+                str(self.namespace["provider"]),
+                str(self.namespace["model"]),
+                operation,
+                time.perf_counter() - started,
+            )
+            emit(self.observers, event)
@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+import httpx
+
+from .clients.pool import HttpPool, PoolLimits
+
+CassetteMode = Literal["record", "replay"]
+
+# Response headers worth replaying; everything else (dates, ids, cookies) is noise.
+_KEPT_HEADERS = ("content-type", "content-encoding")
+
+
+class CassetteMissError(LookupError):
+    """Replay got a request that was never recorded."""
+
+
+def request_key(request: httpx.Request) -> str:
+    """sha256 over method, path+query and the body (JSON canonicalized).
+
+    The host is left out so a cassette recorded against one server replays for any
+    base URL; headers are left out so API keys never influence (or enter) the file.
+    """
+    body = request.read()
+    with contextlib.suppress(ValueError):
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode()
+    h = hashlib.sha256()
+    h.update(request.method.encode())
+    h.update(b"\0")
+    h.update(request.url.raw_path)
+    h.update(b"\0")
+    h.update(body)
+    return h.hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class Interaction:
+    key: str
+    method: str
+    path: str
+    status: int
+    headers: dict[str, str]
+    chunks: tuple[tuple[float, bytes], ...]  # (seconds since the request was sent, bytes)
+
+    def to_json(self) -> dict[str, Any]:
+        chunks: list[list[Any]] = []
+        for t, data in self.chunks:
+            ms = round(t * 1000, 1)
+            try:
+                chunks.append([ms, data.decode("utf-8")])
+            except UnicodeDecodeError:  # compressed body or a split multi-byte char
+                chunks.append([ms, base64.b64encode(data).decode("ascii"), "b64"])
+        return {
+            "key": self.key,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "headers": self.headers,
+            "chunks": chunks,
+        }
+
+    @classmethod
+    def from_json(cls, obj: dict[str, Any]) -> Interaction:
+        chunks = tuple(
+            (
+                c[0] / 1000,
+                base64.b64decode(c[1]) if len(c) > 2 else str(c[1]).encode("utf-8"),
+            )
+            for c in obj["chunks"]
+        )
+        return cls(
+            key=obj["key"],
+            method=obj["method"],
+            path=obj["path"],
+            status=int(obj["status"]),
+            headers=dict(obj.get("headers") or {}),
+            chunks=chunks,
+        )
+
+
+class Cassette:
+    """Recorded HTTP interactions in a JSONL file, one response per line.
+
+    Chunks keep their arrival time, so streamed replies can be replayed with the
+    original pacing. Recording appends a line as soon as a response has been read
+    in full (partial reads are not recorded); delete the file to re-record.
+    Requests with the same key replay their takes in recording order, then keep
+    repeating the last one, so a small cassette can drive a long load test.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._takes: dict[str, list[Interaction]] = {}
+        self._played: dict[str, int] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add(Interaction.from_json(json.loads(line)))
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._takes.values())
+
+    def _add(self, it: Interaction) -> None:
+        self._takes.setdefault(it.key, []).append(it)
+
+    def record(self, it: Interaction) -> None:
+        line = json.dumps(it.to_json(), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._add(it)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def play(self, request: httpx.Request) -> Interaction:
+        key = request_key(request)
+        with self._lock:
+            takes = self._takes.get(key)
+            if not takes:
+                raise CassetteMissError(
+                    f"no recorded response for {request.method} {request.url.path} "
+                    f"(key {key[:12]}) in {self.path}"
+                )
+            n = self._played.get(key, 0)
+            self._played[key] = n + 1
+            return takes[min(n, len(takes) - 1)]
+
+
+def _new_interaction(
+    request: httpx.Request, response: httpx.Response, chunks: list[tuple[float, bytes]]
+) -> Interaction:
+    return Interaction(
+        key=request_key(request),
+        method=request.method,
+        path=request.url.raw_path.decode("ascii"),
+        status=response.status_code,
+        headers={k: v for k in _KEPT_HEADERS if (v := response.headers.get(k)) is not None},
+        chunks=tuple(chunks),
+    )
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    def __init__(
+        self,
+        inner: httpx.SyncByteStream,
+        t0: float,
+        done: Callable[[list[tuple[float, bytes]]], None],
+    ) -> None:
+        self._inner = inner
+        self._t0 = t0
+        self._done = done
+        self._chunks: list[tuple[float, bytes]] = []
+        self._complete = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._inner:
+            self._chunks.append((time.perf_counter() - self._t0, chunk))
+            yield chunk
+        self._complete = True
+
+    def close(self) -> None:
+        self._inner.close()
+        if self._complete:
+            self._complete = False
+            self._done(self._chunks)
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(
+        self,
+        inner: httpx.AsyncByteStream,
+        t0: float,
+        done: Callable[[list[tuple[float, bytes]]], None],
+    ) -> None:
+        self._inner = inner
+        self._t0 = t0
+        self._done = done
+        self._chunks: list[tuple[float, bytes]] = []
+        self._complete = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._inner:
+            self._chunks.append((time.perf_counter() - self._t0, chunk))
+            yield chunk
+        self._complete = True
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+        if self._complete:
+            self._complete = False
+            self._done(self._chunks)
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """Passes requests to `inner` and records every fully read response."""
+
+    def __init__(self, inner: httpx.BaseTransport, cassette: Cassette) -> None:
+        self._inner = inner
+        self.cassette = cassette
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        t0 = time.perf_counter()
+        resp = self._inner.handle_request(request)
+        assert isinstance(resp.stream, httpx.SyncByteStream)
+        return httpx.Response(
+            resp.status_code,
+            headers=resp.headers,
+            stream=_RecordingStream(
+                resp.stream,
+                t0,
+                lambda chunks: self.cassette.record(_new_interaction(request, resp, chunks)),
+            ),
+            extensions=resp.extensions,
+        )
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, cassette: Cassette) -> None:
+        self._inner = inner
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        t0 = time.perf_counter()
+        resp = await self._inner.handle_async_request(request)
+        assert isinstance(resp.stream, httpx.AsyncByteStream)
+        return httpx.Response(
+            resp.status_code,
+            headers=resp.headers,
+            stream=_AsyncRecordingStream(
+                resp.stream,
+                t0,
+                lambda chunks: self.cassette.record(_new_interaction(request, resp, chunks)),
+            ),
+            extensions=resp.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class _ReplayStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    def __init__(self, chunks: tuple[tuple[float, bytes], ...], speed: float | None) -> None:
+        self._chunks = chunks
+        self._speed = speed
+
+    def __iter__(self) -> Iterator[bytes]:
+        t0 = time.perf_counter()
+        for t, data in self._chunks:
+            if self._speed:
+                delay = t / self._speed - (time.perf_counter() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+            yield data
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        t0 = time.perf_counter()
+        for t, data in self._chunks:
+            if self._speed:
+                delay = t / self._speed - (time.perf_counter() - t0)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield data
+
+
+def _replay(cassette: Cassette, request: httpx.Request, speed: float | None) -> httpx.Response:
+    it = cassette.play(request)
+    return httpx.Response(
+        it.status,
+        headers=it.headers,
+        stream=_ReplayStream(it.chunks, speed),
+        request=request,
+    )
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Serves recorded responses without touching the network.
+
+    With `speed=None` bodies are returned at memory speed; `speed=1.0` reproduces
+    the recorded time to first byte and chunk pacing, `2.0` plays twice as fast.
+    """
+
+    def __init__(self, cassette: Cassette, *, speed: float | None = None) -> None:
+        self.cassette = cassette
+        self.speed = speed
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return _replay(self.cassette, request, self.speed)
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette, *, speed: float | None = None) -> None:
+        self.cassette = cassette
+        self.speed = speed
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return _replay(self.cassette, request, self.speed)
+
+
+class CassettePool(HttpPool):
+    """HttpPool whose transports record to or replay from one cassette.
+
+    Pass it as `pool=` to LLMFactory (sync or async) to record or replay every
+    client it creates; the clients themselves are unchanged.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette | str | Path,
+        mode: CassetteMode = "replay",
+        *,
+        speed: float | None = None,
+        limits: PoolLimits | None = None,
+    ) -> None:
+        super().__init__(limits)
+        self.cassette = cassette if isinstance(cassette, Cassette) else Cassette(cassette)
+        self.mode = mode
+        self.speed = speed
+
+    def transport(self, base_url: str) -> httpx.BaseTransport:
+        if self.mode == "replay":
+            return ReplayTransport(self.cassette, speed=self.speed)
+        return RecordingTransport(super().transport(base_url), self.cassette)
+
+    def async_transport(self, base_url: str) -> httpx.AsyncBaseTransport:
+        if self.mode == "replay":
+            return AsyncReplayTransport(self.cassette, speed=self.speed)
+        return AsyncRecordingTransport(super().async_transport(base_url), self.cassette)
+
+
+_SHARED: dict[tuple[str, CassetteMode, float | None, PoolLimits], CassettePool] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_cassette_pool(
+    path: str, mode: CassetteMode, *, speed: float | None, limits: PoolLimits
+) -> CassettePool:
+    """Process-wide CassettePool per cassette file (used by LLMFactory)."""
+    key = (str(Path(path).resolve()), mode, speed, limits)
+    with _SHARED_LOCK:
+        pool = _SHARED.get(key)
+        if pool is None or pool._closed:
+            pool = CassettePool(path, mode, speed=speed, limits=limits)
+            _SHARED[key] = pool
+        return pool
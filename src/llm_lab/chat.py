@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, TextIO
+
+from .contracts import StreamingLLMClient
+from .conversation import Conversation
+
+RESET_COMMANDS = frozenset({"/reset", "/new"})
+EXIT_COMMANDS = frozenset({"/exit", "/quit"})
+
+
+class ChatSession:
+    """One client and one Conversation kept alive across turns.
+
+    A turn is committed to the history only once the reply has streamed in full,
+    so an interrupted or failed reply leaves the conversation as it was.
+    """
+
+    def __init__(self, client: StreamingLLMClient, conversation: Conversation) -> None:
+        self.client = client
+        self.conversation = conversation
+        self.turns = 0
+
+    def send(self, text: str) -> Iterator[str]:
+        messages = self.conversation.messages()
+        messages.append({"role": "user", "content": text})
+        pieces: list[str] = []
+        for piece in self.client.stream(messages):
+            pieces.append(piece)
+            yield piece
+        self.conversation.user(text)
+        self.conversation.assistant("".join(pieces))
+        self.turns += 1
+
+    def reset(self) -> None:
+        self.conversation.clear()
+        self.turns = 0
+
+
+def run_repl(
+    session: ChatSession,
+    *,
+    read: Callable[[str], str] = input,
+    out: TextIO,
+    err: TextIO,
+) -> None:
+    """Read prompts until EOF or /exit, streaming each reply to `out`."""
+    while True:
+        try:
+            line = read("> ").strip()
+        except EOFError:
+            out.write("\n")
+            return
+        except KeyboardInterrupt:
+            out.write("\n")
+            continue
+        if not line:
+            continue
+        if line in EXIT_COMMANDS:
+            return
+        if line in RESET_COMMANDS:
+            session.reset()
+            err.write("(history cleared)\n")
+            continue
+        try:
+            for piece in session.send(line):
+                out.write(piece)
+                out.flush()
+        except KeyboardInterrupt:
+            err.write("\n(interrupted, turn discarded)\n")
+            continue
+        except Exception as e:
+            err.write(f"\nError: {e}\n")
+            continue
+        out.write("\n")
+
+
+def run_jsonl(session: ChatSession, lines: Iterable[str], out: TextIO) -> None:
+    """Line-delimited JSON protocol for tools that pipe to `llm-lab chat --jsonl`.
+
+    In:  {"id": 1, "prompt": "...", "stream": true} | {"id": 2, "reset": true} | "bare prompt"
+    Out: {"id": 1, "delta": "..."}* then {"id": 1, "reply": "...", "turns": n, "tokens": n,
+         "elapsed_s": s}; {"id": 2, "reset": true}; failures as {"id": ..., "error": "..."}.
+    """
+
+    def emit(obj: dict[str, Any]) -> None:
+        out.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        out.flush()
+
+    for raw in lines:
+        if not raw.strip():
+            continue
+        item_id: Any = None
+        try:
+            obj = json.loads(raw)
+            if isinstance(obj, str):
+                obj = {"prompt": obj}
+            if not isinstance(obj, dict):
+                raise ValueError("expected a JSON object or string")
+            item_id = obj.get("id")
+            if obj.get("reset"):
+                session.reset()
+                emit({"id": item_id, "reset": True})
+                continue
+            prompt = obj.get("prompt")
+            if not isinstance(prompt, str) or not prompt:
+                raise ValueError("provide a non-empty 'prompt'")
+        except ValueError as e:
+            emit({"id": item_id, "error": f"invalid input: {e}"})
+            continue
+
+        started = time.perf_counter()
+        pieces: list[str] = []
+        try:
+            for piece in session.send(prompt):
+                pieces.append(piece)
+                if obj.get("stream"):
+                    emit({"id": item_id, "delta": piece})
+        except Exception as e:
+            emit({"id": item_id, "error": f"{type(e).__name__}: {e}"})
+            continue
+        emit(
+            {
+                "id": item_id,
+                "reply": "".join(pieces),
+                "turns": session.turns,
+                "tokens": session.conversation.tokens,
+                "elapsed_s": round(time.perf_counter() - started, 6),
+            }
+        )
@@ -1,15 +1,26 @@
 from __future__ import annotations
 
 import argparse
+import json
 import sys
-from typing import cast
-
-import httpx
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import ExitStack, suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TextIO, cast
 
 from llm_lab.factory import LLMFactory
-from llm_lab.settings import Settings
+from llm_lab.observe import HistogramAggregator, Observer
 from llm_lab.types import Message, Provider, Role
 
+# Startup matters for scripted one-shot calls: httpx, pydantic-settings and the provider
+# clients are imported only once a command actually needs them (see test_startup.py).
+if TYPE_CHECKING:
+    import httpx
+
+    from llm_lab.batch import BatchItem
+    from llm_lab.contracts import StreamingLLMClient
+    from llm_lab.settings import Settings
+
 DEFAULT_SYSTEM = "You are a helpful assistant."
 DEFAULT_DEVELOPER = "Follow the developer instructions and be precise."
 ALLOWED_ROLES: tuple[Role, ...] = ("system", "developer", "user", "assistant")
@@ -52,6 +63,8 @@ def _ensure_defaults(
 
 
 def _friendly_httpx_error(e: httpx.HTTPError) -> str:
+    import httpx
+
     if isinstance(e, httpx.HTTPStatusError):
         r = e.response
         req = r.request
@@ -67,11 +80,18 @@ def _friendly_httpx_error(e: httpx.HTTPError) -> str:
     return f"HTTP client error: {e}"
 
 
-def main() -> None:
-    p = argparse.ArgumentParser(prog="llm-lab")
+def _add_client_args(p: argparse.ArgumentParser) -> None:
     p.add_argument("--provider", choices=["ollama", "openai"])
     p.add_argument("--model")
     p.add_argument("--ollama-host")
+    p.add_argument(
+        "--ollama-hosts",
+        help="Comma-separated Ollama hosts; requests go to the least-loaded healthy one",
+    )
+    p.add_argument(
+        "--keep-alive",
+        help="How long Ollama keeps the model loaded after a call (e.g. 30m, -1 = forever)",
+    )
     p.add_argument("--openai-base-url")
     p.add_argument("--openai-api-key")
 
@@ -79,18 +99,51 @@ def main() -> None:
     p.add_argument("--system", default=DEFAULT_SYSTEM)
     p.add_argument("--developer", default=DEFAULT_DEVELOPER)
 
-    # Old single-prompt mode (optional now)
-    p.add_argument("--prompt")
-
-    # New multi-message mode
     p.add_argument(
-        "--message",
-        action="append",
-        default=[],
-        help="Repeatable. Format: role:content (system|developer|user|assistant)",
+        "--cache",
+        action="store_true",
+        help="Answer repeated conversations from the response cache (see CACHE_* settings)",
+    )
+    p.add_argument("--cache-path", help="SQLite file for the persistent cache tier")
+    p.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="Send identical concurrent requests upstream once and share the reply",
+    )
+    p.add_argument(
+        "--hedge",
+        metavar="SECONDARY",
+        help="Also send slow calls to SECONDARY (openai, ollama or an Ollama host URL)",
+    )
+    p.add_argument(
+        "--scheduler",
+        action="store_true",
+        help="Queue calls by priority with fair tenant shares (see SCHEDULER_* settings)",
+    )
+    p.add_argument(
+        "--priority",
+        choices=["interactive", "normal", "batch"],
+        help="Scheduler priority of this run's calls (default: normal; batch for 'batch')",
+    )
+    p.add_argument(
+        "--retries",
+        type=int,
+        help="Max attempts per call on 429/5xx/network errors (1 disables retries)",
+    )
+    tape = p.add_mutually_exclusive_group()
+    tape.add_argument("--record", metavar="PATH", help="Record HTTP responses to a cassette")
+    tape.add_argument(
+        "--replay", metavar="PATH", help="Answer from a recorded cassette instead of the network"
+    )
+    p.add_argument(
+        "--replay-speed",
+        type=float,
+        help="Reproduce recorded timing (1 = original pace, 2 = twice as fast)",
     )
 
-    args = p.parse_args()
+
+def _settings(p: argparse.ArgumentParser, args: argparse.Namespace) -> tuple[Settings, Provider]:
+    from llm_lab.settings import Settings, parse_keep_alive, split_hosts
 
     s = Settings()
     provider: Provider = args.provider or s.llm_provider
@@ -103,12 +156,429 @@ def main() -> None:
 
     if args.ollama_host:
         s.ollama_host = args.ollama_host
+    if args.ollama_hosts:
+        s.ollama_hosts = split_hosts(args.ollama_hosts)
+    if args.keep_alive:
+        try:
+            s.ollama_keep_alive = parse_keep_alive(args.keep_alive)
+        except ValueError as e:
+            p.error(f"--keep-alive: {e}")
     if args.openai_base_url:
         s.openai_base_url = args.openai_base_url
     if args.openai_api_key:
         s.openai_api_key = args.openai_api_key
+    if args.cache_path:
+        s.cache_path = args.cache_path
+    if args.hedge:
+        s.hedge_secondary = args.hedge
+    if args.scheduler:
+        s.scheduler_enabled = True
+    if args.retries is not None:
+        s.retry_max_attempts = max(1, args.retries)
+    if args.record or args.replay:
+        s.cassette_path = args.record or args.replay
+        s.cassette_mode = "record" if args.record else "replay"
+    if args.replay_speed is not None:
+        s.cassette_speed = args.replay_speed
+    return s, provider
+
+
+def _create_client(
+    args: argparse.Namespace,
+    s: Settings,
+    provider: Provider,
+    stack: ExitStack,
+    *,
+    observers: Sequence[Observer] = (),
+) -> StreamingLLMClient:
+    """The client for this run; what it opens (connections, cache file) closes with `stack`."""
+    client: StreamingLLMClient
+    if provider == "ollama" and len(s.ollama_hosts) > 1:
+        client = LLMFactory.create_balanced(settings=s, observers=observers)
+    else:
+        client = LLMFactory.create(provider, settings=s, observers=observers)
+    _close_with(stack, client)
+    if s.scheduler_enabled:
+        from llm_lab.scheduler import ScheduledClient, Scheduler
+
+        # Innermost: every retry or hedge attempt on this backend queues for a slot.
+        scheduler = Scheduler.from_settings(s, provider)
+        client = ScheduledClient(client, scheduler, priority=args.priority or "normal")
+    if s.hedge_secondary:
+        from llm_lab.hedge import HedgedClient
+
+        hedged = HedgedClient.from_settings(client, s, observers=observers)
+        _close_with(stack, hedged.secondary)
+        client = hedged
+    if s.retry_max_attempts > 1:
+        from llm_lab.resilience import ResilientClient
+
+        client = ResilientClient.from_settings(client, s)
+    if args.coalesce or s.coalesce_enabled:
+        from llm_lab.coalesce import CoalescingClient
+
+        # Below the cache: concurrent misses for the same key still go upstream once.
+        client = CoalescingClient(client, provider=provider)
+    if args.cache or args.cache_path or s.cache_enabled:
+        from llm_lab.cache import CachedLLMClient
+
+        cached = CachedLLMClient.from_settings(client, s, provider=provider, observers=observers)
+        if cached.persistent is not None:
+            stack.callback(cached.persistent.close)
+        return cached
+    return client
+
+
+def _close_with(stack: ExitStack, client: object) -> None:
+    close = getattr(client, "close", None)
+    if close is not None:
+        stack.callback(close)
+
+
+def _batch_record(obj: Any) -> tuple[Any, list[Message]]:
+    # A line is {"id": ..., "messages": [...], "prompt": "..."} or a bare JSON string prompt.
+    if isinstance(obj, str):
+        obj = {"prompt": obj}
+    if not isinstance(obj, dict):
+        raise ValueError("expected a JSON object or string")
+
+    raw_messages = obj.get("messages") or []
+    if not isinstance(raw_messages, list):
+        raise ValueError("messages must be a list")
+    messages: list[Message] = []
+    for m in raw_messages:
+        if isinstance(m, dict):
+            m = f"{m.get('role', '')}:{m.get('content', '')}"
+        if not isinstance(m, str):
+            raise ValueError("messages[] must be objects or 'role:content' strings")
+        messages.append(_parse_message(m))
+
+    prompt = obj.get("prompt")
+    if prompt:
+        messages.append({"role": "user", "content": str(prompt)})
+    if not messages:
+        raise ValueError("provide 'prompt' or 'messages'")
+    return obj.get("id"), messages
+
 
-    client = LLMFactory.create(provider, settings=s)
+def _batch_items(
+    lines: Iterable[str],
+    *,
+    system_text: str,
+    developer_text: str,
+) -> Iterator[BatchItem]:
+    from llm_lab.batch import BatchItem
+
+    for lineno, raw in enumerate(lines, 1):
+        if not raw.strip():
+            continue
+        try:
+            item_id, messages = _batch_record(json.loads(raw))
+        except ValueError as e:
+            yield BatchItem(lineno, error=f"invalid input: {e}")
+            continue
+        messages = _ensure_defaults(
+            messages,
+            system_text=system_text,
+            developer_text=developer_text,
+        )
+        yield BatchItem(lineno, item_id, messages)
+
+
+def _batch_main(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(
+        prog="llm-lab batch",
+        description="Run many conversations from JSONL over one shared client.",
+    )
+    _add_client_args(p)
+    p.set_defaults(priority="batch")  # under --scheduler, yield to interactive callers
+    p.add_argument("--input", required=True, help="JSONL file ('-' for stdin)")
+    p.add_argument("--output", default="-", help="JSONL results file ('-' for stdout)")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument(
+        "--order",
+        choices=["input", "completion"],
+        default="input",
+        help="Write results in input order or as soon as they complete",
+    )
+    p.add_argument(
+        "--prefix-window",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Read N lines ahead and send conversations sharing a message prefix back-to-back",
+    )
+    p.add_argument(
+        "--metrics",
+        help="Write per-call latency/token metrics in Prometheus text format here ('-' = stderr)",
+    )
+    args = p.parse_args(argv)
+    if args.concurrency < 1:
+        p.error("--concurrency must be >= 1")
+    if args.prefix_window < 0:
+        p.error("--prefix-window must be >= 0")
+
+    from llm_lab.batch import run_batch
+
+    s, provider = _settings(p, args)
+    metrics = HistogramAggregator() if args.metrics else None
+
+    with ExitStack() as stack:
+        client = _create_client(args, s, provider, stack, observers=[metrics] if metrics else ())
+        src: TextIO = (
+            sys.stdin
+            if args.input == "-"
+            else stack.enter_context(open(args.input, encoding="utf-8"))
+        )
+        dst: TextIO = (
+            sys.stdout
+            if args.output == "-"
+            else stack.enter_context(open(args.output, "w", encoding="utf-8"))
+        )
+        items = _batch_items(src, system_text=args.system, developer_text=args.developer)
+
+        ok = failed = 0
+        results = run_batch(
+            client,
+            items,
+            concurrency=args.concurrency,
+            order=args.order,
+            prefix_window=args.prefix_window,
+        )
+        for r in results:
+            dst.write(json.dumps(r.to_json(), ensure_ascii=False) + "\n")
+            dst.flush()
+            if r.error is None:
+                ok += 1
+            else:
+                failed += 1
+
+    summary = f"batch: {ok} ok, {failed} failed"
+    ratio = metrics.cached_token_ratio() if metrics is not None else None
+    if ratio is not None:
+        summary += f", {ratio:.0%} of prompt tokens cached"
+    print(summary, file=sys.stderr)
+    if metrics is not None:
+        if args.metrics == "-":
+            sys.stderr.write(metrics.prometheus_text())
+        else:
+            Path(args.metrics).write_text(metrics.prometheus_text(), encoding="utf-8")
+
+
+def _warm_main(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(
+        prog="llm-lab warm",
+        description="Preload the Ollama model so the next call does not pay the cold start.",
+    )
+    _add_client_args(p)
+    args = p.parse_args(argv)
+    s, provider = _settings(p, args)
+    if provider != "ollama":
+        p.error("warm only applies to --provider ollama")
+
+    with LLMFactory.create_balanced(settings=s) as client:
+        try:
+            loads = client.warm()
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            raise SystemExit(1) from e
+    for host, load_s in loads.items():
+        state = "already loaded" if not load_s else f"loaded in {load_s:.2f}s"
+        print(f"{s.ollama_model} on {host}: {state}")
+
+
+def _chat_main(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(
+        prog="llm-lab chat",
+        description="Multi-turn chat over one warm client; history stays in memory.",
+    )
+    _add_client_args(p)
+    p.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Line-delimited JSON on stdin/stdout instead of the interactive prompt",
+    )
+    args = p.parse_args(argv)
+
+    from llm_lab.chat import ChatSession, run_jsonl, run_repl
+    from llm_lab.conversation import Conversation
+
+    s, provider = _settings(p, args)
+    model = s.ollama_model if provider == "ollama" else s.openai_model
+    conversation = Conversation.from_settings(
+        s,
+        provider,
+        model,
+        pinned=[
+            {"role": "system", "content": args.system},
+            {"role": "developer", "content": args.developer},
+        ],
+    )
+    with ExitStack() as stack:
+        session = ChatSession(_create_client(args, s, provider, stack), conversation)
+        if args.jsonl:
+            run_jsonl(session, sys.stdin, sys.stdout)
+            return
+        if sys.stdin.isatty():
+            with suppress(ImportError):
+                import readline  # noqa: F401  (line editing and history for input())
+            print(f"{provider}:{model} — /reset clears the history, /exit or Ctrl-D quits.")
+        run_repl(session, out=sys.stdout, err=sys.stderr)
+
+
+def _serve_main(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(
+        prog="llm-lab serve",
+        description="HTTP gateway (/api/chat, /v1/responses) over one shared set of clients.",
+    )
+    _add_client_args(p)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--concurrency", type=int, help="Upstream calls in flight (all tenants)")
+    p.add_argument("--tenant-concurrency", type=int, help="Upstream calls in flight per X-Tenant")
+    p.add_argument("--max-queue", type=int, help="Requests waiting for a slot before 503")
+    args = p.parse_args(argv)
+
+    import asyncio
+
+    from llm_lab.gateway import Gateway, serve
+
+    # The async backend has no response cache and no multi-host balancer yet.
+    for flag, value in (
+        ("--cache", args.cache),
+        ("--cache-path", args.cache_path),
+        ("--ollama-hosts", args.ollama_hosts),
+    ):
+        if value:
+            p.error(f"{flag} is not supported by serve")
+
+    s, provider = _settings(p, args)
+    if args.coalesce:
+        s.coalesce_enabled = True
+    if args.concurrency:
+        s.serve_max_concurrency = args.concurrency
+    if args.tenant_concurrency:
+        s.serve_tenant_concurrency = args.tenant_concurrency
+    if args.max_queue is not None:
+        s.serve_max_queue = args.max_queue
+
+    def ready(gw: Gateway) -> None:
+        print(f"llm-lab serve: {provider}:{gw.model} on {gw.url}", file=sys.stderr)
+
+    with suppress(KeyboardInterrupt):
+        asyncio.run(serve(s, provider, host=args.host, port=args.port, ready=ready))
+
+
+def _int_list(raw: str) -> tuple[int, ...]:
+    return tuple(int(x) for x in raw.split(",") if x.strip())
+
+
+def _bench_main(argv: list[str]) -> None:
+    from llm_lab.bench import BenchConfig, run_bench
+    from llm_lab.fake_upstream import FakeUpstreamConfig
+
+    p = argparse.ArgumentParser(
+        prog="llm-lab bench",
+        description="Measure client overhead against a local fake Ollama/OpenAI server.",
+    )
+    p.add_argument("--providers", default="ollama,openai")
+    p.add_argument("--concurrency", type=_int_list, default=(1, 4, 16), help="e.g. 1,4,16")
+    p.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    p.add_argument("--no-stream", action="store_true", help="Use generate() (no TTFT)")
+    p.add_argument("--alloc-requests", type=int, default=20)
+    p.add_argument("--latency-ms", type=float, default=0.0, help="Upstream time to first token")
+    p.add_argument("--tokens-per-s", type=float, default=0.0, help="Upstream rate (0 = instant)")
+    p.add_argument("--reply-tokens", type=int, default=16)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--error-status", type=int, default=500)
+    p.add_argument("--seed", type=int)
+    p.add_argument("--output", default="-", help="JSON report file ('-' for stdout)")
+    p.add_argument(
+        "--codec",
+        action="store_true",
+        help="Instead: microbenchmark the JSON backends (--requests = rounds per operation)",
+    )
+    args = p.parse_args(argv)
+
+    if args.codec:
+        from llm_lab.bench import run_json_bench
+
+        _write_report(run_json_bench(rounds=args.requests), args.output)
+        return
+
+    providers = tuple(x.strip() for x in args.providers.split(",") if x.strip())
+    unknown = set(providers) - {"ollama", "openai"}
+    if unknown:
+        p.error(f"unknown providers: {', '.join(sorted(unknown))}")
+
+    report = run_bench(
+        BenchConfig(
+            providers=cast(tuple[Provider, ...], providers),
+            concurrency=args.concurrency,
+            requests=args.requests,
+            stream=not args.no_stream,
+            alloc_requests=args.alloc_requests,
+            upstream=FakeUpstreamConfig(
+                latency_s=args.latency_ms / 1000,
+                tokens_per_s=args.tokens_per_s,
+                reply_tokens=args.reply_tokens,
+                error_rate=args.error_rate,
+                error_status=args.error_status,
+                seed=args.seed,
+            ),
+        )
+    )
+    _write_report(report, args.output)
+
+
+def _write_report(report: dict[str, Any], output: str) -> None:
+    text = json.dumps(report, indent=2)
+    if output == "-":
+        print(text)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+_COMMANDS: dict[str, Callable[[list[str]], None]] = {
+    "batch": _batch_main,
+    "bench": _bench_main,
+    "chat": _chat_main,
+    "serve": _serve_main,
+    "warm": _warm_main,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in _COMMANDS:
+        _COMMANDS[argv[0]](argv[1:])
+        return
+
+    p = argparse.ArgumentParser(
+        prog="llm-lab",
+        epilog=f"Subcommands: {', '.join(_COMMANDS)} (see 'llm-lab <command> -h').",
+    )
+    _add_client_args(p)
+
+    # Old single-prompt mode (optional now)
+    p.add_argument("--prompt")
+
+    # New multi-message mode
+    p.add_argument(
+        "--message",
+        action="append",
+        default=[],
+        help="Repeatable. Format: role:content (system|developer|user|assistant)",
+    )
+
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the reply incrementally as it is generated",
+    )
+
+    args = p.parse_args(argv)
 
     messages: list[Message] = []
 
@@ -132,14 +602,27 @@ def main() -> None:
         developer_text=args.developer,
     )
 
+    s, provider = _settings(p, args)
+    stack = ExitStack()
+    client = _create_client(args, s, provider, stack)
+    import httpx  # already loaded by the client
+
     try:
-        print(client.generate(messages))
+        if args.stream:
+            for piece in client.stream(messages):
+                sys.stdout.write(piece)
+                sys.stdout.flush()
+            sys.stdout.write("\n")
+        else:
+            print(client.generate(messages))
     except httpx.HTTPError as e:
         print(_friendly_httpx_error(e), file=sys.stderr)
         raise SystemExit(2) from e
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         raise SystemExit(2) from e
+    finally:
+        stack.close()
 
 
 if __name__ == "__main__":
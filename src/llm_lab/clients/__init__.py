@@ -1,9 +1,57 @@
 from __future__ import annotations
 
-from .ollama import OllamaClient
-from .openai import OpenAIClient
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .ollama import (
+        AsyncOllamaClient,
+        AsyncOllamaEmbedder,
+        BalancedOllamaClient,
+        OllamaClient,
+        OllamaEmbedder,
+    )
+    from .openai import AsyncOpenAIClient, AsyncOpenAIEmbedder, OpenAIClient, OpenAIEmbedder
+    from .pool import HttpPool, PoolLimits
 
 __all__ = [
     "OpenAIClient",
     "OllamaClient",
+    "AsyncOpenAIClient",
+    "AsyncOllamaClient",
+    "BalancedOllamaClient",
+    "OpenAIEmbedder",
+    "AsyncOpenAIEmbedder",
+    "OllamaEmbedder",
+    "AsyncOllamaEmbedder",
+    "HttpPool",
+    "PoolLimits",
 ]
+
+# Resolved on first attribute access so that importing one provider does not pull in the other.
+_LAZY = {
+    "OpenAIClient": ".openai_client",
+    "AsyncOpenAIClient": ".openai_client",
+    "OllamaClient": ".ollama_client",
+    "AsyncOllamaClient": ".ollama_client",
+    "BalancedOllamaClient": ".ollama_balancer",
+    "OpenAIEmbedder": ".openai_client",
+    "AsyncOpenAIEmbedder": ".openai_client",
+    "OllamaEmbedder": ".ollama_client",
+    "AsyncOllamaEmbedder": ".ollama_client",
+    "HttpPool": ".pool",
+    "PoolLimits": ".pool",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
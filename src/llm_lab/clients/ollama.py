@@ -1,7 +1,12 @@
 from __future__ import annotations
 
-from .ollama_client import OllamaClient
+from .ollama_balancer import BalancedOllamaClient
+from .ollama_client import AsyncOllamaClient, AsyncOllamaEmbedder, OllamaClient, OllamaEmbedder
 
 __all__ = [
     "OllamaClient",
+    "AsyncOllamaClient",
+    "BalancedOllamaClient",
+    "OllamaEmbedder",
+    "AsyncOllamaEmbedder",
 ]
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Any
+
+import httpx
+from ollama import ResponseError
+
+from llm_lab.clients.ollama_client import OllamaClient
+from llm_lab.context_window import ContextSizer
+from llm_lab.observe import Observer
+from llm_lab.prefix import prefix_digest, rendezvous_rank
+from llm_lab.ratelimit import RateLimiter
+from llm_lab.types import Message
+
+
+@dataclass(slots=True)
+class HostState:
+    host: str
+    client: OllamaClient
+    in_flight: int = 0
+    ewma_latency_s: float = 0.0
+    healthy: bool = True
+    requests: int = 0
+    failures: int = 0
+    last_error: str | None = None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "host": self.host,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "ewma_latency_s": round(self.ewma_latency_s, 6),
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class BalancedOllamaClient:
+    """Routes each call to the least-loaded healthy Ollama host.
+
+    Load is the number of in-flight requests, ties broken by recent latency (EWMA).
+    A host that fails at the transport level (or answers 5xx) leaves the rotation
+    until a background probe of /api/tags succeeds again. Calls that could not even
+    connect are retried once per remaining healthy host.
+
+    Calls sharing everything but their last message (same header and history)
+    prefer one host, picked by rendezvous hashing of that prefix, so its KV cache
+    is reused instead of recomputed on every host. The preference yields when that
+    host has more than `affinity_slack` in-flight calls above the least-loaded
+    one; None turns affinity off.
+    """
+
+    def __init__(
+        self,
+        hosts: Sequence[str],
+        model: str = "mistral",
+        *,
+        options: Mapping[str, Any] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        transport_for: Callable[[str], httpx.BaseTransport] | None = None,
+        probe_interval_s: float = 5.0,
+        ewma_alpha: float = 0.3,
+        observers: Sequence[Observer] = (),
+        keep_alive: float | str | None = None,
+        context_sizer: ContextSizer | None = None,
+        affinity_slack: int | None = 2,
+    ) -> None:
+        if not hosts:
+            raise ValueError("BalancedOllamaClient needs at least one host")
+        self.model = model
+        self.probe_interval_s = probe_interval_s
+        self.ewma_alpha = ewma_alpha
+        self.affinity_slack = affinity_slack
+        self._hosts = [
+            HostState(
+                host,
+                OllamaClient(
+                    model,
+                    host,
+                    options=options,
+                    rate_limiter=rate_limiter,  # one budget for all hosts
+                    transport=transport_for(host) if transport_for else None,
+                    observers=observers,
+                    keep_alive=keep_alive,
+                    context_sizer=context_sizer,  # shared: a conversation keeps its size
+                ),
+            )
+            for host in dict.fromkeys(hosts)
+        ]
+        self.options = self._hosts[0].client.options
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._prober: threading.Thread | None = None
+
+    @property
+    def hosts(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [h.snapshot() for h in self._hosts]
+
+    def generate(self, messages: list[Message]) -> str:
+        tried: set[str] = set()
+        affinity = self._affinity(messages)
+        while True:
+            h = self._acquire(tried, affinity)
+            t0 = time.perf_counter()
+            try:
+                text = h.client.generate(messages)
+            except Exception as e:
+                self._release(h, time.perf_counter() - t0, e)
+                if _never_connected(e) and self._has_untried(tried):
+                    continue
+                raise
+            self._release(h, time.perf_counter() - t0, None)
+            return text
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        tried: set[str] = set()
+        affinity = self._affinity(messages)
+        while True:
+            h = self._acquire(tried, affinity)
+            t0 = time.perf_counter()
+            started = False
+            try:
+                for piece in h.client.stream(messages):
+                    started = True
+                    yield piece
+            except Exception as e:
+                self._release(h, time.perf_counter() - t0, e)
+                if not started and _never_connected(e) and self._has_untried(tried):
+                    continue
+                raise
+            except BaseException:  # GeneratorExit: consumer stopped early
+                # A cut-short stream says nothing about how long the host takes.
+                self._release(h, None, None)
+                raise
+            self._release(h, time.perf_counter() - t0, None)
+            return
+
+    def warm(self) -> dict[str, float | None]:
+        """Preload the model on every healthy host; host -> load seconds."""
+        with self._lock:
+            up = [h for h in self._hosts if h.healthy]
+        return {h.host: h.client.warm() for h in up}
+
+    def start_keeper(self, interval_s: float | None = None) -> None:
+        for h in self._hosts:
+            h.client.start_keeper(interval_s)
+
+    def probe(self) -> None:
+        """Check every unhealthy host once; healthy answers put it back in rotation."""
+        with self._lock:
+            down = [h for h in self._hosts if not h.healthy]
+        for h in down:
+            try:
+                h.client.ping()
+            except Exception as e:
+                with self._lock:
+                    h.last_error = f"{type(e).__name__}: {e}"
+                continue
+            with self._lock:
+                h.healthy = True
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._prober is not None:
+            self._prober.join(timeout=self.probe_interval_s + 1)
+        for h in self._hosts:
+            h.client.close()
+
+    def __enter__(self) -> BalancedOllamaClient:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def _affinity(self, messages: list[Message]) -> bytes | None:
+        if self.affinity_slack is None or len(self._hosts) < 2:
+            return None
+        return prefix_digest(messages)
+
+    def _acquire(self, tried: set[str], affinity: bytes | None = None) -> HostState:
+        with self._lock:
+            candidates = [h for h in self._hosts if h.host not in tried]
+            healthy = [h for h in candidates if h.healthy]
+            # Nothing healthy left: still try the least-failed host rather than fail outright.
+            pool = healthy or sorted(candidates, key=lambda h: h.failures)[:1]
+            if not pool:
+                raise RuntimeError("no Ollama hosts left to try")
+            h = min(pool, key=lambda h: (h.in_flight, h.ewma_latency_s))
+            if affinity is not None and self.affinity_slack is not None:
+                home = max(pool, key=lambda c: rendezvous_rank(affinity, c.host))
+                if home.in_flight <= h.in_flight + self.affinity_slack:
+                    h = home
+            h.in_flight += 1
+            h.requests += 1
+            tried.add(h.host)
+            return h
+
+    def _release(self, h: HostState, elapsed_s: float | None, error: BaseException | None) -> None:
+        with self._lock:
+            h.in_flight -= 1
+            if error is None:
+                if elapsed_s is None:  # abandoned: free the slot, keep the latency
+                    return
+                a = self.ewma_alpha
+                h.ewma_latency_s = (
+                    a * elapsed_s + (1 - a) * h.ewma_latency_s if h.ewma_latency_s else elapsed_s
+                )
+                return
+            if not _is_host_failure(error):
+                return
+            h.failures += 1
+            h.healthy = False
+            h.last_error = f"{type(error).__name__}: {error}"
+        self._ensure_prober()
+
+    def _has_untried(self, tried: set[str]) -> bool:
+        with self._lock:
+            return any(h.healthy and h.host not in tried for h in self._hosts)
+
+    def _ensure_prober(self) -> None:
+        with self._lock:
+            if self._prober is not None or self._stop.is_set():
+                return
+            self._prober = threading.Thread(
+                target=self._probe_loop, name="llm-lab-ollama-probe", daemon=True
+            )
+            self._prober.start()
+
+    def _probe_loop(self) -> None:
+        while not self._stop.wait(self.probe_interval_s):
+            self.probe()
+
+
+def _never_connected(e: BaseException) -> bool:
+    # ollama maps httpx.ConnectError to ConnectionError, except on the streaming path
+    return isinstance(e, ConnectionError | httpx.ConnectError)
+
+
+def _is_host_failure(e: BaseException) -> bool:
+    if isinstance(e, ConnectionError | httpx.TransportError):
+        return True
+    status = getattr(e, "status_code", None)
+    return isinstance(e, ResponseError) and isinstance(status, int) and status >= 500
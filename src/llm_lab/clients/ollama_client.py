@@ -1,26 +1,493 @@
 from __future__ import annotations
 
-from typing import cast
+import asyncio
+import contextlib
+import logging
+import threading
+from collections.abc import AsyncIterator, Iterator, Mapping, Sequence
+from types import TracebackType
+from typing import Any, cast
 
-from ollama import Client
+import httpx
+from ollama import AsyncClient, Client
 
-from llm_lab.clients.ollama_types import OllamaChatResponse
+from llm_lab.clients.ollama_types import OllamaChatResponse, OllamaEmbedResponse
+from llm_lab.clients.pool import PoolLimits
+from llm_lab.context_window import ContextSizer
+from llm_lab.embeddings import (
+    DEFAULT_MAX_BATCH,
+    DEFAULT_MAX_BATCH_TOKENS,
+    aembed_batched,
+    embed_batched,
+)
+from llm_lab.observe import CallTimer, Observer
+from llm_lab.ollama_local import extract_stats, extract_stream_piece, keep_alive_seconds
+from llm_lab.ratelimit import RateLimiter
 from llm_lab.settings import default_ollama_host
 from llm_lab.types import Message
 
+DEFAULT_OPTIONS: dict[str, Any] = {"temperature": 0.2, "num_ctx": 2048}
+DEFAULT_KEEPER_INTERVAL_S = 60.0
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+
+log = logging.getLogger(__name__)
+
 
 class OllamaClient:
-    def __init__(self, model: str = "mistral", host: str | None = None) -> None:
+    def __init__(
+        self,
+        model: str = "mistral",
+        host: str | None = None,
+        *,
+        options: Mapping[str, Any] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        limits: PoolLimits | None = None,
+        transport: httpx.BaseTransport | None = None,
+        observers: Sequence[Observer] = (),
+        keep_alive: float | str | None = None,
+        context_sizer: ContextSizer | None = None,
+    ) -> None:
         self.model = model
-        self._client = Client(host=host or default_ollama_host())
+        self.host = host or default_ollama_host()
+        self.options: dict[str, Any] = {**DEFAULT_OPTIONS, **(options or {})}
+        self.rate_limiter = rate_limiter
+        self.observers = tuple(observers)
+        # None = server default (OLLAMA_KEEP_ALIVE, 5m); "30m", 1800, -1 = keep loaded forever
+        self.keep_alive = keep_alive
+        # Per-call num_ctx from a ladder instead of the fixed options["num_ctx"].
+        self.context_sizer = context_sizer
+        self._num_ctx: int | None = None  # last sized num_ctx sent, kept by warm()
+        # A passed-in transport (e.g. from HttpPool) is borrowed; our own one is closed by close().
+        self._transport = transport or (limits or PoolLimits()).transport()
+        self._owns_transport = transport is None
+        self._client = Client(host=self.host, transport=self._transport)
+        self._keeper: threading.Thread | None = None
+        self._keeper_stop = threading.Event()
 
     def generate(self, messages: list[Message]) -> str:
-        resp = cast(
-            OllamaChatResponse,
-            self._client.chat(
+        timer = CallTimer(self.observers, "ollama", self.model, "generate")
+        error: Exception | None = None
+        try:
+            if self.rate_limiter is not None:
+                timer.waited(self.rate_limiter.acquire(messages))
+            resp = cast(
+                OllamaChatResponse,
+                self._client.chat(
+                    model=self.model,
+                    messages=messages,
+                    options=self._options_for(messages),
+                    keep_alive=self.keep_alive,
+                ),
+            )
+            _record_stats(timer, resp)
+            return resp["message"]["content"]
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        timer = CallTimer(self.observers, "ollama", self.model, "stream")
+        error: BaseException | None = None
+        try:
+            if self.rate_limiter is not None:
+                timer.waited(self.rate_limiter.acquire(messages))
+            for chunk in self._client.chat(
                 model=self.model,
                 messages=messages,
-                options={"temperature": 0.2, "num_ctx": 2048},
-            ),
+                options=self._options_for(messages),
+                keep_alive=self.keep_alive,
+                stream=True,
+            ):
+                piece = extract_stream_piece(chunk, "chat")
+                if piece:
+                    timer.first_token()
+                    yield piece
+                else:
+                    _record_stats(timer, chunk)
+        except (Exception, GeneratorExit) as e:  # GeneratorExit: the consumer stopped reading
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    def warm(self) -> float | None:
+        """Load the model with an empty chat and refresh keep_alive; returns load seconds."""
+        timer = CallTimer(self.observers, "ollama", self.model, "warm")
+        error: Exception | None = None
+        try:
+            resp = self._client.chat(
+                model=self.model,
+                messages=[],
+                options=self._options_for(None),
+                keep_alive=self.keep_alive,
+            )
+            _record_stats(timer, resp)
+            return timer.load_s
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    def start_keeper(self, interval_s: float | None = None) -> None:
+        """Re-warm from a daemon thread every `interval_s` until close(): model stays loaded."""
+        if self._keeper is not None:
+            return
+        interval = interval_s or _keeper_interval_s(self.keep_alive)
+        self._keeper = threading.Thread(
+            target=self._keep_loop, args=(interval,), name="llm-lab-ollama-keeper", daemon=True
         )
-        return resp["message"]["content"]
+        self._keeper.start()
+
+    def _keep_loop(self, interval_s: float) -> None:
+        while not self._keeper_stop.wait(interval_s):
+            try:
+                self.warm()
+            except Exception as e:
+                log.warning(
+                    "ollama keeper: warm-up of %s on %s failed: %s", self.model, self.host, e
+                )
+
+    def _options_for(self, messages: list[Message] | None) -> dict[str, Any]:
+        options = _call_options(self.options, self.context_sizer, messages, self._num_ctx)
+        if messages is not None and self.context_sizer is not None:
+            self._num_ctx = options["num_ctx"]
+        return options
+
+    def ping(self) -> None:
+        """GET /api/tags; raises if the host is unreachable or unhealthy."""
+        self._client.list()
+
+    def close(self) -> None:
+        self._keeper_stop.set()
+        if self._keeper is not None:
+            self._keeper.join()
+        if self._owns_transport:
+            self._transport.close()
+
+    def __enter__(self) -> OllamaClient:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class AsyncOllamaClient:
+    def __init__(
+        self,
+        model: str = "mistral",
+        host: str | None = None,
+        *,
+        options: Mapping[str, Any] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        limits: PoolLimits | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        observers: Sequence[Observer] = (),
+        keep_alive: float | str | None = None,
+        context_sizer: ContextSizer | None = None,
+    ) -> None:
+        self.model = model
+        self.host = host or default_ollama_host()
+        self.options: dict[str, Any] = {**DEFAULT_OPTIONS, **(options or {})}
+        self.rate_limiter = rate_limiter
+        self.observers = tuple(observers)
+        # None = server default (OLLAMA_KEEP_ALIVE, 5m); "30m", 1800, -1 = keep loaded forever
+        self.keep_alive = keep_alive
+        # Per-call num_ctx from a ladder instead of the fixed options["num_ctx"].
+        self.context_sizer = context_sizer
+        self._num_ctx: int | None = None  # last sized num_ctx sent, kept by warm()
+        self._transport = transport or (limits or PoolLimits()).async_transport()
+        self._owns_transport = transport is None
+        self._client = AsyncClient(host=self.host, transport=self._transport)
+        self._keeper: asyncio.Task[None] | None = None
+
+    async def generate(self, messages: list[Message]) -> str:
+        timer = CallTimer(self.observers, "ollama", self.model, "generate")
+        error: Exception | None = None
+        try:
+            if self.rate_limiter is not None:
+                timer.waited(await self.rate_limiter.acquire_async(messages))
+            resp = cast(
+                OllamaChatResponse,
+                await self._client.chat(
+                    model=self.model,
+                    messages=messages,
+                    options=self._options_for(messages),
+                    keep_alive=self.keep_alive,
+                ),
+            )
+            _record_stats(timer, resp)
+            return resp["message"]["content"]
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        timer = CallTimer(self.observers, "ollama", self.model, "stream")
+        error: BaseException | None = None
+        try:
+            if self.rate_limiter is not None:
+                timer.waited(await self.rate_limiter.acquire_async(messages))
+            chunks = await self._client.chat(
+                model=self.model,
+                messages=messages,
+                options=self._options_for(messages),
+                keep_alive=self.keep_alive,
+                stream=True,
+            )
+            async for chunk in chunks:
+                piece = extract_stream_piece(chunk, "chat")
+                if piece:
+                    timer.first_token()
+                    yield piece
+                else:
+                    _record_stats(timer, chunk)
+        except (
+            Exception,
+            GeneratorExit,
+            asyncio.CancelledError,
+        ) as e:  # GeneratorExit: the consumer stopped reading
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    async def warm(self) -> float | None:
+        timer = CallTimer(self.observers, "ollama", self.model, "warm")
+        error: Exception | None = None
+        try:
+            resp = await self._client.chat(
+                model=self.model,
+                messages=[],
+                options=self._options_for(None),
+                keep_alive=self.keep_alive,
+            )
+            _record_stats(timer, resp)
+            return timer.load_s
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    def start_keeper(self, interval_s: float | None = None) -> None:
+        """Re-warm from a task on the running loop until aclose()."""
+        if self._keeper is None:
+            interval = interval_s or _keeper_interval_s(self.keep_alive)
+            self._keeper = asyncio.get_running_loop().create_task(self._keep_loop(interval))
+
+    async def _keep_loop(self, interval_s: float) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await self.warm()
+            except Exception as e:
+                log.warning(
+                    "ollama keeper: warm-up of %s on %s failed: %s", self.model, self.host, e
+                )
+
+    def _options_for(self, messages: list[Message] | None) -> dict[str, Any]:
+        options = _call_options(self.options, self.context_sizer, messages, self._num_ctx)
+        if messages is not None and self.context_sizer is not None:
+            self._num_ctx = options["num_ctx"]
+        return options
+
+    async def aclose(self) -> None:
+        if self._keeper is not None:
+            self._keeper.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._keeper
+        if self._owns_transport:
+            await self._transport.aclose()
+
+    async def __aenter__(self) -> AsyncOllamaClient:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+
+class OllamaEmbedder:
+    """Embeddings via POST /api/embed, many texts per request.
+
+    Inputs are split into batches of at most `max_batch` texts and about
+    `max_batch_tokens` estimated tokens; a batch the server rejects with 413 is
+    halved and retried. Over-long texts are truncated to the model's context.
+    """
+
+    def __init__(
+        self,
+        model: str = DEFAULT_EMBED_MODEL,
+        host: str | None = None,
+        *,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        limits: PoolLimits | None = None,
+        transport: httpx.BaseTransport | None = None,
+        observers: Sequence[Observer] = (),
+        keep_alive: float | str | None = None,
+    ) -> None:
+        self.model = model
+        self.host = host or default_ollama_host()
+        self.max_batch = max_batch
+        self.max_batch_tokens = max_batch_tokens
+        self.observers = tuple(observers)
+        self.keep_alive = keep_alive
+        self._transport = transport or (limits or PoolLimits()).transport()
+        self._owns_transport = transport is None
+        self._client = Client(host=self.host, transport=self._transport)
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        return embed_batched(
+            self._embed_batch, texts, max_items=self.max_batch, max_tokens=self.max_batch_tokens
+        )
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        timer = CallTimer(self.observers, "ollama", self.model, "embed")
+        error: Exception | None = None
+        try:
+            resp = cast(
+                OllamaEmbedResponse,
+                self._client.embed(
+                    model=self.model, input=batch, truncate=True, keep_alive=self.keep_alive
+                ),
+            )
+            _record_stats(timer, resp)
+            return resp["embeddings"]
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    def close(self) -> None:
+        if self._owns_transport:
+            self._transport.close()
+
+    def __enter__(self) -> OllamaEmbedder:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class AsyncOllamaEmbedder:
+    def __init__(
+        self,
+        model: str = DEFAULT_EMBED_MODEL,
+        host: str | None = None,
+        *,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        limits: PoolLimits | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        observers: Sequence[Observer] = (),
+        keep_alive: float | str | None = None,
+    ) -> None:
+        self.model = model
+        self.host = host or default_ollama_host()
+        self.max_batch = max_batch
+        self.max_batch_tokens = max_batch_tokens
+        self.observers = tuple(observers)
+        self.keep_alive = keep_alive
+        self._transport = transport or (limits or PoolLimits()).async_transport()
+        self._owns_transport = transport is None
+        self._client = AsyncClient(host=self.host, transport=self._transport)
+
+    async def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        return await aembed_batched(
+            self._embed_batch, texts, max_items=self.max_batch, max_tokens=self.max_batch_tokens
+        )
+
+    async def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        timer = CallTimer(self.observers, "ollama", self.model, "embed")
+        error: Exception | None = None
+        try:
+            resp = cast(
+                OllamaEmbedResponse,
+                await self._client.embed(
+                    model=self.model, input=batch, truncate=True, keep_alive=self.keep_alive
+                ),
+            )
+            _record_stats(timer, resp)
+            return resp["embeddings"]
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    async def aclose(self) -> None:
+        if self._owns_transport:
+            await self._transport.aclose()
+
+    async def __aenter__(self) -> AsyncOllamaEmbedder:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+
+def _record_stats(timer: CallTimer, resp: Any) -> None:
+    # Ollama reports its own token counts and timings; prefer them over client-side estimates.
+    stats = extract_stats(resp)
+    if not stats:
+        return
+    timer.prompt_tokens = stats.get("prompt_eval_count", timer.prompt_tokens)
+    timer.completion_tokens = stats.get("eval_count", timer.completion_tokens)
+    if "eval_duration" in stats:
+        timer.generation_s = stats["eval_duration"] / 1e9
+    if "load_duration" in stats:
+        timer.load_s = stats["load_duration"] / 1e9
+
+
+def _call_options(
+    options: dict[str, Any],
+    sizer: ContextSizer | None,
+    messages: list[Message] | None,
+    last_num_ctx: int | None = None,
+) -> dict[str, Any]:
+    if sizer is None:
+        return options
+    if messages is None:
+        # warm() and the keeper: keep the runner at the size the last call loaded
+        # (before any, the one short requests use), or the next call would reload
+        # it just to change num_ctx.
+        return {**options, "num_ctx": last_num_ctx or sizer.ladder[0]}
+    num_predict = options.get("num_predict")
+    max_output = num_predict if isinstance(num_predict, int) else None
+    return {**options, "num_ctx": sizer.num_ctx(messages, max_output)}
+
+
+def _keeper_interval_s(keep_alive: float | str | None) -> float:
+    # Refresh at half the residency window; the server default keep_alive is 5 minutes.
+    seconds = keep_alive_seconds(keep_alive)
+    if seconds is None:
+        seconds = 300.0
+    if seconds == float("inf"):
+        return DEFAULT_KEEPER_INTERVAL_S
+    return max(1.0, seconds / 2)
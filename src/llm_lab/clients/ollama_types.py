@@ -15,3 +15,21 @@ class OllamaChatResponse(TypedDict):
     model: NotRequired[str]
     created_at: NotRequired[str]
     done: NotRequired[bool]
+    done_reason: NotRequired[str]
+
+    # счётчики сервера (только в финальном чанке); длительности в наносекундах
+    total_duration: NotRequired[int]
+    load_duration: NotRequired[int]
+    prompt_eval_count: NotRequired[int]
+    prompt_eval_duration: NotRequired[int]
+    eval_count: NotRequired[int]
+    eval_duration: NotRequired[int]
+
+
+class OllamaEmbedResponse(TypedDict):
+    embeddings: list[list[float]]
+
+    model: NotRequired[str]
+    total_duration: NotRequired[int]
+    load_duration: NotRequired[int]
+    prompt_eval_count: NotRequired[int]
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
-from .openai_client import OpenAIClient
+from .openai_client import AsyncOpenAIClient, AsyncOpenAIEmbedder, OpenAIClient, OpenAIEmbedder
 
 __all__ = [
     "OpenAIClient",
+    "AsyncOpenAIClient",
+    "OpenAIEmbedder",
+    "AsyncOpenAIEmbedder",
 ]
@@ -1,10 +1,27 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import base64
+import io
+import sys
+from array import array
+from collections.abc import AsyncIterator, Iterator, Sequence
+from dataclasses import dataclass, field
+from types import TracebackType
 from typing import Any
 
 import httpx
 
+from llm_lab.clients.pool import PoolLimits
+from llm_lab.embeddings import (
+    DEFAULT_MAX_BATCH,
+    DEFAULT_MAX_BATCH_TOKENS,
+    aembed_batched,
+    embed_batched,
+)
+from llm_lab.json_codec import JsonBackend, JsonCodec, ResponseBody, Usage, get_codec
+from llm_lab.observe import CallTimer, Observer
+from llm_lab.ratelimit import RateLimiter
 from llm_lab.types import Message
 
 
@@ -14,45 +31,563 @@ class OpenAIClient:
     model: str
     base_url: str = "https://api.openai.com"
     timeout_s: float = 60.0
-    _http: httpx.Client | None = None  # DI for tests
+    limits: PoolLimits = PoolLimits()
+    rate_limiter: RateLimiter | None = None
+    observers: tuple[Observer, ...] = ()
+    json_backend: JsonBackend = "auto"
+    _http: httpx.Client | None = None  # DI for tests / shared HttpPool
+
+    # One keep-alive httpx.Client per OpenAIClient, closed with it. An HttpPool
+    # client borrows the shared transport, so closing it leaves the pool intact.
+    _conn: httpx.Client = field(init=False, repr=False, compare=False)
+    _codec: JsonCodec = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        conn = self._http or httpx.Client(
+            timeout=self.timeout_s,
+            transport=self.limits.transport(),
+        )
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_codec", get_codec(self.json_backend))
 
     def generate(self, messages: list[Message]) -> str:
-        url = f"{self.base_url.rstrip('/')}/v1/responses"
-        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        timer = CallTimer(self.observers, "openai", self.model, "generate")
+        error: Exception | None = None
+        try:
+            if self.rate_limiter is not None:
+                timer.waited(self.rate_limiter.acquire(messages))
+            # Streamed even here: the text is decoded as it arrives instead of
+            # materializing the whole body and then walking its `output` array.
+            with self._conn.stream(
+                "POST",
+                _responses_url(self.base_url),
+                headers=_headers(self.api_key),
+                content=self._codec.dumps({"model": self.model, "input": messages, "stream": True}),
+                extensions={"trace": timer.trace} if self.observers else None,
+            ) as resp:
+                if resp.is_error or not _is_event_stream(resp):
+                    resp.read()
+                resp.raise_for_status()
+                if not _is_event_stream(resp):  # a proxy that ignores "stream"
+                    body = _non_stream_body(self._codec, resp)
+                    _record_usage(timer, body.usage)
+                    return _output_text(body)
+                text = _ResponseText(timer, self._codec)
+                parser = _SSEParser()
+                for chunk in resp.iter_bytes():
+                    for event, payload in parser.feed(chunk):
+                        text.add(event, payload)
+                for event, payload in parser.close():
+                    text.add(event, payload)
+                return text.result().strip()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        timer = CallTimer(self.observers, "openai", self.model, "stream")
+        error: BaseException | None = None
+        try:
+            if self.rate_limiter is not None:
+                timer.waited(self.rate_limiter.acquire(messages))
+            with self._conn.stream(
+                "POST",
+                _responses_url(self.base_url),
+                headers=_headers(self.api_key),
+                content=self._codec.dumps({"model": self.model, "input": messages, "stream": True}),
+                extensions={"trace": timer.trace} if self.observers else None,
+            ) as resp:
+                if resp.is_error or not _is_event_stream(resp):
+                    resp.read()  # keep the error body available to callers
+                resp.raise_for_status()
+                if not _is_event_stream(resp):
+                    body = _non_stream_body(self._codec, resp)
+                    _record_usage(timer, body.usage)
+                    timer.first_token()
+                    yield _output_text(body)
+                    return
+                text = _ResponseText(timer, self._codec)
+                parser = _SSEParser()
+                for chunk in resp.iter_bytes():
+                    for event, data in parser.feed(chunk):
+                        piece = text.add(event, data)
+                        if piece:
+                            yield piece
+                for event, data in parser.close():
+                    piece = text.add(event, data)
+                    if piece:
+                        yield piece
+                text.result()  # same end-of-stream checks as generate()
+        except (Exception, GeneratorExit) as e:  # GeneratorExit: the consumer stopped reading
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> OpenAIClient:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+@dataclass(frozen=True, slots=True)
+class AsyncOpenAIClient:
+    api_key: str
+    model: str
+    base_url: str = "https://api.openai.com"
+    timeout_s: float = 60.0
+    limits: PoolLimits = PoolLimits()
+    rate_limiter: RateLimiter | None = None
+    observers: tuple[Observer, ...] = ()
+    json_backend: JsonBackend = "auto"
+    _http: httpx.AsyncClient | None = None  # DI for tests / shared HttpPool
+
+    _conn: httpx.AsyncClient = field(init=False, repr=False, compare=False)
+    _codec: JsonCodec = field(init=False, repr=False, compare=False)
 
-        client = self._http or httpx.Client(timeout=self.timeout_s)
+    def __post_init__(self) -> None:
+        conn = self._http or httpx.AsyncClient(
+            timeout=self.timeout_s,
+            transport=self.limits.async_transport(),
+        )
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_codec", get_codec(self.json_backend))
+
+    async def generate(self, messages: list[Message]) -> str:
+        timer = CallTimer(self.observers, "openai", self.model, "generate")
+        error: Exception | None = None
+        try:
+            if self.rate_limiter is not None:
+                timer.waited(await self.rate_limiter.acquire_async(messages))
+            async with self._conn.stream(
+                "POST",
+                _responses_url(self.base_url),
+                headers=_headers(self.api_key),
+                content=self._codec.dumps({"model": self.model, "input": messages, "stream": True}),
+                extensions={"trace": timer.atrace} if self.observers else None,
+            ) as resp:
+                if resp.is_error or not _is_event_stream(resp):
+                    await resp.aread()
+                resp.raise_for_status()
+                if not _is_event_stream(resp):
+                    body = _non_stream_body(self._codec, resp)
+                    _record_usage(timer, body.usage)
+                    return _output_text(body)
+                text = _ResponseText(timer, self._codec)
+                parser = _SSEParser()
+                async for chunk in resp.aiter_bytes():
+                    for event, payload in parser.feed(chunk):
+                        text.add(event, payload)
+                for event, payload in parser.close():
+                    text.add(event, payload)
+                return text.result().strip()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        timer = CallTimer(self.observers, "openai", self.model, "stream")
+        error: BaseException | None = None
         try:
-            resp = client.post(url, headers=headers, json={"model": self.model, "input": messages})
+            if self.rate_limiter is not None:
+                timer.waited(await self.rate_limiter.acquire_async(messages))
+            async with self._conn.stream(
+                "POST",
+                _responses_url(self.base_url),
+                headers=_headers(self.api_key),
+                content=self._codec.dumps({"model": self.model, "input": messages, "stream": True}),
+                extensions={"trace": timer.atrace} if self.observers else None,
+            ) as resp:
+                if resp.is_error or not _is_event_stream(resp):
+                    await resp.aread()
+                resp.raise_for_status()
+                if not _is_event_stream(resp):
+                    body = _non_stream_body(self._codec, resp)
+                    _record_usage(timer, body.usage)
+                    timer.first_token()
+                    yield _output_text(body)
+                    return
+                text = _ResponseText(timer, self._codec)
+                parser = _SSEParser()
+                async for chunk in resp.aiter_bytes():
+                    for event, data in parser.feed(chunk):
+                        piece = text.add(event, data)
+                        if piece:
+                            yield piece
+                for event, data in parser.close():
+                    piece = text.add(event, data)
+                    if piece:
+                        yield piece
+                text.result()
+        except (
+            Exception,
+            GeneratorExit,
+            asyncio.CancelledError,
+        ) as e:  # GeneratorExit: the consumer stopped reading
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    async def aclose(self) -> None:
+        await self._conn.aclose()
+
+    async def __aenter__(self) -> AsyncOpenAIClient:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+
+@dataclass(frozen=True, slots=True)
+class OpenAIEmbedder:
+    """Embeddings via POST /v1/embeddings, many texts per request.
+
+    Inputs are split into batches of at most `max_batch` texts and about
+    `max_batch_tokens` estimated tokens (the API allows 2048 inputs per request);
+    a batch rejected with 413 is halved and retried. Vectors are requested as
+    base64 float32, which is smaller on the wire than JSON numbers and decoded
+    without parsing a float per component.
+    """
+
+    api_key: str
+    model: str = "text-embedding-3-small"
+    base_url: str = "https://api.openai.com"
+    timeout_s: float = 60.0
+    max_batch: int = DEFAULT_MAX_BATCH
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS
+    limits: PoolLimits = PoolLimits()
+    observers: tuple[Observer, ...] = ()
+    json_backend: JsonBackend = "auto"
+    _http: httpx.Client | None = None
+
+    _conn: httpx.Client = field(init=False, repr=False, compare=False)
+    _codec: JsonCodec = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        conn = self._http or httpx.Client(
+            timeout=self.timeout_s,
+            transport=self.limits.transport(),
+        )
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_codec", get_codec(self.json_backend))
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        return embed_batched(
+            self._embed_batch, texts, max_items=self.max_batch, max_tokens=self.max_batch_tokens
+        )
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        timer = CallTimer(self.observers, "openai", self.model, "embed")
+        error: Exception | None = None
+        try:
+            resp = self._conn.post(
+                _embeddings_url(self.base_url),
+                headers=_headers(self.api_key),
+                content=self._codec.dumps(_embeddings_body(self.model, batch)),
+                extensions={"trace": timer.trace} if self.observers else None,
+            )
             resp.raise_for_status()
-            data: dict[str, Any] = resp.json()
+            return _extract_embeddings(timer, self._codec.loads(resp.content), len(batch))
+        except Exception as e:
+            error = e
+            raise
         finally:
-            if self._http is None:
-                client.close()
+            timer.finish(error)
 
-        return _extract_output_text(data)
+    def close(self) -> None:
+        self._conn.close()
 
+    def __enter__(self) -> OpenAIEmbedder:
+        return self
 
-def _extract_output_text(data: dict[str, Any]) -> str:
-    out = data.get("output")
-    if not isinstance(out, list):
-        raise ValueError("OpenAI response: missing 'output' array")
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+@dataclass(frozen=True, slots=True)
+class AsyncOpenAIEmbedder:
+    api_key: str
+    model: str = "text-embedding-3-small"
+    base_url: str = "https://api.openai.com"
+    timeout_s: float = 60.0
+    max_batch: int = DEFAULT_MAX_BATCH
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS
+    limits: PoolLimits = PoolLimits()
+    observers: tuple[Observer, ...] = ()
+    json_backend: JsonBackend = "auto"
+    _http: httpx.AsyncClient | None = None
+
+    _conn: httpx.AsyncClient = field(init=False, repr=False, compare=False)
+    _codec: JsonCodec = field(init=False, repr=False, compare=False)
 
-    chunks: list[str] = []
-    for item in out:
-        if not isinstance(item, dict):
-            continue
-        if item.get("type") != "message" or item.get("role") != "assistant":
-            continue
-        content = item.get("content")
-        if not isinstance(content, list):
-            continue
-        for c in content:
-            if isinstance(c, dict) and c.get("type") == "output_text":
-                text = c.get("text")
-                if isinstance(text, str):
-                    chunks.append(text)
-
-    text = "".join(chunks).strip()
+    def __post_init__(self) -> None:
+        conn = self._http or httpx.AsyncClient(
+            timeout=self.timeout_s,
+            transport=self.limits.async_transport(),
+        )
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_codec", get_codec(self.json_backend))
+
+    async def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        return await aembed_batched(
+            self._embed_batch, texts, max_items=self.max_batch, max_tokens=self.max_batch_tokens
+        )
+
+    async def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        timer = CallTimer(self.observers, "openai", self.model, "embed")
+        error: Exception | None = None
+        try:
+            resp = await self._conn.post(
+                _embeddings_url(self.base_url),
+                headers=_headers(self.api_key),
+                content=self._codec.dumps(_embeddings_body(self.model, batch)),
+                extensions={"trace": timer.atrace} if self.observers else None,
+            )
+            resp.raise_for_status()
+            return _extract_embeddings(timer, self._codec.loads(resp.content), len(batch))
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timer.finish(error)
+
+    async def aclose(self) -> None:
+        await self._conn.aclose()
+
+    async def __aenter__(self) -> AsyncOpenAIEmbedder:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+
+def _responses_url(base_url: str) -> str:
+    return f"{base_url.rstrip('/')}/v1/responses"
+
+
+def _headers(api_key: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+
+def _embeddings_url(base_url: str) -> str:
+    return f"{base_url.rstrip('/')}/v1/embeddings"
+
+
+def _embeddings_body(model: str, batch: list[str]) -> dict[str, Any]:
+    return {"model": model, "input": batch, "encoding_format": "base64"}
+
+
+def _extract_embeddings(timer: CallTimer, data: dict[str, Any], expected: int) -> list[list[float]]:
+    items = data.get("data")
+    if not isinstance(items, list):
+        raise ValueError("OpenAI embeddings response: missing 'data' array")
+    if len(items) != expected:
+        raise ValueError(
+            f"OpenAI embeddings response: {len(items)} embeddings for {expected} inputs"
+        )
+    usage = data.get("usage")
+    if isinstance(usage, dict) and isinstance(usage.get("prompt_tokens"), int):
+        timer.prompt_tokens = usage["prompt_tokens"]
+    vectors: list[list[float] | None] = [None] * expected
+    for pos, item in enumerate(items):
+        index = item.get("index", pos) if isinstance(item, dict) else None
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < expected:
+            raise ValueError(f"OpenAI embeddings response: bad index {index!r} at item {pos}")
+        if vectors[index] is not None:
+            raise ValueError(f"OpenAI embeddings response: duplicate index {index}")
+        vectors[index] = _decode_embedding(item.get("embedding"))
+    # Every index is distinct and in range, so all slots are filled.
+    return [v for v in vectors if v is not None]
+
+
+def _decode_embedding(value: Any) -> list[float]:
+    if isinstance(value, list):  # compatible servers may ignore encoding_format
+        floats: list[float] = value
+        return floats
+    if not isinstance(value, str):
+        raise ValueError("OpenAI embeddings response: missing 'embedding'")
+    vec = array("f", base64.b64decode(value))  # little-endian float32
+    if sys.byteorder == "big":
+        vec.byteswap()
+    return vec.tolist()
+
+
+def _media_type(resp: httpx.Response) -> str:
+    ctype: str = resp.headers.get("content-type", "")
+    return ctype.partition(";")[0].strip().lower()
+
+
+def _is_event_stream(resp: httpx.Response) -> bool:
+    return _media_type(resp) == "text/event-stream"
+
+
+def _non_stream_body(codec: JsonCodec, resp: httpx.Response) -> ResponseBody:
+    """A 2xx reply that is not SSE: a JSON response object (a proxy that ignores
+    "stream"), or a clear error for anything else, e.g. an HTML error page."""
+    ctype = _media_type(resp)
+    snippet = resp.text[:200].strip()
+    if ctype and ctype != "application/json" and not ctype.endswith("+json"):
+        raise ValueError(f"OpenAI response: unexpected content-type {ctype!r}: {snippet}")
+    try:
+        return codec.response(resp.content)
+    except ValueError as e:
+        raise ValueError(f"OpenAI response: body is not JSON: {snippet}") from e
+
+
+class _SSEParser:
+    """Incremental server-sent-events decoder over raw bytes.
+
+    Network chunks are appended to one buffer and every byte is searched for a
+    newline once: a line split over many chunks is never re-scanned from its start,
+    and consumed lines are cut off in one step per feed(). Returns (event, data)
+    for each complete frame.
+    """
+
+    __slots__ = ("_buf", "_event", "_data")
+
+    def __init__(self) -> None:
+        self._buf = bytearray()  # holds only the unfinished last line between feeds
+        self._event = ""
+        self._data: list[str] = []
+
+    def feed(self, chunk: bytes) -> list[tuple[str, str]]:
+        buf = self._buf
+        scan = len(buf)  # what is already buffered has no newline: search only the new bytes
+        buf += chunk
+        frames: list[tuple[str, str]] = []
+        start = 0
+        while (nl := buf.find(b"\n", scan)) >= 0:
+            end = nl - 1 if nl > start and buf[nl - 1] == 0x0D else nl  # CRLF
+            self._line(bytes(buf[start:end]), frames)
+            start = scan = nl + 1
+        if start:
+            del buf[:start]
+        return frames
+
+    def close(self) -> list[tuple[str, str]]:
+        """Flush a last frame the server did not terminate with a blank line."""
+        frames: list[tuple[str, str]] = []
+        if self._buf:
+            self._line(bytes(self._buf.rstrip(b"\r")), frames)
+            self._buf.clear()
+        self._line(b"", frames)
+        return frames
+
+    def _line(self, line: bytes, frames: list[tuple[str, str]]) -> None:
+        if not line:
+            if self._data:
+                frames.append((self._event, "\n".join(self._data)))
+            self._event, self._data = "", []
+            return
+        if line.startswith(b":"):  # comment / keep-alive
+            return
+        name, _, value = line.partition(b":")
+        if value.startswith(b" "):
+            value = value[1:]
+        if name == b"event":
+            self._event = value.decode("utf-8")
+        elif name == b"data":
+            self._data.append(value.decode("utf-8"))
+
+
+class _ResponseText:
+    """Final text of a streamed response, accumulated in a single buffer."""
+
+    __slots__ = ("_timer", "_codec", "_buf", "_completed")
+
+    def __init__(self, timer: CallTimer, codec: JsonCodec) -> None:
+        self._timer = timer
+        self._codec = codec
+        self._buf = io.StringIO()
+        self._completed: ResponseBody | None = None
+
+    def add(self, event: str, data: str) -> str:
+        piece, completed = _stream_event(self._timer, self._codec, event, data)
+        if piece:
+            self._buf.write(piece)
+        if completed is not None:
+            self._completed = completed
+        return piece
+
+    def result(self) -> str:
+        """Streamed text, checked like _output_text checks a full response."""
+        text = self._buf.getvalue()
+        if not text and self._completed is not None:
+            # No deltas: fall back to the final response object.
+            return _output_text(self._completed)
+        if self._completed is None and not text:
+            raise ValueError("OpenAI response: missing 'output' array")
+        if not text.strip():
+            raise ValueError("OpenAI response: empty output_text")
+        return text
+
+
+def _stream_event(
+    timer: CallTimer, codec: JsonCodec, event: str, data: str
+) -> tuple[str, ResponseBody | None]:
+    """Delta text of one event, plus the final response object on response.completed."""
+    if data == "[DONE]":
+        return "", None
+    e = codec.event(data)
+    kind = e.type or event
+    if kind == "response.output_text.delta":
+        if e.delta:
+            timer.first_token()
+            return e.delta, None
+        return "", None
+    if kind in ("error", "response.failed"):
+        err = e.error or (e.response.error if e.response else None) or e.message or data
+        raise ValueError(f"OpenAI stream error: {err}")
+    if kind == "response.completed" and e.response is not None:
+        _record_usage(timer, e.response.usage)
+        return "", e.response
+    return "", None
+
+
+def _record_usage(timer: CallTimer, usage: Usage | None) -> None:
+    if usage is None:
+        return
+    if usage.input_tokens is not None:
+        timer.prompt_tokens = usage.input_tokens
+    if usage.output_tokens is not None:
+        timer.completion_tokens = usage.output_tokens
+    if usage.cached_tokens is not None:  # prompt caching hits
+        timer.cached_tokens = usage.cached_tokens
+
+
+def _output_text(body: ResponseBody) -> str:
+    if body.texts is None:
+        raise ValueError("OpenAI response: missing 'output' array")
+    text = "".join(body.texts).strip()
     if not text:
         raise ValueError("OpenAI response: empty output_text")
     return text
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from types import TracebackType
+
+import httpx
+
+
+@dataclass(frozen=True, slots=True)
+class PoolLimits:
+    """Connection-pool knobs shared by every HTTP-based client."""
+
+    max_connections: int | None = 100
+    max_keepalive_connections: int | None = 20
+    keepalive_expiry_s: float | None = 5.0
+    http2: bool = False
+
+    def to_httpx(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry_s,
+        )
+
+    def transport(self) -> httpx.HTTPTransport:
+        # http2=True requires the optional `h2` package (pip install "llm-lab[http2]")
+        return httpx.HTTPTransport(limits=self.to_httpx(), http2=self.http2)
+
+    def async_transport(self) -> httpx.AsyncHTTPTransport:
+        return httpx.AsyncHTTPTransport(limits=self.to_httpx(), http2=self.http2)
+
+
+class _BorrowedTransport(httpx.BaseTransport):
+    # Closing a borrowing httpx.Client must not tear down the shared pool.
+    def __init__(self, inner: httpx.BaseTransport) -> None:
+        self._inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._inner.handle_request(request)
+
+    def close(self) -> None:
+        pass
+
+
+class _BorrowedAsyncTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport) -> None:
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpPool:
+    """Keep-alive transports keyed by base URL; owns their lifecycle.
+
+    Async transports are bound to the event loop that first used them, so an
+    HttpPool holding them should live inside that loop and be closed with aclose().
+    """
+
+    def __init__(self, limits: PoolLimits | None = None) -> None:
+        self.limits = limits or PoolLimits()
+        self._transports: dict[str, httpx.HTTPTransport] = {}
+        self._async_transports: dict[str, httpx.AsyncHTTPTransport] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def transport(self, base_url: str) -> httpx.BaseTransport:
+        """Non-closing handle to the transport shared by `base_url`."""
+        key = _pool_key(base_url)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("HttpPool is closed")
+            t = self._transports.get(key)
+            if t is None:
+                t = self.limits.transport()
+                self._transports[key] = t
+        return _BorrowedTransport(t)
+
+    def async_transport(self, base_url: str) -> httpx.AsyncBaseTransport:
+        key = _pool_key(base_url)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("HttpPool is closed")
+            t = self._async_transports.get(key)
+            if t is None:
+                t = self.limits.async_transport()
+                self._async_transports[key] = t
+        return _BorrowedAsyncTransport(t)
+
+    def client(self, base_url: str, *, timeout: float) -> httpx.Client:
+        return httpx.Client(transport=self.transport(base_url), timeout=timeout)
+
+    def async_client(self, base_url: str, *, timeout: float) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=self.async_transport(base_url), timeout=timeout)
+
+    def close(self) -> None:
+        """Close sync transports; use aclose() if async ones were handed out."""
+        with self._lock:
+            self._closed = True
+            transports = list(self._transports.values())
+            self._transports.clear()
+        for t in transports:
+            t.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        with self._lock:
+            transports = list(self._async_transports.values())
+            self._async_transports.clear()
+        for t in transports:
+            await t.aclose()
+
+    def __enter__(self) -> HttpPool:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    async def __aenter__(self) -> HttpPool:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+
+def _pool_key(base_url: str) -> str:
+    return base_url.strip().rstrip("/").lower()
+
+
+_SHARED: dict[PoolLimits, HttpPool] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_pool(limits: PoolLimits) -> HttpPool:
+    """Process-wide pool for `limits` (used by LLMFactory)."""
+    with _SHARED_LOCK:
+        pool = _SHARED.get(limits)
+        if pool is None or pool._closed:
+            pool = HttpPool(limits)
+            _SHARED[limits] = pool
+        return pool
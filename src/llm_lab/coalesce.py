@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import threading
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+
+from .cache import cache_key, client_namespace
+from .contracts import AsyncLLMClient, LLMClient, iter_stream
+from .types import Message
+
+
+@dataclass(slots=True)
+class CoalesceStats:
+    calls: int = 0
+    coalesced: int = 0  # calls that joined an identical in-flight request
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.coalesced / self.calls if self.calls else 0.0
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = ""
+        self.error: BaseException | None = None
+
+
+class _Broadcast:
+    """One upstream stream replayed to every subscriber.
+
+    Chunks are appended to a shared buffer. A subscriber that has read everything
+    pulls the next chunk itself under `pull`, so whoever is still reading keeps the
+    upstream moving even if the caller that started it has gone away.
+    """
+
+    __slots__ = ("source", "chunks", "done", "error", "subscribers", "pull")
+
+    def __init__(self, source: Iterator[str]) -> None:
+        self.source = source
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 1
+        self.pull = threading.Lock()
+
+    def advance(self, seen: int) -> None:
+        with self.pull:
+            if self.done or len(self.chunks) > seen:
+                return  # another subscriber got there first
+            try:
+                self.chunks.append(next(self.source))
+            except StopIteration:
+                self.done = True
+            except Exception as e:
+                self.error = e
+                self.done = True
+
+
+class CoalescingClient:
+    """Single-flight wrapper: identical concurrent requests share one upstream call.
+
+    Requests are identical when provider/model/options and the normalized messages
+    hash to the same key (see `cache_key`). Unlike CachedLLMClient nothing outlives
+    the call: a request arriving after completion goes upstream again. Streams are
+    multicast; a subscriber that joins late first gets the chunks it missed.
+    """
+
+    def __init__(self, inner: LLMClient, *, provider: str | None = None) -> None:
+        self._inner = inner
+        self.namespace = client_namespace(inner, provider)
+        self.model = getattr(inner, "model", None)
+        self.options = getattr(inner, "options", None)
+        self.stats = CoalesceStats()
+        self._calls: dict[str, _Call] = {}
+        self._streams: dict[str, _Broadcast] = {}
+        self._lock = threading.Lock()
+
+    def key(self, messages: list[Message]) -> str:
+        return cache_key(self.namespace, messages)
+
+    def generate(self, messages: list[Message]) -> str:
+        key = self.key(messages)
+        with self._lock:
+            self.stats.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                self.stats.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._inner.generate(messages)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        key = self.key(messages)
+        with self._lock:
+            self.stats.calls += 1
+            b = self._streams.get(key)
+            if b is None:
+                b = self._streams[key] = _Broadcast(iter_stream(self._inner, messages))
+            else:
+                b.subscribers += 1
+                self.stats.coalesced += 1
+
+        seen = 0
+        try:
+            while True:
+                if seen < len(b.chunks):
+                    seen += 1
+                    yield b.chunks[seen - 1]
+                    continue
+                if b.done:
+                    break
+                b.advance(seen)
+            if b.error is not None:
+                raise b.error
+        finally:
+            self._leave(key, b)
+
+    def _leave(self, key: str, b: _Broadcast) -> None:
+        with self._lock:
+            b.subscribers -= 1
+            last = b.subscribers == 0
+            if (b.done or last) and self._streams.get(key) is b:
+                del self._streams[key]
+        if last and not b.done:
+            # Everyone stopped reading: stop generating too.
+            with b.pull:
+                b.done = True
+                close = getattr(b.source, "close", None)
+                if close is not None:
+                    close()
+
+
+class _AsyncBroadcast:
+    # The next chunk is fetched by a shielded task that every waiting subscriber
+    # awaits, so cancelling one subscriber never tears the upstream stream for the rest.
+
+    __slots__ = ("source", "chunks", "done", "error", "subscribers", "pending")
+
+    def __init__(self, source: AsyncIterator[str]) -> None:
+        self.source = source
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 1
+        self.pending: asyncio.Future[tuple[bool, str]] | None = None
+
+    async def advance(self) -> None:
+        if self.pending is None:
+            self.pending = asyncio.ensure_future(_next(self.source))
+        pending = self.pending
+        try:
+            more, piece = await asyncio.shield(pending)
+        except Exception as e:
+            if self.pending is pending:
+                self.pending = None
+                self.error = e
+                self.done = True
+            return
+        if self.pending is pending:  # first waiter to wake up records the chunk
+            self.pending = None
+            if more:
+                self.chunks.append(piece)
+            else:
+                self.done = True
+
+    async def cancel(self) -> None:
+        self.done = True
+        if self.pending is not None:
+            self.pending.cancel()
+            with contextlib.suppress(BaseException):
+                await self.pending
+        aclose = getattr(self.source, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def _next(source: AsyncIterator[str]) -> tuple[bool, str]:
+    try:
+        return True, await anext(source)
+    except StopAsyncIteration:
+        return False, ""
+
+
+class AsyncCoalescingClient:
+    """asyncio counterpart of CoalescingClient (one client per event loop).
+
+    The shared upstream call runs as a task; it is cancelled only when every
+    caller waiting on it has been cancelled.
+    """
+
+    def __init__(self, inner: AsyncLLMClient, *, provider: str | None = None) -> None:
+        self._inner = inner
+        self.namespace = client_namespace(inner, provider)
+        self.model = getattr(inner, "model", None)
+        self.options = getattr(inner, "options", None)
+        self.stats = CoalesceStats()
+        self._calls: dict[str, tuple[asyncio.Task[str], list[int]]] = {}
+        self._streams: dict[str, _AsyncBroadcast] = {}
+
+    def key(self, messages: list[Message]) -> str:
+        return cache_key(self.namespace, messages)
+
+    async def generate(self, messages: list[Message]) -> str:
+        key = self.key(messages)
+        self.stats.calls += 1
+        entry = self._calls.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._inner.generate(messages))
+            entry = self._calls[key] = (task, [0])
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.stats.coalesced += 1
+
+        task, waiters = entry
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if waiters[0] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task[str]) -> None:
+        entry = self._calls.get(key)
+        if entry is not None and entry[0] is task:
+            del self._calls[key]
+
+    async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        key = self.key(messages)
+        self.stats.calls += 1
+        b = self._streams.get(key)
+        if b is None:
+            b = self._streams[key] = _AsyncBroadcast(self._source(messages))
+        else:
+            b.subscribers += 1
+            self.stats.coalesced += 1
+
+        seen = 0
+        try:
+            while True:
+                if seen < len(b.chunks):
+                    seen += 1
+                    yield b.chunks[seen - 1]
+                    continue
+                if b.done:
+                    break
+                await b.advance()
+            if b.error is not None:
+                raise b.error
+        finally:
+            b.subscribers -= 1
+            last = b.subscribers == 0
+            if (b.done or last) and self._streams.get(key) is b:
+                del self._streams[key]
+            if last and not b.done:
+                await b.cancel()  # everyone stopped reading: stop generating too
+
+    async def _source(self, messages: list[Message]) -> AsyncIterator[str]:
+        stream = getattr(self._inner, "stream", None)
+        if stream is None:
+            yield await self._inner.generate(messages)
+            return
+        async for piece in stream(messages):
+            yield piece
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from .tokens import estimate_prompt_tokens
+from .types import Message
+
+if TYPE_CHECKING:
+    from .settings import Settings
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LADDER: tuple[int, ...] = (2048, 4096, 8192, 16384, 32768)
+
+
+def conversation_key(messages: Sequence[Message]) -> str:
+    """Identify a conversation by its opening: everything up to the first user message.
+
+    Later turns append to the same prefix, so every request of one chat maps to one key.
+    """
+    h = hashlib.sha256()
+    for m in messages:
+        h.update(m["role"].encode())
+        h.update(b"\0")
+        h.update(m["content"].encode("utf-8"))
+        h.update(b"\1")
+        if m["role"] == "user":
+            break
+    return h.hexdigest()
+
+
+class ContextSizer:
+    """Picks Ollama num_ctx from a fixed ladder of sizes.
+
+    The smallest rung that fits the estimated prompt plus the expected output wins,
+    so short requests keep a small KV cache. A conversation never moves down the
+    ladder: changing num_ctx makes Ollama reload the runner, so once a chat needed
+    8k it keeps 8k. Chosen rungs are remembered per conversation in a bounded LRU.
+    """
+
+    def __init__(
+        self,
+        ladder: Sequence[int] = DEFAULT_LADDER,
+        *,
+        expected_output_tokens: int = 512,
+        headroom: float = 1.2,  # the chars/4 estimate undercounts code and non-Latin text
+        max_conversations: int = 4096,
+    ) -> None:
+        if not ladder:
+            raise ValueError("ContextSizer needs at least one num_ctx size")
+        self.ladder = tuple(sorted(set(ladder)))
+        self.expected_output_tokens = expected_output_tokens
+        self.headroom = headroom
+        self.max_conversations = max_conversations
+        self._chosen: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, s: Settings) -> ContextSizer | None:
+        if not s.ollama_num_ctx_ladder:
+            return None
+        return cls(s.ollama_num_ctx_ladder, expected_output_tokens=s.ollama_expected_output_tokens)
+
+    def needed_tokens(self, messages: Sequence[Message], max_output: int | None = None) -> int:
+        output = max_output if max_output and max_output > 0 else self.expected_output_tokens
+        return int(estimate_prompt_tokens(messages) * self.headroom) + output
+
+    def rung(self, tokens: int) -> int:
+        i = bisect.bisect_left(self.ladder, tokens)
+        if i == len(self.ladder):
+            log.warning(
+                "prompt needs ~%d tokens, above the largest num_ctx %d; Ollama will truncate it",
+                tokens,
+                self.ladder[-1],
+            )
+            return self.ladder[-1]
+        return self.ladder[i]
+
+    def num_ctx(self, messages: Sequence[Message], max_output: int | None = None) -> int:
+        size = self.rung(self.needed_tokens(messages, max_output))
+        key = conversation_key(messages)
+        with self._lock:
+            size = max(size, self._chosen.get(key, 0))
+            self._chosen[key] = size
+            self._chosen.move_to_end(key)
+            while len(self._chosen) > self.max_conversations:
+                self._chosen.popitem(last=False)
+        return size
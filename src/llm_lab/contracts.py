@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator, Iterator, Sequence
 from typing import Protocol
 
 from .types import Message
@@ -11,3 +12,52 @@ class LLMClient(Protocol):
     def generate(self, messages: list[Message]) -> str:
         """Сгенерировать ответ модели на список сообщений."""
         ...
+
+
+class AsyncLLMClient(Protocol):
+    """Асинхронный вариант LLMClient: один event loop ведёт много запросов."""
+
+    async def generate(self, messages: list[Message]) -> str:
+        """Сгенерировать ответ модели на список сообщений (без блокировки loop)."""
+        ...
+
+
+class StreamingLLMClient(LLMClient, Protocol):
+    """LLMClient, умеющий отдавать ответ по кускам по мере генерации."""
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        """Итератор текстовых фрагментов ответа (первый — как можно раньше)."""
+        ...
+
+
+class AsyncStreamingLLMClient(AsyncLLMClient, Protocol):
+    """Асинхронный вариант StreamingLLMClient."""
+
+    def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        """Асинхронный итератор текстовых фрагментов ответа."""
+        ...
+
+
+class EmbeddingClient(Protocol):
+    """Клиент эмбеддингов: много текстов за один запрос."""
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        """По вектору на каждый текст, в том же порядке."""
+        ...
+
+
+class AsyncEmbeddingClient(Protocol):
+    """Асинхронный вариант EmbeddingClient."""
+
+    async def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        """По вектору на каждый текст, в том же порядке (без блокировки loop)."""
+        ...
+
+
+def iter_stream(client: LLMClient, messages: list[Message]) -> Iterator[str]:
+    """stream() клиента, если он есть; иначе весь ответ generate() одним куском."""
+    stream = getattr(client, "stream", None)
+    if stream is None:
+        yield client.generate(messages)
+        return
+    yield from stream(messages)
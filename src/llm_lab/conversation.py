@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Iterable, Sequence
+from typing import TYPE_CHECKING
+
+from .context_window import ContextSizer
+from .contracts import LLMClient
+from .tokens import estimate_message_tokens
+from .types import Message, Role
+
+if TYPE_CHECKING:
+    from .settings import Settings
+
+Summarizer = Callable[[str, list[Message]], str]
+
+PINNED_ROLES: frozenset[Role] = frozenset({"system", "developer"})
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+DEFAULT_BUDGET_TOKENS = 8192
+
+_Entry = tuple[Role, str, int]  # role, content, estimated tokens
+
+
+class Conversation:
+    """Chat history kept under a token budget.
+
+    System/developer messages are pinned. Every other message is stored once with its
+    token estimate, so appending costs one estimate and the running total is never
+    recomputed. Over budget, whole turns (a user message and the replies after it) are
+    dropped from the front until the history is back under `low_watermark * budget`:
+    trimming in chunks rather than one turn per call keeps the prompt prefix stable
+    for several turns, which lets the server reuse its KV cache. With a summarizer,
+    dropped turns are folded into one pinned summary message instead of being lost.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = DEFAULT_BUDGET_TOKENS,
+        *,
+        pinned: Iterable[Message] = (),
+        summarizer: Summarizer | None = None,
+        low_watermark: float = 0.75,
+    ) -> None:
+        self.budget_tokens = budget_tokens
+        self.summarizer = summarizer
+        self.low_watermark = low_watermark
+        self.evicted_messages = 0
+        self._pinned: list[_Entry] = []
+        self._history: deque[_Entry] = deque()
+        self._summary: _Entry | None = None
+        self._tokens = 0
+        self._user_turns = 0  # user messages in _history
+        self._view: list[Message] | None = None
+        for m in pinned:
+            self.append(m)
+
+    @classmethod
+    def from_settings(
+        cls,
+        s: Settings,
+        provider: str,
+        model: str,
+        *,
+        pinned: Iterable[Message] = (),
+        summarizer: Summarizer | None = None,
+    ) -> Conversation:
+        return cls(conversation_budget(s, provider, model), pinned=pinned, summarizer=summarizer)
+
+    @property
+    def tokens(self) -> int:
+        """Estimated prompt tokens of messages()."""
+        return self._tokens
+
+    @property
+    def summary(self) -> str | None:
+        return None if self._summary is None else self._summary[1][len(SUMMARY_PREFIX) :]
+
+    def __len__(self) -> int:
+        return len(self._pinned) + (self._summary is not None) + len(self._history)
+
+    def append(self, message: Message) -> None:
+        entry: _Entry = (message["role"], message["content"], estimate_message_tokens(message))
+        self._view = None
+        self._tokens += entry[2]
+        if entry[0] in PINNED_ROLES:
+            self._pinned.append(entry)
+        else:
+            self._history.append(entry)
+            self._user_turns += entry[0] == "user"
+        if self._tokens > self.budget_tokens:
+            self._trim()
+
+    def extend(self, messages: Iterable[Message]) -> None:
+        for m in messages:
+            self.append(m)
+
+    def user(self, content: str) -> None:
+        self.append({"role": "user", "content": content})
+
+    def assistant(self, content: str) -> None:
+        self.append({"role": "assistant", "content": content})
+
+    def messages(self) -> list[Message]:
+        """Pinned messages, the summary (if any), then the kept history."""
+        if self._view is None:
+            entries: list[_Entry] = [*self._pinned]
+            if self._summary is not None:
+                entries.append(self._summary)
+            entries.extend(self._history)
+            self._view = [{"role": role, "content": content} for role, content, _ in entries]
+        return list(self._view)
+
+    def clear(self) -> None:
+        """Forget the history and summary; pinned messages stay."""
+        self._history.clear()
+        self._user_turns = 0
+        self._summary = None
+        self._tokens = sum(e[2] for e in self._pinned)
+        self._view = None
+
+    def _trim(self) -> None:
+        target = int(self.budget_tokens * self.low_watermark)
+        dropped: list[_Entry] = []
+        while self._tokens > target and self._history:
+            # Never drop the newest user turn: the model must see what it is answering.
+            if self._user_turns - (self._history[0][0] == "user") < 1:
+                break
+            dropped.append(self._pop())
+            while self._history and self._history[0][0] != "user":
+                dropped.append(self._pop())
+        if not dropped:
+            return
+        self.evicted_messages += len(dropped)
+        if self.summarizer is not None:
+            self._summarize(dropped)
+
+    def _pop(self) -> _Entry:
+        entry = self._history.popleft()
+        self._tokens -= entry[2]
+        self._user_turns -= entry[0] == "user"
+        return entry
+
+    def _summarize(self, dropped: Sequence[_Entry]) -> None:
+        assert self.summarizer is not None
+        previous = self.summary or ""
+        text = self.summarizer(
+            previous, [{"role": role, "content": content} for role, content, _ in dropped]
+        ).strip()
+        if self._summary is not None:
+            self._tokens -= self._summary[2]
+            self._summary = None
+        if text:
+            content = SUMMARY_PREFIX + text
+            summary: _Entry = (
+                "system",
+                content,
+                estimate_message_tokens({"role": "system", "content": content}),
+            )
+            self._summary = summary
+            self._tokens += summary[2]
+
+
+def llm_summarizer(client: LLMClient, *, max_words: int = 150) -> Summarizer:
+    """Summarizer that asks `client` to merge dropped turns into the running summary."""
+
+    def summarize(previous: str, dropped: list[Message]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in dropped)
+        prompt = (
+            f"Existing summary:\n{previous or '(none)'}\n\n"
+            f"New conversation turns:\n{transcript}\n\n"
+            f"Write an updated summary in at most {max_words} words. Keep facts, names, "
+            "decisions and open questions; drop pleasantries."
+        )
+        return client.generate(
+            [
+                {"role": "system", "content": "You compress chat history into brief notes."},
+                {"role": "user", "content": prompt},
+            ]
+        )
+
+    return summarize
+
+
+def conversation_budget(s: Settings, provider: str, model: str) -> int:
+    """History budget for provider/model: CONVERSATION_BUDGETS entry, else what fits num_ctx."""
+    budgets = s.conversation_budgets
+    for key in (f"{provider}:{model}", provider):
+        if key in budgets:
+            return budgets[key]
+    sizer = ContextSizer.from_settings(s) if provider == "ollama" else None
+    if sizer is not None:
+        # The largest num_ctx must still fit the (padded) history plus the reply.
+        return int((sizer.ladder[-1] - sizer.expected_output_tokens) / sizer.headroom)
+    return DEFAULT_BUDGET_TOKENS
@@ -0,0 +1,410 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, cast
+
+from .cache import CacheStats
+from .contracts import AsyncEmbeddingClient, EmbeddingClient
+
+if TYPE_CHECKING:
+    from .settings import Settings
+
+_META = "meta.json"
+_RECORD = struct.Struct("<16sI")  # key digest, row number
+
+
+def embedding_key(namespace: str, text: str) -> bytes:
+    """16-byte digest of (namespace, text); the namespace is usually provider:model."""
+    return hashlib.sha256(f"{namespace}\0{text}".encode()).digest()[:16]
+
+
+class EmbeddingStore:
+    """Persistent embedding cache: append-only float32 file plus a compact key index.
+
+    A store is a directory holding `vectors-<gen>.f32` (rows of `dim` native
+    float32, read through mmap), `index-<gen>.bin` (20-byte records: 16-byte key
+    digest, row number) and `meta.json`. Vectors are written before their index
+    records, so a crash leaves at most unindexed rows, never a key without a vector.
+
+    One process writes; any number may open the store with `readonly=True`. They
+    map the same files (one copy in the page cache), pick up appended records on a
+    miss, and follow compactions, which write a new generation and switch
+    `meta.json` atomically. With `max_entries`, the writer compacts down to
+    `low_watermark * max_entries` entries, keeping the keys most recently used by
+    this process first and then the newest rows.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        readonly: bool = False,
+        max_entries: int | None = None,
+        low_watermark: float = 0.8,
+    ) -> None:
+        self.path = Path(path)
+        self.readonly = readonly
+        self.max_entries = max_entries
+        self.low_watermark = low_watermark
+        self.dim: int | None = None
+        self.generation = 0
+        self._index: dict[bytes, int] = {}
+        self._used: dict[bytes, int] = {}  # key -> tick of its last hit or insert
+        self._tick = 0
+        self._rows = 0
+        self._index_pos = 0
+        self._vec_r: IO[bytes] | None = None
+        self._vec_w: IO[bytes] | None = None
+        self._idx: IO[bytes] | None = None
+        self._map: mmap.mmap | None = None
+        self._floats: memoryview[float] | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        if not readonly:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self._open()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._index
+
+    def get_many(self, keys: Sequence[bytes]) -> list[list[float] | None]:
+        """Stored vector per key, or None for a miss."""
+        with self._lock:
+            rows = [self._index.get(k) for k in keys]
+            if self.readonly and None in rows and self._refresh():
+                rows = [self._index.get(k) for k in keys]
+            out: list[list[float] | None] = []
+            for key, row in zip(keys, rows, strict=True):
+                if row is None:
+                    out.append(None)
+                    continue
+                self._touch(key)
+                out.append(self._vector(row))
+            return out
+
+    def put_many(self, items: Sequence[tuple[bytes, Sequence[float]]]) -> None:
+        """Append the vectors of keys not stored yet, then compact if over max_entries."""
+        if self.readonly:
+            raise PermissionError(f"{self.path}: embedding store opened read-only")
+        with self._lock:
+            fresh: dict[bytes, Sequence[float]] = {}
+            for key, vec in items:
+                if key not in self._index:
+                    fresh[key] = vec
+            if not fresh:
+                return
+            if self.dim is None:
+                self._create(len(next(iter(fresh.values()))))
+            assert self.dim is not None and self._vec_w is not None and self._idx is not None
+            data = array("f")
+            records = bytearray()
+            for i, (key, vec) in enumerate(fresh.items()):
+                if len(vec) != self.dim:
+                    raise ValueError(f"expected {self.dim}-dim vectors, got {len(vec)}")
+                data.extend(vec)
+                records += _RECORD.pack(key, self._rows + i)
+            self._vec_w.write(data.tobytes())
+            self._vec_w.flush()
+            self._idx.write(records)
+            self._idx.flush()
+            for i, key in enumerate(fresh):
+                self._index[key] = self._rows + i
+                self._touch(key)
+            self._rows += len(fresh)
+            self._index_pos += len(records)
+            if self.max_entries is not None and len(self._index) > self.max_entries:
+                self._compact(int(self.max_entries * self.low_watermark))
+
+    def compact(self, keep: int | None = None) -> None:
+        """Rewrite the store with at most `keep` entries (default: all), dropping dead rows."""
+        if self.readonly:
+            raise PermissionError(f"{self.path}: embedding store opened read-only")
+        with self._lock:
+            self._compact(len(self._index) if keep is None else keep)
+
+    def refresh(self) -> bool:
+        """Load records appended (or a compaction done) by the writer; True if anything changed."""
+        with self._lock:
+            return self._refresh()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
+            self._closed = True
+
+    def __enter__(self) -> EmbeddingStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # -- internals (callers hold self._lock) --
+
+    def _touch(self, key: bytes) -> None:
+        self._tick += 1
+        self._used[key] = self._tick
+
+    def _files(self, generation: int) -> tuple[Path, Path]:
+        return (
+            self.path / f"vectors-{generation}.f32",
+            self.path / f"index-{generation}.bin",
+        )
+
+    def _read_meta(self) -> dict[str, Any] | None:
+        try:
+            meta = json.loads((self.path / _META).read_text("utf-8"))
+        except FileNotFoundError:
+            return None
+        if not isinstance(meta, dict) or not isinstance(meta.get("dim"), int):
+            raise ValueError(f"{self.path}: not an embedding store")
+        return meta
+
+    def _write_meta(self, dim: int, generation: int) -> None:
+        tmp = self.path / f"{_META}.tmp"
+        tmp.write_text(json.dumps({"dim": dim, "generation": generation}), "utf-8")
+        os.replace(tmp, self.path / _META)
+
+    def _create(self, dim: int) -> None:
+        self._write_meta(dim, 0)
+        self._open()
+
+    def _open(self, retries: int = 2) -> None:
+        self._close_files()
+        self._index.clear()
+        self._rows = self._index_pos = 0
+        meta = self._read_meta()
+        if meta is None:
+            self.dim, self.generation = None, 0
+            return
+        self.dim, self.generation = meta["dim"], int(meta.get("generation", 0))
+        vec_path, idx_path = self._files(self.generation)
+        row_bytes = self.dim * 4
+        if not self.readonly:
+            vec_path.touch()
+            idx_path.touch()
+            # Drop a torn tail left by a crash mid-write.
+            with vec_path.open("r+b") as f:
+                f.truncate(os.fstat(f.fileno()).st_size // row_bytes * row_bytes)
+            with idx_path.open("r+b") as f:
+                f.truncate(os.fstat(f.fileno()).st_size // _RECORD.size * _RECORD.size)
+            self._vec_w = vec_path.open("ab")
+            self._idx = idx_path.open("ab")
+        try:
+            self._vec_r = vec_path.open("rb")
+            self._read_records(idx_path)
+        except FileNotFoundError:
+            # A reader raced a compaction that already removed this generation.
+            if self.readonly and retries:
+                return self._open(retries - 1)
+            raise
+        self._rows = os.fstat(self._vec_r.fileno()).st_size // row_bytes
+
+    def _read_records(self, idx_path: Path) -> bool:
+        with idx_path.open("rb") as f:
+            f.seek(self._index_pos)
+            raw = f.read()
+        raw = raw[: len(raw) // _RECORD.size * _RECORD.size]  # a record still being written
+        for key, row in _RECORD.iter_unpack(raw):
+            self._index[key] = row
+        self._index_pos += len(raw)
+        return bool(raw)
+
+    def _refresh(self) -> bool:
+        meta = self._read_meta()
+        if meta is None:
+            return False
+        if self.dim is None or int(meta.get("generation", 0)) != self.generation:
+            self._open()
+            return True
+        return self._read_records(self._files(self.generation)[1])
+
+    def _vector(self, row: int) -> list[float]:
+        assert self.dim is not None and self._vec_r is not None
+        if self._floats is None or (row + 1) * self.dim > len(self._floats):
+            self._remap()
+        assert self._floats is not None
+        # typeshed types memoryview.tolist() as list[int] whatever the format
+        return cast(list[float], self._floats[row * self.dim : (row + 1) * self.dim].tolist())
+
+    def _remap(self) -> None:
+        assert self._vec_r is not None and self.dim is not None
+        self._unmap()
+        row_bytes = self.dim * 4
+        # Whole rows only: the writer may be mid-way through appending the next one.
+        size = os.fstat(self._vec_r.fileno()).st_size // row_bytes * row_bytes
+        self._map = mmap.mmap(self._vec_r.fileno(), size, access=mmap.ACCESS_READ)
+        self._floats = memoryview(self._map).cast("f")
+
+    def _unmap(self) -> None:
+        if self._floats is not None:
+            self._floats.release()
+            self._floats = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _close_files(self) -> None:
+        self._unmap()
+        for f in (self._vec_r, self._vec_w, self._idx):
+            if f is not None:
+                f.close()
+        self._vec_r = self._vec_w = self._idx = None
+
+    def _compact(self, keep: int) -> None:
+        if self.dim is None:
+            return
+        ranked = sorted(
+            self._index.items(),
+            key=lambda kv: (self._used.get(kv[0], 0), kv[1]),
+            reverse=True,
+        )[: max(keep, 0)]
+        ranked.sort(key=lambda kv: kv[1])  # keep the surviving rows in their old order
+        old = self.generation
+        vec_path, idx_path = self._files(old + 1)
+        with vec_path.open("wb") as vf, idx_path.open("wb") as xf:
+            for new_row, (key, row) in enumerate(ranked):
+                vf.write(array("f", self._vector(row)).tobytes())
+                xf.write(_RECORD.pack(key, new_row))
+        self._write_meta(self.dim, old + 1)
+        kept = {key for key, _ in ranked}
+        self._used = {k: t for k, t in self._used.items() if k in kept}
+        self._open()
+        for stale in self._files(old):
+            # Readers still mapping the old generation keep their (unlinked) copy on POSIX.
+            with contextlib.suppress(OSError):
+                stale.unlink()
+
+
+class _CachedEmbedding:
+    # Key handling and stats shared by the sync and async wrappers.
+
+    def __init__(self, store: EmbeddingStore, namespace: str) -> None:
+        self.store = store
+        self.namespace = namespace
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def _lookup(
+        self, texts: Sequence[str]
+    ) -> tuple[list[bytes], list[list[float] | None], dict[bytes, str]]:
+        keys = [embedding_key(self.namespace, t) for t in texts]
+        found = self.store.get_many(keys)
+        missing: dict[bytes, str] = {}  # unique misses, in first-seen order
+        for key, text, vec in zip(keys, texts, found, strict=True):
+            if vec is None:
+                missing.setdefault(key, text)
+        with self._lock:
+            self.stats.misses += len(missing)
+            self.stats.hits += len(texts) - len(missing)
+        return keys, found, missing
+
+    def _fill(
+        self,
+        keys: list[bytes],
+        found: list[list[float] | None],
+        missing: dict[bytes, str],
+        vectors: list[list[float]],
+    ) -> list[list[float]]:
+        fetched = dict(zip(missing, vectors, strict=True))
+        if fetched and not self.store.readonly:
+            self.store.put_many(list(fetched.items()))
+        return [
+            vec if vec is not None else fetched[key] for key, vec in zip(keys, found, strict=True)
+        ]
+
+
+class CachedEmbedder(_CachedEmbedding):
+    """EmbeddingClient wrapper that embeds only texts the store has not seen.
+
+    Each embed() looks up the whole batch at once and sends just its unique misses
+    upstream in one inner call (which batches them further); a read-only store
+    serves hits without ever writing.
+    """
+
+    def __init__(
+        self,
+        inner: EmbeddingClient,
+        store: EmbeddingStore,
+        *,
+        namespace: str | None = None,
+    ) -> None:
+        super().__init__(store, namespace or _namespace(inner))
+        self._inner = inner
+
+    @classmethod
+    def from_settings(
+        cls, inner: EmbeddingClient, s: Settings, *, provider: str | None = None
+    ) -> CachedEmbedder:
+        return cls(inner, _store_from_settings(s), namespace=_namespace(inner, provider))
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        keys, found, missing = self._lookup(texts)
+        vectors = self._inner.embed(list(missing.values())) if missing else []
+        return self._fill(keys, found, missing, vectors)
+
+
+class AsyncCachedEmbedder(_CachedEmbedding):
+    def __init__(
+        self,
+        inner: AsyncEmbeddingClient,
+        store: EmbeddingStore,
+        *,
+        namespace: str | None = None,
+    ) -> None:
+        super().__init__(store, namespace or _namespace(inner))
+        self._inner = inner
+
+    @classmethod
+    def from_settings(
+        cls, inner: AsyncEmbeddingClient, s: Settings, *, provider: str | None = None
+    ) -> AsyncCachedEmbedder:
+        return cls(inner, _store_from_settings(s), namespace=_namespace(inner, provider))
+
+    async def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        keys, found, missing = self._lookup(texts)
+        vectors = await self._inner.embed(list(missing.values())) if missing else []
+        return self._fill(keys, found, missing, vectors)
+
+
+def _namespace(client: EmbeddingClient | AsyncEmbeddingClient, provider: str | None = None) -> str:
+    return f"{provider or type(client).__name__}:{getattr(client, 'model', None)}"
+
+
+_SHARED: dict[tuple[str, bool], EmbeddingStore] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_store(
+    path: str | Path, *, readonly: bool = False, max_entries: int | None = None
+) -> EmbeddingStore:
+    """Process-wide EmbeddingStore per directory: two writers in one process would
+    append conflicting row numbers."""
+    key = (str(Path(path).resolve()), readonly)
+    with _SHARED_LOCK:
+        store = _SHARED.get(key)
+        if store is None or store._closed:
+            store = EmbeddingStore(path, readonly=readonly, max_entries=max_entries)
+            _SHARED[key] = store
+        return store
+
+
+def _store_from_settings(s: Settings) -> EmbeddingStore:
+    if not s.embed_cache_path:
+        raise ValueError("EMBED_CACHE_PATH is required for an embedding cache")
+    return shared_store(
+        s.embed_cache_path,
+        readonly=s.embed_cache_readonly,
+        max_entries=s.embed_cache_max_entries,
+    )
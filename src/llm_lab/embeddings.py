@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable, Sequence
+
+from .tokens import estimate_tokens
+
+DEFAULT_MAX_BATCH = 128
+DEFAULT_MAX_BATCH_TOKENS = 32_768
+
+_EmbedCall = Callable[[list[str]], list[list[float]]]
+_AsyncEmbedCall = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+def plan_batches(
+    texts: Sequence[str],
+    *,
+    max_items: int = DEFAULT_MAX_BATCH,
+    max_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+) -> list[range]:
+    """Consecutive index ranges of `texts`, each within both caps.
+
+    Tokens are estimated; a single text over `max_tokens` gets a batch of its own
+    (the server then truncates or rejects it).
+    """
+    batches: list[range] = []
+    start = tokens = 0
+    for i, text in enumerate(texts):
+        n = estimate_tokens(text)
+        if i > start and (i - start >= max_items or tokens + n > max_tokens):
+            batches.append(range(start, i))
+            start, tokens = i, 0
+        tokens += n
+    if start < len(texts):
+        batches.append(range(start, len(texts)))
+    return batches
+
+
+def embed_batched(
+    call: _EmbedCall,
+    texts: Sequence[str],
+    *,
+    max_items: int = DEFAULT_MAX_BATCH,
+    max_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+) -> list[list[float]]:
+    """Embed `texts` with one `call` per planned batch; a 413 halves the batch."""
+    vectors: list[list[float]] = []
+    for r in plan_batches(texts, max_items=max_items, max_tokens=max_tokens):
+        vectors.extend(_embed_splitting(call, list(texts[r.start : r.stop])))
+    return vectors
+
+
+async def aembed_batched(
+    call: _AsyncEmbedCall,
+    texts: Sequence[str],
+    *,
+    max_items: int = DEFAULT_MAX_BATCH,
+    max_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+) -> list[list[float]]:
+    vectors: list[list[float]] = []
+    for r in plan_batches(texts, max_items=max_items, max_tokens=max_tokens):
+        vectors.extend(await _aembed_splitting(call, list(texts[r.start : r.stop])))
+    return vectors
+
+
+def _embed_splitting(call: _EmbedCall, batch: list[str]) -> list[list[float]]:
+    try:
+        vectors = call(batch)
+    except Exception as e:
+        if len(batch) < 2 or not is_payload_too_large(e):
+            raise
+        mid = len(batch) // 2
+        return _embed_splitting(call, batch[:mid]) + _embed_splitting(call, batch[mid:])
+    return _checked(batch, vectors)
+
+
+async def _aembed_splitting(call: _AsyncEmbedCall, batch: list[str]) -> list[list[float]]:
+    try:
+        vectors = await call(batch)
+    except Exception as e:
+        if len(batch) < 2 or not is_payload_too_large(e):
+            raise
+        mid = len(batch) // 2
+        return await _aembed_splitting(call, batch[:mid]) + await _aembed_splitting(
+            call, batch[mid:]
+        )
+    return _checked(batch, vectors)
+
+
+def _checked(batch: list[str], vectors: list[list[float]]) -> list[list[float]]:
+    if len(vectors) != len(batch):
+        raise ValueError(f"embeddings response: {len(vectors)} vectors for {len(batch)} inputs")
+    return vectors
+
+
+def is_payload_too_large(e: BaseException) -> bool:
+    """HTTP 413 from httpx (`e.response`) or the ollama library (`e.status_code`)."""
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    return status == 413
@@ -1,11 +1,23 @@
 from __future__ import annotations
 
-from typing import Literal, overload
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Literal, overload
 
-from .clients import OllamaClient, OpenAIClient
-from .contracts import LLMClient
-from .settings import Settings
-from .types import Provider
+# Client modules are imported on first use: a one-shot CLI call loads only the
+# selected provider (ollama alone costs more than the rest of the package).
+if TYPE_CHECKING:
+    from .clients import (
+        AsyncOllamaClient,
+        AsyncOpenAIClient,
+        BalancedOllamaClient,
+        OllamaClient,
+        OpenAIClient,
+    )
+    from .clients.pool import HttpPool, PoolLimits
+    from .contracts import AsyncEmbeddingClient, AsyncLLMClient, EmbeddingClient, LLMClient
+    from .observe import Observer
+    from .settings import Settings
+    from .types import Provider
 
 
 class LLMFactory:
@@ -16,6 +28,8 @@ class LLMFactory:
         /,
         *,
         settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
     ) -> OllamaClient: ...
 
     @overload
@@ -25,6 +39,8 @@ class LLMFactory:
         /,
         *,
         settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
     ) -> OpenAIClient: ...
 
     @overload
@@ -34,26 +50,335 @@ class LLMFactory:
         /,
         *,
         settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
     ) -> OpenAIClient | OllamaClient: ...
 
     @overload
     @staticmethod
-    def create(provider: str, /, *, settings: Settings | None = None) -> LLMClient: ...
+    def create(
+        provider: str,
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> LLMClient: ...
 
     @staticmethod
-    def create(provider: str, /, *, settings: Settings | None = None) -> LLMClient:
-        s = settings or Settings()
+    def create(
+        provider: str,
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> LLMClient:
+        from .ratelimit import shared_limiter
+
+        s = settings or _settings()
+        # Clients with the same base URL reuse one keep-alive transport.
+        p = pool or _shared_pool(s)
 
         if provider == "ollama":
-            return OllamaClient(model=s.ollama_model, host=s.ollama_host)
+            from .clients.ollama_client import OllamaClient
+            from .context_window import ContextSizer
+
+            ollama = OllamaClient(
+                model=s.ollama_model,
+                host=s.ollama_host,
+                rate_limiter=shared_limiter(s, "ollama", s.ollama_model),
+                transport=p.transport(s.ollama_host),
+                observers=observers,
+                keep_alive=s.ollama_keep_alive,
+                context_sizer=ContextSizer.from_settings(s),
+            )
+            if s.ollama_keeper_interval_s:
+                ollama.start_keeper(s.ollama_keeper_interval_s)
+            return ollama
 
         if provider == "openai":
             if not s.openai_api_key:
                 raise ValueError("OPENAI_API_KEY is required for provider='openai'")
+            from .clients.openai_client import OpenAIClient
+
             return OpenAIClient(
                 api_key=s.openai_api_key,
                 model=s.openai_model,
                 base_url=s.openai_base_url,
+                timeout_s=s.openai_timeout_s,
+                rate_limiter=shared_limiter(s, "openai", s.openai_model),
+                observers=tuple(observers),
+                json_backend=s.json_backend,
+                _http=p.client(s.openai_base_url, timeout=s.openai_timeout_s),
             )
 
         raise ValueError(f"Unsupported provider: {provider!r}")
+
+    @staticmethod
+    def create_balanced(
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> BalancedOllamaClient:
+        """Ollama client spread over OLLAMA_HOSTS (falls back to OLLAMA_HOST)."""
+        from .clients.ollama_balancer import BalancedOllamaClient
+        from .context_window import ContextSizer
+        from .ratelimit import shared_limiter
+
+        s = settings or _settings()
+        p = pool or _shared_pool(s)
+        client = BalancedOllamaClient(
+            s.ollama_hosts or [s.ollama_host],
+            model=s.ollama_model,
+            rate_limiter=shared_limiter(s, "ollama", s.ollama_model),
+            transport_for=p.transport,
+            probe_interval_s=s.ollama_probe_interval_s,
+            observers=observers,
+            keep_alive=s.ollama_keep_alive,
+            context_sizer=ContextSizer.from_settings(s),
+            affinity_slack=s.ollama_affinity_slack if s.ollama_affinity_slack >= 0 else None,
+        )
+        if s.ollama_keeper_interval_s:
+            client.start_keeper(s.ollama_keeper_interval_s)
+        return client
+
+    @overload
+    @staticmethod
+    def create_async(
+        provider: Literal["ollama"],
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> AsyncOllamaClient: ...
+
+    @overload
+    @staticmethod
+    def create_async(
+        provider: Literal["openai"],
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> AsyncOpenAIClient: ...
+
+    @overload
+    @staticmethod
+    def create_async(
+        provider: Provider,
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> AsyncOpenAIClient | AsyncOllamaClient: ...
+
+    @overload
+    @staticmethod
+    def create_async(
+        provider: str,
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> AsyncLLMClient: ...
+
+    @staticmethod
+    def create_async(
+        provider: str,
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> AsyncLLMClient:
+        from .ratelimit import shared_limiter
+
+        s = settings or _settings()
+        # Async transports are loop-bound: share them only via an explicit pool,
+        # or the cassette pool when CASSETTE_PATH is set.
+        limits = _pool_limits(s)
+        pool = pool or _async_pool(s)
+
+        if provider == "ollama":
+            from .clients.ollama_client import AsyncOllamaClient
+            from .context_window import ContextSizer
+
+            return AsyncOllamaClient(
+                model=s.ollama_model,
+                host=s.ollama_host,
+                rate_limiter=shared_limiter(s, "ollama", s.ollama_model),
+                limits=limits,
+                transport=pool.async_transport(s.ollama_host) if pool else None,
+                observers=observers,
+                keep_alive=s.ollama_keep_alive,
+                context_sizer=ContextSizer.from_settings(s),
+            )
+
+        if provider == "openai":
+            if not s.openai_api_key:
+                raise ValueError("OPENAI_API_KEY is required for provider='openai'")
+            from .clients.openai_client import AsyncOpenAIClient
+
+            return AsyncOpenAIClient(
+                api_key=s.openai_api_key,
+                model=s.openai_model,
+                base_url=s.openai_base_url,
+                timeout_s=s.openai_timeout_s,
+                limits=limits,
+                rate_limiter=shared_limiter(s, "openai", s.openai_model),
+                observers=tuple(observers),
+                json_backend=s.json_backend,
+                _http=(
+                    pool.async_client(s.openai_base_url, timeout=s.openai_timeout_s)
+                    if pool
+                    else None
+                ),
+            )
+
+        raise ValueError(f"Unsupported provider: {provider!r}")
+
+    @staticmethod
+    def create_embedder(
+        provider: str,
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> EmbeddingClient:
+        """Embeddings client for OLLAMA_EMBED_MODEL / OPENAI_EMBED_MODEL."""
+        s = settings or _settings()
+        p = pool or _shared_pool(s)
+
+        if provider == "ollama":
+            from .clients.ollama_client import OllamaEmbedder
+
+            embedder: EmbeddingClient = OllamaEmbedder(
+                model=s.ollama_embed_model,
+                host=s.ollama_host,
+                max_batch=s.embed_max_batch,
+                max_batch_tokens=s.embed_max_batch_tokens,
+                transport=p.transport(s.ollama_host),
+                observers=observers,
+                keep_alive=s.ollama_keep_alive,
+            )
+        elif provider == "openai":
+            if not s.openai_api_key:
+                raise ValueError("OPENAI_API_KEY is required for provider='openai'")
+            from .clients.openai_client import OpenAIEmbedder
+
+            embedder = OpenAIEmbedder(
+                api_key=s.openai_api_key,
+                model=s.openai_embed_model,
+                base_url=s.openai_base_url,
+                timeout_s=s.openai_timeout_s,
+                max_batch=s.embed_max_batch,
+                max_batch_tokens=s.embed_max_batch_tokens,
+                observers=tuple(observers),
+                json_backend=s.json_backend,
+                _http=p.client(s.openai_base_url, timeout=s.openai_timeout_s),
+            )
+        else:
+            raise ValueError(f"Unsupported provider: {provider!r}")
+
+        if s.embed_cache_path:
+            from .embedding_cache import CachedEmbedder
+
+            return CachedEmbedder.from_settings(embedder, s, provider=provider)
+        return embedder
+
+    @staticmethod
+    def create_async_embedder(
+        provider: str,
+        /,
+        *,
+        settings: Settings | None = None,
+        pool: HttpPool | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> AsyncEmbeddingClient:
+        s = settings or _settings()
+        limits = _pool_limits(s)
+        pool = pool or _async_pool(s)
+
+        if provider == "ollama":
+            from .clients.ollama_client import AsyncOllamaEmbedder
+
+            embedder: AsyncEmbeddingClient = AsyncOllamaEmbedder(
+                model=s.ollama_embed_model,
+                host=s.ollama_host,
+                max_batch=s.embed_max_batch,
+                max_batch_tokens=s.embed_max_batch_tokens,
+                limits=limits,
+                transport=pool.async_transport(s.ollama_host) if pool else None,
+                observers=observers,
+                keep_alive=s.ollama_keep_alive,
+            )
+        elif provider == "openai":
+            if not s.openai_api_key:
+                raise ValueError("OPENAI_API_KEY is required for provider='openai'")
+            from .clients.openai_client import AsyncOpenAIEmbedder
+
+            embedder = AsyncOpenAIEmbedder(
+                api_key=s.openai_api_key,
+                model=s.openai_embed_model,
+                base_url=s.openai_base_url,
+                timeout_s=s.openai_timeout_s,
+                max_batch=s.embed_max_batch,
+                max_batch_tokens=s.embed_max_batch_tokens,
+                limits=limits,
+                observers=tuple(observers),
+                json_backend=s.json_backend,
+                _http=(
+                    pool.async_client(s.openai_base_url, timeout=s.openai_timeout_s)
+                    if pool
+                    else None
+                ),
+            )
+        else:
+            raise ValueError(f"Unsupported provider: {provider!r}")
+
+        if s.embed_cache_path:
+            from .embedding_cache import AsyncCachedEmbedder
+
+            return AsyncCachedEmbedder.from_settings(embedder, s, provider=provider)
+        return embedder
+
+
+def _settings() -> Settings:
+    from .settings import Settings
+
+    return Settings()
+
+
+def _shared_pool(s: Settings) -> HttpPool:
+    if s.cassette_path:
+        from .cassette import shared_cassette_pool
+
+        return shared_cassette_pool(
+            s.cassette_path, s.cassette_mode, speed=s.cassette_speed, limits=_pool_limits(s)
+        )
+    from .clients.pool import shared_pool
+
+    return shared_pool(_pool_limits(s))
+
+
+def _async_pool(s: Settings) -> HttpPool | None:
+    # Replay transports hold no sockets; record mode wraps the pool's own transport.
+    return _shared_pool(s) if s.cassette_path else None
+
+
+def _pool_limits(s: Settings) -> PoolLimits:
+    from .clients.pool import PoolLimits
+
+    return PoolLimits(
+        max_connections=s.http_max_connections,
+        max_keepalive_connections=s.http_max_keepalive_connections,
+        keepalive_expiry_s=s.http_keepalive_expiry_s,
+        http2=s.http2,
+    )
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any, cast
+
+from .ollama_local import keep_alive_seconds
+
+
+@dataclass(frozen=True, slots=True)
+class FakeUpstreamConfig:
+    latency_s: float = 0.0  # before the first token
+    tokens_per_s: float = 0.0  # 0 = emit all tokens at once
+    reply_tokens: int = 16
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: int | None = None
+    load_s: float = 0.0  # Ollama model load on a cold start (model not resident)
+
+
+class FakeUpstream:
+    """Local stand-in speaking Ollama /api/chat and OpenAI /v1/responses.
+
+    Runs a threaded HTTP/1.1 (keep-alive) server on 127.0.0.1 in a daemon thread,
+    so client overhead can be measured without a GPU, a network or an API key.
+    """
+
+    def __init__(self, config: FakeUpstreamConfig | None = None, port: int = 0) -> None:
+        self.config = config or FakeUpstreamConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self.requests = 0
+        self.loads = 0
+        self._loaded_until = 0.0
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.upstream = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> FakeUpstream:
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="llm-lab-fake-upstream", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> FakeUpstream:
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def reply_pieces(self) -> list[str]:
+        return [f"t{i} " for i in range(self.config.reply_tokens)]
+
+    def load(self, keep_alive: float | str | None) -> float:
+        """Mark the model resident for keep_alive (default 5m); load time if it was cold."""
+        ttl = keep_alive_seconds(keep_alive)
+        with self._rng_lock:
+            now = time.monotonic()
+            cold = now >= self._loaded_until
+            self._loaded_until = now + (300.0 if ttl is None else ttl)
+            if cold:
+                self.loads += 1
+        return self.config.load_s if cold else 0.0
+
+    def should_fail(self) -> bool:
+        with self._rng_lock:
+            self.requests += 1
+            return self._rng.random() < self.config.error_rate
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    upstream: FakeUpstream
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # small chunked writes would otherwise stall ~40ms
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    @property
+    def upstream(self) -> FakeUpstream:
+        return cast(_Server, self.server).upstream
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "fake:latest", "model": "fake:latest"}]})
+            return
+        self._send_json(404, {"error": f"no route for GET {self.path}"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body: dict[str, Any] = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path not in ("/api/chat", "/v1/responses"):
+            self._send_json(404, {"error": f"no route for POST {self.path}"})
+            return
+
+        up = self.upstream
+        if up.should_fail():
+            self._send_json(up.config.error_status, {"error": "injected failure"})
+            return
+
+        if up.config.latency_s:
+            time.sleep(up.config.latency_s)
+
+        if self.path == "/api/chat":
+            self._ollama_chat(body)
+        else:
+            self._openai_responses(body)
+
+    def _ollama_chat(self, body: dict[str, Any]) -> None:
+        up = self.upstream
+        load_s = up.load(body.get("keep_alive"))
+        if load_s:
+            time.sleep(load_s)
+        messages = body.get("messages") or []
+        # Like Ollama, an empty conversation only loads the model.
+        pieces = up.reply_pieces() if messages else []
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 for m in messages)
+        stats = {
+            "total_duration": int((up.config.latency_s + load_s) * 1e9),
+            "load_duration": int(load_s * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": 0,
+            "eval_count": len(pieces),
+            "eval_duration": int(len(pieces) / (up.config.tokens_per_s or 1e9) * 1e9),
+        }
+        base = {"model": body.get("model", "fake"), "created_at": "1970-01-01T00:00:00Z"}
+        done = {"done": True, "done_reason": "stop" if messages else "load", **stats}
+
+        # Ollama defaults to streaming when "stream" is absent.
+        if body.get("stream", True) is False:
+            msg = {"role": "assistant", "content": "".join(pieces)}
+            self._pace(len(pieces))
+            self._send_json(200, {**base, "message": msg, **done})
+            return
+
+        self._start_chunked("application/x-ndjson")
+        for piece in pieces:
+            self._pace(1)
+            chunk = {**base, "message": {"role": "assistant", "content": piece}, "done": False}
+            self._write_chunk(json.dumps(chunk) + "\n")
+        final = {**base, "message": {"role": "assistant", "content": ""}, **done}
+        self._write_chunk(json.dumps(final) + "\n")
+        self._end_chunked()
+
+    def _openai_responses(self, body: dict[str, Any]) -> None:
+        up = self.upstream
+        pieces = up.reply_pieces()
+        inputs = body.get("input", [])
+        usage = {
+            "input_tokens": sum(len(str(m.get("content", ""))) // 4 for m in inputs),
+            "output_tokens": len(pieces),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        text = "".join(pieces)
+        response = {
+            "id": "resp_fake",
+            "object": "response",
+            "model": body.get("model", "fake"),
+            "status": "completed",
+            "output": [
+                {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": text}],
+                }
+            ],
+            "usage": usage,
+        }
+
+        if not body.get("stream"):
+            self._pace(len(pieces))
+            self._send_json(200, response)
+            return
+
+        self._start_chunked("text/event-stream")
+        self._sse("response.created", {"response": {**response, "output": [], "usage": None}})
+        for piece in pieces:
+            self._pace(1)
+            self._sse("response.output_text.delta", {"delta": piece})
+        self._sse("response.output_text.done", {"text": text})
+        self._sse("response.completed", {"response": response})
+        self._end_chunked()
+
+    def _pace(self, n_tokens: int) -> None:
+        rate = self.upstream.config.tokens_per_s
+        if rate > 0 and n_tokens:
+            time.sleep(n_tokens / rate)
+
+    def _sse(self, event: str, payload: dict[str, Any]) -> None:
+        data = json.dumps({"type": event, **payload})
+        self._write_chunk(f"event: {event}\ndata: {data}\n\n")
+
+    def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+        raw = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _start_chunked(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, text: str) -> None:
+        raw = text.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(raw), raw))
+        self.wfile.flush()
+
+    def _end_chunked(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
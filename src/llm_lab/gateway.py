@@ -0,0 +1,561 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import time
+import uuid
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Sequence
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from types import TracebackType
+from typing import TYPE_CHECKING, Any
+
+from .contracts import AsyncLLMClient
+from .scheduler import PRIORITIES, Priority, RequestDropped, Scheduler, scheduling
+from .types import Message, Role
+
+if TYPE_CHECKING:
+    from .observe import Observer
+    from .settings import Settings
+
+ROLES: frozenset[Role] = frozenset({"system", "developer", "user", "assistant"})
+DEFAULT_TENANT = "default"
+TENANT_HEADER = "x-tenant"
+PRIORITY_HEADER = "x-priority"
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(slots=True)
+class GatewayStats:
+    requests: int = 0
+    rejected: int = 0  # 503: the wait queue was full
+    upstream_errors: int = 0
+    disconnects: int = 0  # callers that went away mid-stream
+    queued: int = 0
+    in_flight: int = 0
+    tenants: dict[str, int] = field(default_factory=dict)  # in flight per tenant
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "upstream_errors": self.upstream_errors,
+            "disconnects": self.disconnects,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "tenants": dict(self.tenants),
+        }
+
+
+class _Tenant:
+    __slots__ = ("slots", "users")
+
+    def __init__(self, limit: int) -> None:
+        self.slots = asyncio.Semaphore(limit)
+        self.users = 0  # queued + running; the entry is dropped at zero
+
+
+@dataclass(frozen=True, slots=True)
+class _Request:
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+
+class Gateway:
+    """HTTP front for one shared AsyncLLMClient, speaking Ollama and OpenAI shapes.
+
+    POST /api/chat and POST /v1/responses accept the respective request bodies
+    (the backend model is used whatever the body names) and answer in the same
+    shape, streamed as NDJSON or SSE when asked. GET /stats reports counters.
+
+    At most `max_concurrency` calls run upstream and at most `tenant_concurrency`
+    per tenant (X-Tenant header); up to `max_queue` more wait for a slot and the
+    rest get 503 with Retry-After. Streams are written with drain(), so a slow
+    reader slows the upstream read instead of buffering the reply in memory.
+    With a `scheduler` in the backend (see wrap_backend), X-Tenant and X-Priority
+    (interactive, normal, batch) are passed on to it; calls it drops for missing
+    their deadline get 503 as well.
+    """
+
+    def __init__(
+        self,
+        client: AsyncLLMClient,
+        *,
+        model: str | None = None,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        tenant_concurrency: int = 4,
+        max_body_bytes: int = 4 * 1024 * 1024,
+        scheduler: Scheduler | None = None,
+    ) -> None:
+        self.client = client
+        self.scheduler = scheduler
+        self.model = model or str(getattr(client, "model", None) or "llm-lab")
+        self.max_queue = max_queue
+        self.tenant_concurrency = tenant_concurrency
+        self.max_body_bytes = max_body_bytes
+        self.stats = GatewayStats()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tenants: dict[str, _Tenant] = {}
+        self._server: asyncio.Server | None = None
+        self._routes: dict[tuple[str, str], Callable[[_Request, asyncio.StreamWriter], Any]] = {
+            ("POST", "/api/chat"): self._ollama_chat,
+            ("POST", "/v1/responses"): self._responses,
+            ("GET", "/stats"): self._stats,
+        }
+
+    @classmethod
+    def from_settings(
+        cls, client: AsyncLLMClient, s: Settings, *, scheduler: Scheduler | None = None
+    ) -> Gateway:
+        return cls(
+            client,
+            max_concurrency=s.serve_max_concurrency,
+            max_queue=s.serve_max_queue,
+            tenant_concurrency=s.serve_tenant_concurrency,
+            scheduler=scheduler,
+        )
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Gateway:
+        self._server = await asyncio.start_server(self._connection, host, port)
+        return self
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Gateway is not started")
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def aclose(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> Gateway:
+        return await self.start() if self._server is None else self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, tenant: str) -> AsyncIterator[None]:
+        st = self.stats
+        t = self._tenants.get(tenant)
+        # Only a call that cannot take both slots right away queues: locked() is
+        # also true while others wait, and nothing awaits between here and acquire.
+        waiting = self._slots.locked() or (t is not None and t.slots.locked())
+        if waiting and st.queued >= self.max_queue:
+            st.rejected += 1
+            raise _HTTPError(503, "gateway queue is full, retry later")
+        if t is None:
+            t = self._tenants[tenant] = _Tenant(self.tenant_concurrency)
+        t.users += 1
+        if waiting:
+            st.queued += 1
+        try:
+            # Per-tenant first: a tenant over its limit must not hold a global slot.
+            async with t.slots, self._slots:
+                if waiting:
+                    waiting = False
+                    st.queued -= 1
+                st.in_flight += 1
+                st.tenants[tenant] = st.tenants.get(tenant, 0) + 1
+                try:
+                    yield
+                finally:
+                    st.in_flight -= 1
+                    st.tenants[tenant] -= 1
+                    if not st.tenants[tenant]:
+                        del st.tenants[tenant]
+        finally:
+            if waiting:  # cancelled (caller gone) while queued
+                st.queued -= 1
+            t.users -= 1
+            if not t.users:
+                del self._tenants[tenant]
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    req = await self._read_request(reader)
+                except _HTTPError as e:
+                    await _send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    return
+                if req is None:
+                    return
+                self.stats.requests += 1
+                route = self._routes.get((req.method, req.path))
+                try:
+                    if route is None:
+                        raise _HTTPError(404, f"no route for {req.method} {req.path}")
+                    await route(req, writer)
+                except _HTTPError as e:
+                    headers = {"Retry-After": "1"} if e.status == 503 else {}
+                    await _send_json(writer, e.status, {"error": str(e)}, headers=headers)
+                if not req.keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> _Request | None:
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _version = line.decode("latin-1").split()
+        except ValueError:
+            raise _HTTPError(400, "malformed request line") from None
+        headers: dict[str, str] = {}
+        while True:
+            raw = await reader.readline()
+            if raw in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = raw.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise _HTTPError(411, "chunked request bodies are not supported")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise _HTTPError(400, "invalid Content-Length")
+        if length > self.max_body_bytes:
+            raise _HTTPError(413, f"request body over {self.max_body_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return _Request(method, target.split("?", 1)[0], headers, body)
+
+    async def _stats(self, req: _Request, writer: asyncio.StreamWriter) -> None:
+        payload = self.stats.to_json()
+        if self.scheduler is not None:
+            payload["scheduler"] = self.scheduler.stats.to_json()
+        await _send_json(writer, 200, payload, keep_alive=req.keep_alive)
+
+    async def _ollama_chat(self, req: _Request, writer: asyncio.StreamWriter) -> None:
+        body = _json_body(req)
+        messages = _messages(body.get("messages"), "messages")
+        base = {"model": self.model, "created_at": _now()}
+        # Like Ollama, stream unless told otherwise.
+        if body.get("stream", True) is False:
+            text = await self._generate(req, messages)
+            reply = {**base, "message": {"role": "assistant", "content": text}}
+            await _send_json(writer, 200, {**reply, "done": True, "done_reason": "stop"})
+            return
+
+        def chunk(piece: str) -> bytes:
+            msg = {**base, "message": {"role": "assistant", "content": piece}, "done": False}
+            return (json.dumps(msg, ensure_ascii=False) + "\n").encode()
+
+        final = {**base, "message": {"role": "assistant", "content": ""}, "done": True}
+        await self._stream(
+            req,
+            writer,
+            messages,
+            content_type="application/x-ndjson",
+            chunk=chunk,
+            tail=lambda _: [json.dumps({**final, "done_reason": "stop"}).encode() + b"\n"],
+            error=lambda e: json.dumps({"error": str(e)}).encode() + b"\n",
+        )
+
+    async def _responses(self, req: _Request, writer: asyncio.StreamWriter) -> None:
+        body = _json_body(req)
+        raw_input = body.get("input")
+        if isinstance(raw_input, str):
+            raw_input = [{"role": "user", "content": raw_input}]
+        messages = _messages(raw_input, "input")
+        if isinstance(body.get("instructions"), str):
+            messages.insert(0, {"role": "system", "content": body["instructions"]})
+        rid = f"resp_{uuid.uuid4().hex}"
+
+        def response(text: str, status: str = "completed") -> dict[str, Any]:
+            content = [{"type": "output_text", "text": text}]
+            return {
+                "id": rid,
+                "object": "response",
+                "created_at": int(time.time()),
+                "model": self.model,
+                "status": status,
+                "output": (
+                    [{"type": "message", "role": "assistant", "content": content}] if text else []
+                ),
+            }
+
+        if not body.get("stream"):
+            await _send_json(writer, 200, response(await self._generate(req, messages)))
+            return
+
+        def tail(text: str) -> list[bytes]:
+            return [
+                _sse("response.output_text.done", {"text": text}),
+                _sse("response.completed", {"response": response(text)}),
+            ]
+
+        await self._stream(
+            req,
+            writer,
+            messages,
+            content_type="text/event-stream",
+            head=[_sse("response.created", {"response": response("", "in_progress")})],
+            chunk=lambda piece: _sse("response.output_text.delta", {"delta": piece}),
+            tail=tail,
+            error=lambda e: _sse("error", {"message": str(e)}),
+        )
+
+    async def _generate(self, req: _Request, messages: list[Message]) -> str:
+        tenant, priority = _tenant(req), _priority(req)
+        async with self._slot(tenant):
+            try:
+                with scheduling(tenant=tenant, priority=priority):
+                    return await self.client.generate(messages)
+            except RequestDropped as e:
+                raise _HTTPError(503, str(e)) from e
+            except Exception as e:
+                self.stats.upstream_errors += 1
+                raise _HTTPError(502, f"upstream error: {e}") from e
+
+    async def _stream(
+        self,
+        req: _Request,
+        writer: asyncio.StreamWriter,
+        messages: list[Message],
+        *,
+        content_type: str,
+        chunk: Callable[[str], bytes],
+        tail: Callable[[str], list[bytes]],
+        error: Callable[[Exception], bytes],
+        head: list[bytes] | None = None,
+    ) -> None:
+        tenant, priority = _tenant(req), _priority(req)
+        async with self._slot(tenant):
+            pieces = _pieces(self.client, messages)
+            try:
+                # Wait for the first piece before committing to 200: an upstream that
+                # fails straight away still gets a proper 502.
+                try:
+                    with scheduling(tenant=tenant, priority=priority):
+                        first = await anext(pieces, None)
+                except RequestDropped as e:
+                    raise _HTTPError(503, str(e)) from e
+                except Exception as e:
+                    self.stats.upstream_errors += 1
+                    raise _HTTPError(502, f"upstream error: {e}") from e
+
+                _write_head(writer, 200, {"Content-Type": content_type}, chunked=True)
+                text: list[str] = []
+                try:
+                    for data in head or []:
+                        await _write_chunk(writer, data)
+                    if first is not None:
+                        text.append(first)
+                        await _write_chunk(writer, chunk(first))
+                    try:
+                        async for piece in pieces:
+                            text.append(piece)
+                            await _write_chunk(writer, chunk(piece))
+                    except Exception as e:
+                        self.stats.upstream_errors += 1
+                        await _write_chunk(writer, error(e))
+                    else:
+                        for data in tail("".join(text)):
+                            await _write_chunk(writer, data)
+                    writer.write(b"0\r\n\r\n")
+                    await writer.drain()
+                except ConnectionError:
+                    self.stats.disconnects += 1
+                    raise
+            finally:
+                await pieces.aclose()  # a caller that left stops the upstream stream too
+
+
+async def _pieces(client: AsyncLLMClient, messages: list[Message]) -> AsyncGenerator[str, None]:
+    stream = getattr(client, "stream", None)
+    if stream is None:
+        yield await client.generate(messages)
+        return
+    async for piece in stream(messages):
+        yield piece
+
+
+def _tenant(req: _Request) -> str:
+    return req.headers.get(TENANT_HEADER) or DEFAULT_TENANT
+
+
+def _priority(req: _Request) -> Priority | None:
+    raw = req.headers.get(PRIORITY_HEADER)
+    if not raw:
+        return None
+    for p in PRIORITIES:
+        if raw.lower() == p:
+            return p
+    raise _HTTPError(400, f"X-Priority must be one of {list(PRIORITIES)}")
+
+
+def _json_body(req: _Request) -> dict[str, Any]:
+    try:
+        body = json.loads(req.body or b"{}")
+    except ValueError as e:
+        raise _HTTPError(400, f"invalid JSON: {e}") from None
+    if not isinstance(body, dict):
+        raise _HTTPError(400, "request body must be a JSON object")
+    return body
+
+
+def _messages(raw: object, name: str) -> list[Message]:
+    if not isinstance(raw, list) or not raw:
+        raise _HTTPError(400, f"'{name}' must be a non-empty list of messages")
+    out: list[Message] = []
+    for m in raw:
+        if not isinstance(m, dict) or m.get("role") not in ROLES:
+            raise _HTTPError(400, f"each {name} item needs a role in {sorted(ROLES)}")
+        content = m.get("content")
+        if isinstance(content, list):  # Responses API content parts
+            content = "".join(str(p.get("text", "")) for p in content if isinstance(p, dict))
+        if not isinstance(content, str):
+            raise _HTTPError(400, f"{name} content must be a string or a list of text parts")
+        out.append({"role": m["role"], "content": content})
+    return out
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def _sse(event: str, payload: dict[str, Any]) -> bytes:
+    data = json.dumps({"type": event, **payload}, ensure_ascii=False)
+    return f"event: {event}\ndata: {data}\n\n".encode()
+
+
+def _write_head(
+    writer: asyncio.StreamWriter,
+    status: int,
+    headers: dict[str, str],
+    *,
+    chunked: bool = False,
+    keep_alive: bool = True,
+) -> None:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    if chunked:
+        lines.append("Transfer-Encoding: chunked")
+    if not keep_alive:
+        lines.append("Connection: close")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+
+async def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+    await writer.drain()  # backpressure: wait while the caller's socket buffer is full
+
+
+async def _send_json(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: dict[str, Any],
+    *,
+    headers: dict[str, str] | None = None,
+    keep_alive: bool = True,
+) -> None:
+    raw = json.dumps(payload, ensure_ascii=False).encode()
+    head = {"Content-Type": "application/json", "Content-Length": str(len(raw)), **(headers or {})}
+    _write_head(writer, status, head, keep_alive=keep_alive)
+    writer.write(raw)
+    await writer.drain()
+
+
+def wrap_backend(
+    client: AsyncLLMClient,
+    s: Settings,
+    provider: str,
+    *,
+    scheduler: Scheduler | None = None,
+    secondary: AsyncLLMClient | None = None,
+) -> AsyncLLMClient:
+    """Scheduling, hedging, retries and coalescing for the `llm-lab serve` backend."""
+    if scheduler is not None:
+        from .scheduler import AsyncScheduledClient
+
+        # Innermost: every retry attempt queues again, backoff sleeps hold no slot.
+        client = AsyncScheduledClient(client, scheduler)
+    if secondary is not None:
+        from .hedge import AsyncHedgedClient, HedgePolicy
+
+        client = AsyncHedgedClient(client, secondary, HedgePolicy.from_settings(s))
+    if s.retry_max_attempts > 1:
+        from .resilience import AsyncResilientClient
+
+        client = AsyncResilientClient.from_settings(client, s)
+    if s.coalesce_enabled:
+        from .coalesce import AsyncCoalescingClient
+
+        # Many tenants sending the same prompt is exactly what single-flight is for.
+        client = AsyncCoalescingClient(client, provider=provider)
+    return client
+
+
+async def serve(
+    s: Settings,
+    provider: str,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    observers: Sequence[Observer] = (),
+    ready: Callable[[Gateway], None] | None = None,
+) -> None:
+    """Run the gateway until cancelled; clients are created inside the serving loop."""
+    from .factory import LLMFactory
+
+    backends = [LLMFactory.create_async(provider, settings=s, observers=observers)]
+    if s.hedge_secondary:
+        from .hedge import create_async_secondary
+
+        backends.append(create_async_secondary(s, observers=observers))
+    scheduler = Scheduler.from_settings(s, provider) if s.scheduler_enabled else None
+    client = wrap_backend(
+        backends[0],
+        s,
+        provider,
+        scheduler=scheduler,
+        secondary=backends[1] if len(backends) > 1 else None,
+    )
+    gw = Gateway.from_settings(client, s, scheduler=scheduler)
+    try:
+        await gw.start(host, port)
+        if ready is not None:
+            ready(gw)
+        await gw.serve_forever()
+    finally:
+        await gw.aclose()
+        for backend in backends:
+            aclose = getattr(backend, "aclose", None)
+            if aclose is not None:
+                await aclose()
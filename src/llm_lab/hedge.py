@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterator, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Literal
+
+from .contracts import AsyncLLMClient, LLMClient, iter_stream
+from .factory import LLMFactory
+from .types import Message
+
+if TYPE_CHECKING:
+    from .observe import Observer
+    from .settings import Settings
+
+_Kind = Literal["chunk", "done", "error"]
+_Event = tuple[int, _Kind, Any]  # leg (0 = primary, 1 = secondary), kind, payload
+
+
+@dataclass(frozen=True, slots=True)
+class HedgePolicy:
+    percentile: float = 0.95  # hedge once the primary is slower than this share of calls
+    initial_delay_s: float = 1.0  # used until min_samples first-token times are known
+    min_delay_s: float = 0.05
+    max_delay_s: float = 30.0
+    max_ratio: float = 0.1  # at most this share of calls may be hedged
+    window: int = 256
+    min_samples: int = 20
+
+    @classmethod
+    def from_settings(cls, s: Settings) -> HedgePolicy:
+        return cls(
+            percentile=s.hedge_percentile,
+            initial_delay_s=s.hedge_initial_delay_s,
+            max_ratio=s.hedge_max_ratio,
+        )
+
+
+@dataclass(slots=True)
+class HedgeStats:
+    calls: int = 0
+    hedged: int = 0  # calls that also went to the secondary
+    hedge_wins: int = 0  # hedged calls the secondary answered first
+    denied: int = 0  # calls past the delay that were not hedged (max_ratio reached)
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.calls if self.calls else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        """Share of hedged calls won by the secondary."""
+        return self.hedge_wins / self.hedged if self.hedged else 0.0
+
+
+class _Hedging:
+    # Delay estimate and stats shared by the sync and async clients.
+
+    def __init__(self, policy: HedgePolicy | None) -> None:
+        self.policy = policy or HedgePolicy()
+        self.stats = HedgeStats()
+        self._ttft: deque[float] = deque(maxlen=self.policy.window)
+        self._lock = threading.Lock()
+
+    def delay_s(self) -> float:
+        """The policy percentile of recent primary first-token times, clamped."""
+        p = self.policy
+        with self._lock:
+            if len(self._ttft) < p.min_samples:
+                return p.initial_delay_s
+            samples = sorted(self._ttft)
+        q = samples[min(len(samples) - 1, int(p.percentile * len(samples)))]
+        return min(p.max_delay_s, max(p.min_delay_s, q))
+
+    def _record_ttft(self, s: float) -> None:
+        with self._lock:
+            self._ttft.append(s)
+
+    def _admit(self) -> None:
+        with self._lock:
+            self.stats.calls += 1
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.stats.hedged >= self.policy.max_ratio * self.stats.calls:
+                self.stats.denied += 1
+                return False
+            self.stats.hedged += 1
+            return True
+
+    def _record_win(self, leg: int) -> None:
+        if leg == 1:
+            with self._lock:
+                self.stats.hedge_wins += 1
+
+
+class _Race:
+    """One hedged call; the sync and async drivers feed it leg events."""
+
+    def __init__(self, owner: _Hedging, *, stream: bool) -> None:
+        self.owner = owner
+        self.stream = stream
+        self.started = time.monotonic()
+        self.hedge_at = self.started + owner.delay_s()
+        self.may_hedge = True
+        self.hedged = False
+        self.winner: int | None = None
+        self.loser: int | None = None  # set once; the driver cancels that leg
+        self.alive = {0}
+        self.chunks: tuple[list[str], list[str]] = ([], [])
+        self.errors: dict[int, Exception] = {}
+        self.finished = False
+        self.result = ""
+        self._ttft_seen = False
+
+    def wait_s(self) -> float | None:
+        if not self.may_hedge:
+            return None
+        return max(0.0, self.hedge_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """The primary missed the delay; True if the secondary should be started."""
+        self.may_hedge = False
+        if not self.owner._take_hedge():
+            return False
+        self.hedged = True
+        self.alive.add(1)
+        return True
+
+    def on_event(self, leg: int, kind: _Kind, payload: Any) -> str | None:
+        """Apply one event; returns a piece to pass on (streams) or raises the final error."""
+        if self.winner is not None and leg != self.winner:
+            return None
+        if kind == "error":
+            self.alive.discard(leg)
+            self.errors[leg] = payload
+            if leg == self.winner or not self.alive:
+                self.may_hedge = False
+                raise self.errors.get(0, payload)
+            return None
+        if kind == "chunk":
+            if leg == 0 and not self._ttft_seen:
+                self._ttft_seen = True
+                self.may_hedge = False
+                self.owner._record_ttft(time.monotonic() - self.started)
+            if self.stream:
+                if self.winner is None:
+                    self._win(leg)
+                return str(payload)
+            self.chunks[leg].append(payload)
+            return None
+        if self.winner is None:
+            self._win(leg)
+        self.finished = True
+        self.result = "".join(self.chunks[leg])
+        return None
+
+    def _win(self, leg: int) -> None:
+        self.winner = leg
+        if self.hedged:
+            self.loser = 1 - leg
+            self.owner._record_win(leg)
+
+
+def _run_leg(
+    client: LLMClient,
+    messages: list[Message],
+    leg: int,
+    events: queue.SimpleQueue[_Event],
+    stop: threading.Event,
+) -> None:
+    pieces = iter_stream(client, messages)
+    try:
+        for piece in pieces:
+            if stop.is_set():
+                return
+            events.put((leg, "chunk", piece))
+        events.put((leg, "done", None))
+    except Exception as e:
+        events.put((leg, "error", e))
+    finally:
+        close = getattr(pieces, "close", None)
+        if close is not None:
+            close()  # closes the HTTP response of a cancelled leg
+
+
+class HedgedClient(_Hedging):
+    """Sends a call to `secondary` too when `primary` is slow to produce a first token.
+
+    The hedge fires after `delay_s()`: a percentile of the primary's recent
+    first-token times, so only the slow tail is duplicated, and never for more than
+    `policy.max_ratio` of calls. generate() returns whichever leg finishes first;
+    stream() commits to whichever leg yields a chunk first. The other leg is
+    cancelled; sync legs run in threads and stop at their next chunk.
+    """
+
+    def __init__(
+        self,
+        primary: LLMClient,
+        secondary: LLMClient,
+        policy: HedgePolicy | None = None,
+    ) -> None:
+        super().__init__(policy)
+        self.primary = primary
+        self.secondary = secondary
+        self.model = getattr(primary, "model", None)
+        self.options = getattr(primary, "options", None)
+
+    @classmethod
+    def from_settings(
+        cls,
+        primary: LLMClient,
+        s: Settings,
+        *,
+        secondary: str | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> HedgedClient:
+        target = secondary or s.hedge_secondary
+        if not target:
+            raise ValueError("HEDGE_SECONDARY is required for a hedged client")
+        provider, settings = _secondary_settings(s, target)
+        return cls(
+            primary,
+            LLMFactory.create(provider, settings=settings, observers=observers),
+            HedgePolicy.from_settings(s),
+        )
+
+    def generate(self, messages: list[Message]) -> str:
+        race = _Race(self, stream=False)
+        for _ in self._drive(race, messages):
+            pass
+        return race.result
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        return self._drive(_Race(self, stream=True), messages)
+
+    def _drive(self, race: _Race, messages: list[Message]) -> Iterator[str]:
+        self._admit()
+        events: queue.SimpleQueue[_Event] = queue.SimpleQueue()
+        stops = (threading.Event(), threading.Event())
+        self._start(self.primary, messages, 0, events, stops[0])
+        try:
+            while not race.finished:
+                try:
+                    leg, kind, payload = events.get(timeout=race.wait_s())
+                except queue.Empty:
+                    if race.expired():
+                        self._start(self.secondary, messages, 1, events, stops[1])
+                    continue
+                piece = race.on_event(leg, kind, payload)
+                if race.loser is not None:
+                    stops[race.loser].set()
+                if piece is not None:
+                    yield piece
+        finally:
+            for stop in stops:
+                stop.set()
+
+    @staticmethod
+    def _start(
+        client: LLMClient,
+        messages: list[Message],
+        leg: int,
+        events: queue.SimpleQueue[_Event],
+        stop: threading.Event,
+    ) -> None:
+        threading.Thread(
+            target=_run_leg,
+            args=(client, messages, leg, events, stop),
+            name=f"llm-lab-hedge-{leg}",
+            daemon=True,
+        ).start()
+
+
+async def _run_async_leg(
+    client: AsyncLLMClient,
+    messages: list[Message],
+    leg: int,
+    events: asyncio.Queue[_Event],
+) -> None:
+    try:
+        stream = getattr(client, "stream", None)
+        if stream is None:
+            events.put_nowait((leg, "chunk", await client.generate(messages)))
+        else:
+            async for piece in stream(messages):
+                events.put_nowait((leg, "chunk", piece))
+        events.put_nowait((leg, "done", None))
+    except Exception as e:
+        events.put_nowait((leg, "error", e))
+
+
+class AsyncHedgedClient(_Hedging):
+    """asyncio counterpart of HedgedClient; the losing leg is cancelled at once."""
+
+    def __init__(
+        self,
+        primary: AsyncLLMClient,
+        secondary: AsyncLLMClient,
+        policy: HedgePolicy | None = None,
+    ) -> None:
+        super().__init__(policy)
+        self.primary = primary
+        self.secondary = secondary
+        self.model = getattr(primary, "model", None)
+        self.options = getattr(primary, "options", None)
+
+    @classmethod
+    def from_settings(
+        cls,
+        primary: AsyncLLMClient,
+        s: Settings,
+        *,
+        secondary: str | None = None,
+        observers: Sequence[Observer] = (),
+    ) -> AsyncHedgedClient:
+        return cls(
+            primary,
+            create_async_secondary(s, secondary, observers=observers),
+            HedgePolicy.from_settings(s),
+        )
+
+    async def generate(self, messages: list[Message]) -> str:
+        race = _Race(self, stream=False)
+        async for _ in self._drive(race, messages):
+            pass
+        return race.result
+
+    def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        return self._drive(_Race(self, stream=True), messages)
+
+    async def _drive(self, race: _Race, messages: list[Message]) -> AsyncIterator[str]:
+        self._admit()
+        events: asyncio.Queue[_Event] = asyncio.Queue()
+        legs = [asyncio.create_task(_run_async_leg(self.primary, messages, 0, events))]
+        try:
+            while not race.finished:
+                try:
+                    async with asyncio.timeout(race.wait_s()):
+                        leg, kind, payload = await events.get()
+                except TimeoutError:
+                    if race.expired():
+                        legs.append(
+                            asyncio.create_task(_run_async_leg(self.secondary, messages, 1, events))
+                        )
+                    continue
+                piece = race.on_event(leg, kind, payload)
+                if race.loser is not None:
+                    legs[race.loser].cancel()
+                if piece is not None:
+                    yield piece
+        finally:
+            for task in legs:
+                task.cancel()
+            await asyncio.gather(*legs, return_exceptions=True)
+
+
+def create_async_secondary(
+    s: Settings, target: str | None = None, *, observers: Sequence[Observer] = ()
+) -> AsyncLLMClient:
+    """The async client hedges go to: `target` or HEDGE_SECONDARY (closed by the caller)."""
+    target = target or s.hedge_secondary
+    if not target:
+        raise ValueError("HEDGE_SECONDARY is required for a hedged client")
+    provider, settings = _secondary_settings(s, target)
+    return LLMFactory.create_async(provider, settings=settings, observers=observers)
+
+
+def _secondary_settings(s: Settings, target: str) -> tuple[str, Settings]:
+    """'openai' / 'ollama' use their configured endpoint; anything else is an Ollama host."""
+    if target in ("openai", "ollama"):
+        return target, s
+    from .settings import split_hosts
+
+    return "ollama", s.model_copy(update={"ollama_host": split_hosts(target)[0]})
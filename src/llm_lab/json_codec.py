@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import functools
+import json
+from dataclasses import dataclass
+from typing import Any, Literal, Protocol
+
+JsonBackend = Literal["auto", "msgspec", "orjson", "json"]
+_PREFERENCE: tuple[JsonBackend, ...] = ("msgspec", "orjson", "json")
+
+
+@dataclass(frozen=True, slots=True)
+class Usage:
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    cached_tokens: int | None = None  # input_tokens_details.cached_tokens
+
+
+@dataclass(frozen=True, slots=True)
+class ResponseBody:
+    """The fields of an OpenAI Responses object that the clients read."""
+
+    texts: list[str] | None  # output_text parts of assistant messages; None = no "output"
+    usage: Usage | None = None
+    error: Any = None
+
+
+@dataclass(frozen=True, slots=True)
+class StreamEvent:
+    """One decoded Responses SSE `data:` payload."""
+
+    type: str | None = None
+    delta: str | None = None  # response.output_text.delta
+    response: ResponseBody | None = None  # response.created / completed / failed
+    error: Any = None
+    message: str | None = None  # top-level "error" events
+
+
+class JsonCodec(Protocol):
+    name: str
+
+    def dumps(self, obj: Any) -> bytes: ...
+
+    def loads(self, data: bytes | str) -> Any: ...
+
+    def response(self, data: bytes | str) -> ResponseBody: ...
+
+    def event(self, data: bytes | str) -> StreamEvent: ...
+
+
+@functools.cache
+def get_codec(backend: JsonBackend = "auto") -> JsonCodec:
+    """JSON codec by backend name; "auto" = the fastest one installed.
+
+    msgspec decodes Responses bodies straight into structs that declare only the
+    fields we read, skipping everything else (reasoning items, tool definitions,
+    metadata) without building dicts for it; orjson is a faster drop-in for
+    json.loads/dumps. Neither is required: the stdlib codec always works.
+    """
+    if backend == "auto":
+        for name in _PREFERENCE:
+            try:
+                return get_codec(name)
+            except ImportError:
+                continue
+    if backend == "msgspec":
+        return _msgspec_codec()
+    if backend == "orjson":
+        return _OrjsonCodec()
+    if backend == "json":
+        return _StdlibCodec()
+    raise ValueError(f"unknown JSON backend {backend!r}; use one of auto, {', '.join(_PREFERENCE)}")
+
+
+def available_backends() -> list[JsonBackend]:
+    """Installed backends, fastest first ("json" is always last)."""
+    out: list[JsonBackend] = []
+    for name in _PREFERENCE:
+        try:
+            get_codec(name)
+        except ImportError:
+            continue
+        out.append(name)
+    return out
+
+
+class _StdlibCodec:
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        # Same bytes httpx's json= produces.
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode()
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def response(self, data: bytes | str) -> ResponseBody:
+        return _response_from_dict(self.loads(data))
+
+    def event(self, data: bytes | str) -> StreamEvent:
+        return _event_from_dict(self.loads(data))
+
+
+class _OrjsonCodec(_StdlibCodec):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._dumps(obj)
+
+    def loads(self, data: bytes | str) -> Any:
+        return self._loads(data)
+
+
+def _response_from_dict(data: Any) -> ResponseBody:
+    if not isinstance(data, dict):
+        return ResponseBody(None)
+    out = data.get("output")
+    texts: list[str] | None = None
+    if isinstance(out, list):
+        texts = []
+        for item in out:
+            if not isinstance(item, dict):
+                continue
+            if item.get("type") != "message" or item.get("role") != "assistant":
+                continue
+            content = item.get("content")
+            if not isinstance(content, list):
+                continue
+            for c in content:
+                if isinstance(c, dict) and c.get("type") == "output_text":
+                    text = c.get("text")
+                    if isinstance(text, str):
+                        texts.append(text)
+    return ResponseBody(texts, _usage_from_dict(data.get("usage")), data.get("error"))
+
+
+def _usage_from_dict(usage: Any) -> Usage | None:
+    if not isinstance(usage, dict):
+        return None
+    details = usage.get("input_tokens_details")
+    cached = details.get("cached_tokens") if isinstance(details, dict) else None
+    return Usage(
+        _int(usage.get("input_tokens")),
+        _int(usage.get("output_tokens")),
+        _int(cached),
+    )
+
+
+def _event_from_dict(payload: Any) -> StreamEvent:
+    if not isinstance(payload, dict):
+        return StreamEvent()
+    kind, delta, message = payload.get("type"), payload.get("delta"), payload.get("message")
+    response = payload.get("response")
+    return StreamEvent(
+        kind if isinstance(kind, str) else None,
+        delta if isinstance(delta, str) else None,
+        _response_from_dict(response) if isinstance(response, dict) else None,
+        payload.get("error"),
+        message if isinstance(message, str) else None,
+    )
+
+
+def _int(v: Any) -> int | None:
+    return v if isinstance(v, int) and not isinstance(v, bool) else None
+
+
+def _msgspec_codec() -> JsonCodec:
+    from ._json_msgspec import MsgspecCodec
+
+    return MsgspecCodec()
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass, field, replace
+from typing import Any, Protocol
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CallEvent:
+    """One finished provider call. Durations in seconds; None = not measured."""
+
+    provider: str
+    model: str
+    operation: str  # "generate" | "stream" | "warm"
+    ok: bool
+    latency_s: float
+    error: str | None = None
+    queue_wait_s: float | None = None  # client-side rate limiter / scheduler
+    connect_s: float | None = None  # TCP+TLS setup; 0.0 = reused keep-alive connection
+    ttft_s: float | None = None
+    prompt_tokens: int | None = None
+    cached_tokens: int | None = None  # prompt tokens served from the provider's prefix cache
+    completion_tokens: int | None = None
+    tokens_per_s: float | None = None
+    load_s: float | None = None  # Ollama model load (cold start)
+    cache_hit: bool = False
+
+
+class Observer(Protocol):
+    def on_event(self, event: CallEvent) -> None: ...
+
+
+def emit(observers: Iterable[Observer], event: CallEvent) -> None:
+    # A broken observer must never break the call it observes.
+    for obs in observers:
+        try:
+            obs.on_event(event)
+        except Exception:
+            log.exception("observer %r failed", obs)
+
+
+def _describe(error: BaseException) -> str:
+    # A stream closed early (GeneratorExit) or a cancelled task did not complete.
+    if isinstance(error, GeneratorExit | asyncio.CancelledError):
+        return "cancelled"
+    return f"{type(error).__name__}: {error}"
+
+
+class CallTimer:
+    """Collects the timings of one call and emits a CallEvent when finished."""
+
+    def __init__(
+        self,
+        observers: Sequence[Observer],
+        provider: str,
+        model: str,
+        operation: str,
+    ) -> None:
+        self.observers = observers
+        self.provider = provider
+        self.model = model
+        self.operation = operation
+        self.started = time.perf_counter()
+        self.queue_wait_s: float | None = None
+        self.ttft_s: float | None = None
+        self.prompt_tokens: int | None = None
+        self.cached_tokens: int | None = None
+        self.completion_tokens: int | None = None
+        self.generation_s: float | None = None  # server-reported decode time, if any
+        self.load_s: float | None = None
+        self._connect_s = 0.0
+        self._connect_started: float | None = None
+        self._traced = False
+
+    def waited(self, seconds: float) -> None:
+        self.queue_wait_s = seconds
+
+    def first_token(self) -> None:
+        if self.ttft_s is None:
+            self.ttft_s = time.perf_counter() - self.started
+
+    def trace(self, name: str, info: Mapping[str, Any]) -> None:
+        """httpx/httpcore `trace` extension hook: accumulates connection setup time."""
+        self._traced = True
+        # connection.connect_tcp.*, connection.start_tls.*: only fire for new connections.
+        if not name.startswith("connection."):
+            return
+        if name.endswith(".started"):
+            self._connect_started = time.perf_counter()
+        elif name.endswith(".complete") and self._connect_started is not None:
+            self._connect_s += time.perf_counter() - self._connect_started
+            self._connect_started = None
+
+    async def atrace(self, name: str, info: Mapping[str, Any]) -> None:
+        # httpcore awaits the trace callback on async connections.
+        self.trace(name, info)
+
+    def finish(self, error: BaseException | None = None) -> None:
+        if not self.observers:
+            return
+        latency = time.perf_counter() - self.started
+        emit(
+            self.observers,
+            CallEvent(
+                provider=self.provider,
+                model=self.model,
+                operation=self.operation,
+                ok=error is None,
+                latency_s=latency,
+                error=None if error is None else _describe(error),
+                queue_wait_s=self.queue_wait_s,
+                connect_s=self._connect_s if self._traced else None,
+                ttft_s=self.ttft_s,
+                prompt_tokens=self.prompt_tokens,
+                cached_tokens=self.cached_tokens,
+                completion_tokens=self.completion_tokens,
+                tokens_per_s=self._tokens_per_s(latency),
+                load_s=self.load_s,
+            ),
+        )
+
+    def _tokens_per_s(self, latency: float) -> float | None:
+        if not self.completion_tokens:
+            return None
+        decode_s = self.generation_s
+        if decode_s is None:
+            decode_s = latency - (self.ttft_s or 0.0)
+        return self.completion_tokens / decode_s if decode_s > 0 else None
+
+
+def cache_hit_event(provider: str, model: str, operation: str, latency_s: float) -> CallEvent:
+    return CallEvent(provider, model, operation, ok=True, latency_s=latency_s, cache_hit=True)
+
+
+# Prometheus-style latency buckets, seconds.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+_HISTOGRAMS: dict[str, str] = {
+    "latency_s": "llm_lab_call_latency_seconds",
+    "ttft_s": "llm_lab_ttft_seconds",
+    "queue_wait_s": "llm_lab_queue_wait_seconds",
+    "connect_s": "llm_lab_connect_seconds",
+    "load_s": "llm_lab_model_load_seconds",
+}
+
+
+@dataclass(slots=True)
+class Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)  # last = +Inf
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile (0 < q <= 1)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+@dataclass(slots=True)
+class _Series:
+    calls: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    cold_starts: int = 0  # calls whose model load took >= cold_start_s
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    cache_reported_tokens: int = 0  # prompt tokens of calls that reported cached_tokens
+    completion_tokens: int = 0
+    histograms: dict[str, Histogram] = field(default_factory=dict)
+
+
+class HistogramAggregator:
+    """In-process Observer: per (provider, model) counters and latency histograms."""
+
+    def __init__(
+        self,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        *,
+        cold_start_s: float = 0.1,  # a resident model "loads" in milliseconds
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.cold_start_s = cold_start_s
+        self._series: dict[tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def on_event(self, event: CallEvent) -> None:
+        with self._lock:
+            s = self._series.setdefault((event.provider, event.model), _Series())
+            s.calls += 1
+            s.errors += not event.ok
+            s.cache_hits += event.cache_hit
+            s.cold_starts += event.load_s is not None and event.load_s >= self.cold_start_s
+            s.prompt_tokens += event.prompt_tokens or 0
+            if event.cached_tokens is not None:
+                s.cached_tokens += event.cached_tokens
+                s.cache_reported_tokens += event.prompt_tokens or 0
+            s.completion_tokens += event.completion_tokens or 0
+            for attr in _HISTOGRAMS:
+                value = getattr(event, attr)
+                if value is None:
+                    continue
+                h = s.histograms.get(attr)
+                if h is None:
+                    h = s.histograms[attr] = Histogram(self.buckets)
+                h.observe(value)
+
+    def snapshot(self) -> dict[tuple[str, str], _Series]:
+        with self._lock:
+            return {
+                k: replace(
+                    v,
+                    histograms={
+                        n: replace(h, counts=list(h.counts)) for n, h in v.histograms.items()
+                    },
+                )
+                for k, v in self._series.items()
+            }
+
+    def cached_token_ratio(self) -> float | None:
+        """Share of prompt tokens the providers served from their prefix cache.
+
+        Only calls whose response reported cached tokens count (OpenAI usage does,
+        Ollama does not); None when there were none.
+        """
+        with self._lock:
+            reported = sum(s.cache_reported_tokens for s in self._series.values())
+            cached = sum(s.cached_tokens for s in self._series.values())
+        return cached / reported if reported else None
+
+    def prometheus_text(self) -> str:
+        return prometheus_text(self)
+
+
+def _labels(provider: str, model: str, **extra: str) -> str:
+    pairs = {"provider": provider, "model": model, **extra}
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items())
+    return "{" + body + "}"
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    return "+Inf" if v == float("inf") else repr(float(v))
+
+
+def prometheus_text(agg: HistogramAggregator) -> str:
+    """Prometheus text exposition (v0.0.4) of an aggregator's current state."""
+    series = agg.snapshot()
+    lines: list[str] = []
+
+    counters = {
+        "llm_lab_calls_total": ("calls", "Provider calls"),
+        "llm_lab_errors_total": ("errors", "Failed provider calls"),
+        "llm_lab_cache_hits_total": ("cache_hits", "Calls answered from cache"),
+        "llm_lab_cold_starts_total": ("cold_starts", "Calls that had to load the model first"),
+        "llm_lab_prompt_tokens_total": ("prompt_tokens", "Prompt tokens reported by provider"),
+        "llm_lab_cached_prompt_tokens_total": (
+            "cached_tokens",
+            "Prompt tokens served from the provider's prefix cache",
+        ),
+        "llm_lab_completion_tokens_total": (
+            "completion_tokens",
+            "Completion tokens reported by provider",
+        ),
+    }
+    for name, (attr, help_text) in counters.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (provider, model), s in sorted(series.items()):
+            lines.append(f"{name}{_labels(provider, model)} {getattr(s, attr)}")
+
+    for attr, name in _HISTOGRAMS.items():
+        lines += [f"# HELP {name} {attr} histogram", f"# TYPE {name} histogram"]
+        for (provider, model), s in sorted(series.items()):
+            h = s.histograms.get(attr)
+            if h is None:
+                continue
+            cumulative = 0
+            for le, c in zip((*h.buckets, float("inf")), h.counts, strict=True):
+                cumulative += c
+                labels = _labels(provider, model, le=_fmt(le))
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            lines.append(f"{name}_sum{_labels(provider, model)} {_fmt(h.total)}")
+            lines.append(f"{name}_count{_labels(provider, model)} {h.count}")
+
+    return "\n".join(lines) + "\n"
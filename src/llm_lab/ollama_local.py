@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import re
 from collections.abc import Iterable, Mapping
 from typing import Any, Literal
 
@@ -54,5 +55,48 @@ def extract_stream_piece(chunk: Any, mode: OllamaMode) -> str:
     return piece if isinstance(piece, str) else ""
 
 
+# Server-side counters on the final (done) chunk; durations are nanoseconds.
+STAT_FIELDS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+
+
+def extract_stats(resp: Any) -> dict[str, int]:
+    stats: dict[str, int] = {}
+    for name in STAT_FIELDS:
+        value = _get(resp, name)
+        if isinstance(value, int):
+            stats[name] = value
+    return stats
+
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION = re.compile(r"(?:\d+(?:\.\d+)?(?:ms|s|m|h))+")
+
+
+def keep_alive_seconds(value: float | str | None) -> float | None:
+    """Ollama keep_alive ("30m", "1h30m", 300, "-1") in seconds; inf = forever, None = default."""
+    if value is None:
+        return None
+    if isinstance(value, int | float):
+        return float("inf") if value < 0 else float(value)
+    text = value.strip()
+    try:
+        return keep_alive_seconds(float(text))
+    except ValueError:
+        pass
+    if text.startswith("-"):
+        return float("inf")
+    if not _DURATION.fullmatch(text):
+        raise ValueError(f"invalid keep_alive duration: {value!r}")
+    return sum(float(n) * _DURATION_UNITS[u] for n, u in _DURATION_PART.findall(text))
+
+
 def join_stream(chunks: Iterable[Any], mode: OllamaMode) -> str:
     return "".join(extract_stream_piece(c, mode) for c in chunks)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Sequence
+
+from .types import Message
+
+_Key = tuple[str, str]  # (role, content) of one message
+
+
+class _Node:
+    __slots__ = ("children", "values")
+
+    def __init__(self) -> None:
+        self.children: dict[_Key, _Node] = {}
+        self.values: list[int] = []
+
+
+def prefix_order(conversations: Sequence[Sequence[Message] | None]) -> list[int]:
+    """Indices of `conversations` reordered so that shared message prefixes are adjacent.
+
+    A trie over (role, content) pairs, walked depth-first: every conversation that
+    starts with the same messages lands in one run, and inside it those sharing
+    more messages sit closer still. Siblings keep first-seen order, so input that
+    is already grouped comes back unchanged. Ollama reuses a slot's KV cache only
+    for an exact prefix of the previous prompt, and OpenAI prompt caching keys on
+    the leading tokens: back-to-back requests keep that prefix warm.
+    """
+    root = _Node()
+    for i, messages in enumerate(conversations):
+        node = root
+        for m in messages or ():
+            key = (m["role"], m["content"])
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _Node()
+            node = child
+        node.values.append(i)
+
+    order: list[int] = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        order.extend(node.values)
+        stack.extend(reversed(node.children.values()))
+    return order
+
+
+def prefix_digest(messages: Sequence[Message]) -> bytes | None:
+    """Stable digest of every message but the last; None when there is nothing before it.
+
+    Two calls that differ only in their final message (the same system/developer
+    header and history, a new question) share it, which makes it a routing key
+    for prefix-cache affinity.
+    """
+    if len(messages) < 2:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    for m in messages[:-1]:
+        h.update(json.dumps([m["role"], m["content"]], ensure_ascii=False).encode())
+        h.update(b"\n")
+    return h.digest()
+
+
+def rendezvous_rank(key: bytes, node: str) -> bytes:
+    """Highest-random-weight score of `node` for `key`: the max over nodes wins.
+
+    Removing a node moves only the keys it owned; the others keep their node.
+    """
+    return hashlib.blake2b(key + node.encode(), digest_size=8).digest()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from .tokens import estimate_prompt_tokens
+from .types import Message
+
+if TYPE_CHECKING:
+    from .settings import Settings
+
+
+class TokenBucket:
+    """FIFO-fair token bucket usable from threads and from any event loop.
+
+    Callers take a ticket and are served strictly in ticket order, so a large
+    request is never starved by a stream of small ones. State is guarded by a
+    plain lock that is never held across a wait, which keeps one bucket
+    shareable between sync clients and async clients on different loops.
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        capacity: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate_per_s <= 0 or capacity <= 0:
+            raise ValueError("rate_per_s and capacity must be > 0")
+        self.rate_per_s = rate_per_s
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned: set[int] = set()
+
+    def acquire(self, n: float = 1.0) -> float:
+        """Block until `n` tokens are taken; returns seconds spent waiting."""
+        n = min(n, self.capacity)
+        started = self._clock()
+        with self._cond:
+            ticket = self._take_ticket()
+            try:
+                while True:
+                    wait = self._try_take(ticket, n)
+                    if wait == 0.0:
+                        return self._clock() - started
+                    self._cond.wait(timeout=wait)
+            except BaseException:
+                if ticket >= self._serving:
+                    self._abandon(ticket)
+                raise
+
+    async def acquire_async(self, n: float = 1.0) -> float:
+        n = min(n, self.capacity)
+        started = self._clock()
+        with self._cond:
+            ticket = self._take_ticket()
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_take(ticket, n)
+                if wait == 0.0:
+                    return self._clock() - started
+                await asyncio.sleep(min(wait, 0.05) if wait is not None else 0.005)
+        except BaseException:
+            with self._cond:
+                if ticket >= self._serving:
+                    self._abandon(ticket)
+            raise
+
+    def _take_ticket(self) -> int:
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _try_take(self, ticket: int, n: float) -> float | None:
+        # 0.0: taken; float: seconds until enough tokens; None: not our turn yet.
+        if ticket != self._serving:
+            return None
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+        if self._tokens >= n:
+            self._tokens -= n
+            self._advance()
+            return 0.0
+        return (n - self._tokens) / self.rate_per_s
+
+    def _abandon(self, ticket: int) -> None:
+        # A cancelled async waiter must not block everyone queued behind it.
+        if ticket == self._serving:
+            self._advance()
+        else:
+            self._abandoned.add(ticket)
+
+    def _advance(self) -> None:
+        self._serving += 1
+        while self._serving in self._abandoned:
+            self._abandoned.discard(self._serving)
+            self._serving += 1
+        self._cond.notify_all()
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one provider/model."""
+
+    def __init__(
+        self,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        *,
+        expected_output_tokens: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.requests = TokenBucket(rpm / 60.0, rpm, clock=clock) if rpm else None
+        self.tokens = TokenBucket(tpm / 60.0, tpm, clock=clock) if tpm else None
+        self.expected_output_tokens = expected_output_tokens
+
+    def cost(self, messages: list[Message]) -> int:
+        """Estimated input + output tokens charged against the TPM bucket."""
+        return estimate_prompt_tokens(messages) + self.expected_output_tokens
+
+    def acquire(self, messages: list[Message]) -> float:
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None:
+            waited += self.tokens.acquire(self.cost(messages))
+        return waited
+
+    async def acquire_async(self, messages: list[Message]) -> float:
+        waited = 0.0
+        if self.requests is not None:
+            waited += await self.requests.acquire_async(1)
+        if self.tokens is not None:
+            waited += await self.tokens.acquire_async(self.cost(messages))
+        return waited
+
+
+_SHARED: dict[tuple[str, float | None, float | None, int], RateLimiter] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_limiter(settings: Settings, provider: str, model: str) -> RateLimiter | None:
+    """Process-wide limiter for `provider:model` (falls back to the provider entry)."""
+    spec = settings.rate_limits.get(f"{provider}:{model}") or settings.rate_limits.get(provider)
+    if spec is None or not (spec.rpm or spec.tpm):
+        return None
+    key = (f"{provider}:{model}", spec.rpm, spec.tpm, settings.rate_limit_output_tokens)
+    with _SHARED_LOCK:
+        limiter = _SHARED.get(key)
+        if limiter is None:
+            limiter = RateLimiter(
+                spec.rpm,
+                spec.tpm,
+                expected_output_tokens=settings.rate_limit_output_tokens,
+            )
+            _SHARED[key] = limiter
+        return limiter
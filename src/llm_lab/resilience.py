@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Literal
+
+import httpx
+
+from .contracts import AsyncLLMClient, LLMClient, iter_stream
+from .settings import Settings
+from .types import Message
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while the breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay_s: float = 0.5
+    max_delay_s: float = 20.0
+    jitter: bool = True
+    deadline_s: float | None = None  # budget for all attempts of one call
+
+    @classmethod
+    def from_settings(cls, s: Settings) -> RetryPolicy:
+        return cls(
+            max_attempts=s.retry_max_attempts,
+            base_delay_s=s.retry_base_delay_s,
+            max_delay_s=s.retry_max_delay_s,
+            deadline_s=s.retry_deadline_s,
+        )
+
+    def backoff_s(self, attempt: int, rand: Callable[[], float] = random.random) -> float:
+        """Delay before retry number `attempt` (1-based): full-jitter exponential."""
+        cap = min(self.max_delay_s, self.base_delay_s * 2.0 ** (attempt - 1))
+        return cap * rand() if self.jitter else cap
+
+
+def status_code(e: BaseException) -> int | None:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code
+    status = getattr(e, "status_code", None)  # ollama.ResponseError
+    return status if isinstance(status, int) and status > 0 else None
+
+
+def is_retryable(e: BaseException) -> bool:
+    if isinstance(e, httpx.TransportError | ConnectionError):
+        return True
+    status = status_code(e)
+    return status is not None and status in RETRY_STATUSES
+
+
+def retry_after_s(e: BaseException) -> float | None:
+    """Parse Retry-After (delta-seconds or HTTP-date) from an HTTP status error."""
+    if not isinstance(e, httpx.HTTPStatusError):
+        return None
+    raw: str | None = e.response.headers.get("retry-after")
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+@dataclass(slots=True)
+class ResilienceStats:
+    calls: int = 0
+    successes: int = 0
+    retries: int = 0
+    throttled: int = 0  # 429 answers: the provider is healthy but rate-limiting us
+    server_errors: int = 0  # 5xx answers
+    transport_errors: int = 0  # connect/read/timeouts: the provider looks down
+    deadline_exceeded: int = 0
+    short_circuited: int = 0  # calls rejected by an open breaker
+    breaker_opens: int = 0
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, probes after `reset_timeout_s`."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self._state: BreakerState = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_owner: object | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self, owner: object | None = None) -> bool:
+        """May a call go upstream? In half_open only one trial call may (`owner`, if given)."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == "closed":
+                return True
+            if self._state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True  # one trial call decides
+                self._trial_owner = owner
+                return True
+            return False
+
+    def release_trial(self, owner: object) -> None:
+        """`owner` ended without a verdict (abandoned, cancelled, local error)."""
+        with self._lock:
+            if self._trial_in_flight and self._trial_owner is owner:
+                self._trial_in_flight = False
+                self._trial_owner = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+            self._trial_owner = None
+
+    def record_failure(self) -> bool:
+        """Count a failure; True if this one opened the breaker."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            self._trial_owner = None
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                opened = self._state != "open"
+                self._state = "open"
+                self._opened_at = self._clock()
+                return opened
+            return False
+
+    def _maybe_half_open(self) -> None:
+        if self._state == "open" and self._clock() - self._opened_at >= self.reset_timeout_s:
+            self._state = "half_open"
+            self._trial_in_flight = False
+            self._trial_owner = None
+
+
+class _Resilience:
+    # Shared bookkeeping for the sync and async wrappers.
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None,
+        breaker: CircuitBreaker | None,
+        clock: Callable[[], float],
+        rand: Callable[[], float],
+    ) -> None:
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = ResilienceStats()
+        self._clock = clock
+        self._rand = rand
+        self._lock = threading.Lock()
+
+    def _admit(self, owner: object) -> float:
+        with self._lock:
+            self.stats.calls += 1
+        if not self.breaker.allow(owner):
+            with self._lock:
+                self.stats.short_circuited += 1
+            raise CircuitOpenError("circuit open: upstream recently failing, not calling it")
+        return self._clock()
+
+    def _on_success(self) -> None:
+        self.breaker.record_success()
+        with self._lock:
+            self.stats.successes += 1
+
+    def _on_error(self, e: Exception, attempt: int, started: float, owner: object) -> float:
+        """Return the delay before the next attempt, or re-raise `e`."""
+        retryable = is_retryable(e)
+        status = status_code(e)
+        with self._lock:
+            if status == 429:
+                self.stats.throttled += 1
+            elif status is not None and status >= 500:
+                self.stats.server_errors += 1
+            elif isinstance(e, httpx.TransportError | ConnectionError):
+                self.stats.transport_errors += 1
+
+        # 429 means "slow down", not "unhealthy": keep it out of the breaker.
+        if retryable and status != 429:
+            if self.breaker.record_failure():
+                with self._lock:
+                    self.stats.breaker_opens += 1
+        elif status is not None and status < 500:
+            self.breaker.record_success()  # any other 4xx: the upstream is up and answering
+        if not retryable or attempt >= self.policy.max_attempts:
+            raise e
+
+        delay = self.policy.backoff_s(attempt, self._rand)
+        hinted = retry_after_s(e)
+        if hinted is not None:
+            delay = max(delay, hinted)
+
+        deadline = self.policy.deadline_s
+        if deadline is not None and self._clock() - started + delay > deadline:
+            with self._lock:
+                self.stats.deadline_exceeded += 1
+            raise DeadlineExceeded(
+                f"deadline of {deadline}s exceeded after {attempt} attempts"
+            ) from e
+        if not self.breaker.allow(owner):
+            with self._lock:
+                self.stats.short_circuited += 1
+            raise CircuitOpenError("circuit opened while retrying") from e
+        with self._lock:
+            self.stats.retries += 1
+        return delay
+
+    def _remaining_s(self, started: float) -> float | None:
+        if self.policy.deadline_s is None:
+            return None
+        return self.policy.deadline_s - (self._clock() - started)
+
+
+class ResilientClient(_Resilience):
+    """Retries transient failures of an LLMClient behind a circuit breaker.
+
+    Streams are retried only until the first chunk has been yielded. Sync calls
+    cannot be interrupted mid-flight, so the deadline bounds when a retry may start;
+    the per-request timeout stays with the underlying HTTP client.
+    """
+
+    def __init__(
+        self,
+        inner: LLMClient,
+        policy: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        *,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        rand: Callable[[], float] = random.random,
+    ) -> None:
+        super().__init__(policy, breaker, clock, rand)
+        self._inner = inner
+        self._sleep = sleep
+        self.model = getattr(inner, "model", None)
+        self.options = getattr(inner, "options", None)
+
+    @classmethod
+    def from_settings(cls, inner: LLMClient, s: Settings) -> ResilientClient:
+        breaker = CircuitBreaker(s.breaker_failure_threshold, s.breaker_reset_timeout_s)
+        return cls(inner, RetryPolicy.from_settings(s), breaker)
+
+    def generate(self, messages: list[Message]) -> str:
+        call = object()  # identifies this call if it becomes the half-open trial
+        started = self._admit(call)
+        attempt = 1
+        try:
+            while True:
+                try:
+                    text = self._inner.generate(messages)
+                except Exception as e:
+                    self._sleep(self._on_error(e, attempt, started, call))
+                    attempt += 1
+                    continue
+                self._on_success()
+                return text
+        finally:
+            self.breaker.release_trial(call)
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        call = object()
+        started = self._admit(call)
+        attempt = 1
+        try:
+            while True:
+                yielded = False
+                try:
+                    for piece in iter_stream(self._inner, messages):
+                        yielded = True
+                        yield piece
+                except Exception as e:
+                    if yielded:
+                        raise
+                    self._sleep(self._on_error(e, attempt, started, call))
+                    attempt += 1
+                    continue
+                self._on_success()
+                return
+        finally:  # also GeneratorExit: a consumer that stops early decides nothing
+            self.breaker.release_trial(call)
+
+
+class AsyncResilientClient(_Resilience):
+    """asyncio counterpart of ResilientClient; the deadline also cancels a running attempt."""
+
+    def __init__(
+        self,
+        inner: AsyncLLMClient,
+        policy: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        *,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        rand: Callable[[], float] = random.random,
+    ) -> None:
+        super().__init__(policy, breaker, clock, rand)
+        self._inner = inner
+        self._sleep = sleep
+        self.model = getattr(inner, "model", None)
+        self.options = getattr(inner, "options", None)
+
+    @classmethod
+    def from_settings(cls, inner: AsyncLLMClient, s: Settings) -> AsyncResilientClient:
+        breaker = CircuitBreaker(s.breaker_failure_threshold, s.breaker_reset_timeout_s)
+        return cls(inner, RetryPolicy.from_settings(s), breaker)
+
+    async def generate(self, messages: list[Message]) -> str:
+        call = object()
+        started = self._admit(call)
+        attempt = 1
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(self._remaining_s(started)):
+                        text = await self._inner.generate(messages)
+                except TimeoutError as e:
+                    if self._remaining_s(started) is not None:
+                        with self._lock:
+                            self.stats.deadline_exceeded += 1
+                        raise DeadlineExceeded(
+                            f"deadline of {self.policy.deadline_s}s exceeded"
+                        ) from e
+                    await self._sleep(self._on_error(e, attempt, started, call))
+                except Exception as e:
+                    await self._sleep(self._on_error(e, attempt, started, call))
+                else:
+                    self._on_success()
+                    return text
+                attempt += 1
+        finally:  # deadline, cancellation: no verdict on the upstream
+            self.breaker.release_trial(call)
+
+    async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        call = object()
+        started = self._admit(call)
+        attempt = 1
+        stream_fn: Callable[[list[Message]], AsyncIterator[str]] | None = getattr(
+            self._inner, "stream", None
+        )
+        try:
+            while True:
+                yielded = False
+                try:
+                    if stream_fn is None:
+                        yield await self._inner.generate(messages)
+                        yielded = True
+                    else:
+                        async for piece in stream_fn(messages):
+                            yielded = True
+                            yield piece
+                except Exception as e:
+                    if yielded:
+                        raise
+                    await self._sleep(self._on_error(e, attempt, started, call))
+                    attempt += 1
+                    continue
+                self._on_success()
+                return
+        finally:
+            self.breaker.release_trial(call)
@@ -0,0 +1,455 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator, Mapping, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Literal
+
+from .contracts import AsyncLLMClient, LLMClient, iter_stream
+from .observe import DEFAULT_BUCKETS, Histogram
+from .tokens import estimate_prompt_tokens
+from .types import Message
+
+if TYPE_CHECKING:
+    from .settings import Settings
+
+Priority = Literal["interactive", "normal", "batch"]
+PRIORITIES: tuple[Priority, ...] = ("interactive", "normal", "batch")  # dispatch order
+DEFAULT_TENANT = "default"
+SERVICE_EWMA_ALPHA = 0.2
+
+_State = Literal["queued", "granted", "dropped", "cancelled"]
+
+
+class RequestDropped(TimeoutError):
+    """Dropped while queued: the call could no longer finish before its deadline."""
+
+
+@dataclass(frozen=True, slots=True)
+class CallOptions:
+    tenant: str | None = None
+    priority: Priority | None = None
+    deadline_s: float | None = None
+
+
+_NO_OPTIONS = CallOptions()
+_CALL: ContextVar[CallOptions | None] = ContextVar("llm_lab_scheduling", default=None)
+
+
+@contextlib.contextmanager
+def scheduling(
+    *,
+    tenant: str | None = None,
+    priority: Priority | None = None,
+    deadline_s: float | None = None,
+) -> Iterator[None]:
+    """Tenant, priority and deadline for scheduled calls made in this thread or task."""
+    token = _CALL.set(CallOptions(tenant, priority, deadline_s))
+    try:
+        yield
+    finally:
+        _CALL.reset(token)
+
+
+@dataclass(slots=True)
+class ClassStats:
+    wait_s: Histogram  # time from enqueue to dispatch
+    queued: int = 0
+    max_queued: int = 0
+    dispatched: int = 0
+    dropped: int = 0  # deadline could not be met
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "wait_p50_s": self.wait_s.quantile(0.5),
+            "wait_p95_s": self.wait_s.quantile(0.95),
+        }
+
+
+@dataclass(slots=True)
+class SchedulerStats:
+    max_in_flight: int
+    in_flight: int = 0
+    classes: dict[str, ClassStats] = field(default_factory=dict)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "classes": {name: c.to_json() for name, c in self.classes.items()},
+        }
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP llm_lab_scheduler_in_flight Calls holding a scheduler slot",
+            "# TYPE llm_lab_scheduler_in_flight gauge",
+            f"llm_lab_scheduler_in_flight {self.in_flight}",
+        ]
+        metrics = {
+            "llm_lab_scheduler_queue_depth": ("queued", "gauge", "Calls waiting for a slot"),
+            "llm_lab_scheduler_dispatched_total": ("dispatched", "counter", "Calls dispatched"),
+            "llm_lab_scheduler_dropped_total": ("dropped", "counter", "Calls past deadline"),
+        }
+        for name, (attr, kind, help_text) in metrics.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for priority, c in self.classes.items():
+                lines.append(f'{name}{{priority="{priority}"}} {getattr(c, attr)}')
+        name = "llm_lab_scheduler_wait_seconds"
+        lines += [f"# HELP {name} Queue wait before dispatch", f"# TYPE {name} histogram"]
+        for priority, c in self.classes.items():
+            h = c.wait_s
+            cumulative = 0
+            for le, n in zip((*h.buckets, float("inf")), h.counts, strict=True):
+                cumulative += n
+                bound = "+Inf" if le == float("inf") else repr(le)
+                lines.append(f'{name}_bucket{{priority="{priority}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{priority="{priority}"}} {h.total!r}')
+            lines.append(f'{name}_count{{priority="{priority}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+
+class _Waiter:
+    __slots__ = ("rank", "tenant", "start", "seq", "deadline", "enqueued", "state", "wake")
+
+    def __init__(
+        self,
+        rank: int,
+        tenant: str,
+        start: float,
+        seq: int,
+        deadline: float | None,
+        enqueued: float,
+        wake: Callable[[], None],
+    ) -> None:
+        self.rank = rank
+        self.tenant = tenant
+        self.start = start  # virtual start tag (fair queuing)
+        self.seq = seq
+        self.deadline = deadline
+        self.enqueued = enqueued
+        self.state: _State = "queued"
+        self.wake = wake
+
+
+class Scheduler:
+    """Admission in front of one backend: at most `max_in_flight` calls at a time.
+
+    Ollama serves OLLAMA_NUM_PARALLEL requests at once and queues the rest in
+    arrival order, so a batch job in front of an interactive user delays them by
+    whole generations. Here the queue is ours: a free slot goes to the highest
+    priority class with waiters; inside a class, tenants share slots by
+    start-time fair queuing, each call costing its estimated prompt tokens divided
+    by the tenant's weight. A call with a deadline is dropped (RequestDropped)
+    rather than started when the class's recent service time says it cannot
+    finish in time, or when it is still queued at the deadline.
+
+    Usable from threads and from any event loop at once (like TokenBucket): the
+    lock is never held across a wait.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 1,
+        *,
+        tenant_weights: Mapping[str, float] | None = None,
+        deadlines_s: Mapping[str, float] | None = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+        unknown = set(deadlines_s or {}) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"unknown priorities {sorted(unknown)}; use {list(PRIORITIES)}")
+        self.max_in_flight = max_in_flight
+        self.tenant_weights = dict(tenant_weights or {})
+        self.deadlines_s = dict(deadlines_s or {})
+        self._clock = clock
+        self._queues: list[list[tuple[float, int, _Waiter]]] = [[] for _ in PRIORITIES]
+        self._vtime = [0.0] * len(PRIORITIES)
+        self._finish: list[dict[str, float]] = [{} for _ in PRIORITIES]  # per tenant
+        self._service_s: list[float | None] = [None] * len(PRIORITIES)  # EWMA per class
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._classes = [ClassStats(Histogram(tuple(sorted(buckets)))) for _ in PRIORITIES]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, s: Settings, provider: str) -> Scheduler:
+        if provider == "ollama":
+            # Every host behind the balancer runs OLLAMA_NUM_PARALLEL requests.
+            slots = s.ollama_num_parallel * max(1, len(s.ollama_hosts))
+        else:
+            slots = s.http_max_connections
+        return cls(
+            slots,
+            tenant_weights=s.scheduler_tenant_weights,
+            deadlines_s=s.scheduler_deadlines_s,
+        )
+
+    @property
+    def stats(self) -> SchedulerStats:
+        with self._lock:
+            return SchedulerStats(
+                self.max_in_flight,
+                self._in_flight,
+                {
+                    name: replace(c, wait_s=replace(c.wait_s, counts=list(c.wait_s.counts)))
+                    for name, c in zip(PRIORITIES, self._classes, strict=True)
+                },
+            )
+
+    @contextlib.contextmanager
+    def slot(
+        self,
+        *,
+        tenant: str = DEFAULT_TENANT,
+        priority: Priority = "normal",
+        deadline_s: float | None = None,
+        cost: float = 1.0,
+    ) -> Iterator[float]:
+        """Hold one slot for the body; yields the seconds spent queued."""
+        event = threading.Event()
+        w = self._enqueue(tenant, priority, deadline_s, cost, event.set)
+        try:
+            event.wait(None if w.deadline is None else max(0.0, w.deadline - self._clock()))
+        except BaseException:
+            if self._settle(w, expired=False) == "granted":
+                self._release(w, None)
+            raise
+        with self._held(w) as waited:
+            yield waited
+
+    @contextlib.asynccontextmanager
+    async def aslot(
+        self,
+        *,
+        tenant: str = DEFAULT_TENANT,
+        priority: Priority = "normal",
+        deadline_s: float | None = None,
+        cost: float = 1.0,
+    ) -> AsyncIterator[float]:
+        loop = asyncio.get_running_loop()
+        granted: asyncio.Future[None] = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(_resolve, granted)
+
+        w = self._enqueue(tenant, priority, deadline_s, cost, wake)
+        timeout = None if w.deadline is None else max(0.0, w.deadline - self._clock())
+        try:
+            async with asyncio.timeout(timeout):
+                await granted
+        except TimeoutError:
+            pass
+        except BaseException:  # cancelled while queued
+            if self._settle(w, expired=False) == "granted":
+                self._release(w, None)
+            raise
+        with self._held(w) as waited:
+            yield waited
+
+    @contextlib.contextmanager
+    def _held(self, w: _Waiter) -> Iterator[float]:
+        if self._settle(w, expired=True) != "granted":
+            raise RequestDropped(
+                f"{PRIORITIES[w.rank]} call for tenant {w.tenant!r} dropped: "
+                "it could not finish before its deadline"
+            )
+        started = self._clock()
+        try:
+            yield started - w.enqueued
+        finally:
+            self._release(w, self._clock() - started)
+
+    def _enqueue(
+        self,
+        tenant: str,
+        priority: Priority,
+        deadline_s: float | None,
+        cost: float,
+        wake: Callable[[], None],
+    ) -> _Waiter:
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r}; use {list(PRIORITIES)}")
+        rank = PRIORITIES.index(priority)
+        if deadline_s is None:
+            deadline_s = self.deadlines_s.get(priority)
+        now = self._clock()
+        with self._lock:
+            finish = self._finish[rank]
+            start = max(self._vtime[rank], finish.get(tenant, 0.0))
+            finish[tenant] = start + max(cost, 1.0) / self.tenant_weights.get(tenant, 1.0)
+            w = _Waiter(
+                rank,
+                tenant,
+                start,
+                next(self._seq),
+                None if deadline_s is None else now + deadline_s,
+                now,
+                wake,
+            )
+            heapq.heappush(self._queues[rank], (start, w.seq, w))
+            c = self._classes[rank]
+            c.queued += 1
+            c.max_queued = max(c.max_queued, c.queued)
+            self._dispatch(fresh=w)
+        return w
+
+    def _settle(self, w: _Waiter, *, expired: bool) -> _State:
+        """Final state of a waiter whose wait ended; a still-queued one leaves the queue."""
+        with self._lock:
+            if w.state == "queued":
+                c = self._classes[w.rank]
+                c.queued -= 1
+                if expired:
+                    w.state = "dropped"
+                    c.dropped += 1
+                else:
+                    w.state = "cancelled"
+            return w.state
+
+    def _release(self, w: _Waiter, service_s: float | None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if service_s is not None:
+                prev = self._service_s[w.rank]
+                self._service_s[w.rank] = (
+                    service_s if prev is None else prev + SERVICE_EWMA_ALPHA * (service_s - prev)
+                )
+            self._dispatch()
+
+    def _dispatch(self, fresh: _Waiter | None = None) -> None:
+        # Caller holds the lock. `fresh` has just arrived: if it gets a slot at once,
+        # nothing is ahead of it and it runs whatever the service estimate says.
+        now = self._clock()
+        while self._in_flight < self.max_in_flight:
+            w = self._pop()
+            if w is None:
+                return
+            c = self._classes[w.rank]
+            c.queued -= 1
+            expected = 0.0 if w is fresh else self._service_s[w.rank] or 0.0
+            if w.deadline is not None and now + expected > w.deadline:
+                w.state = "dropped"
+                c.dropped += 1
+                if expected:
+                    # Only granted calls refresh the estimate: decay it on every
+                    # drop, so one slow call cannot shut its class out for good.
+                    self._service_s[w.rank] = expected * (1 - SERVICE_EWMA_ALPHA)
+                w.wake()
+                continue
+            self._vtime[w.rank] = w.start
+            self._in_flight += 1
+            c.dispatched += 1
+            c.wait_s.observe(now - w.enqueued)
+            w.state = "granted"
+            w.wake()
+
+    def _pop(self) -> _Waiter | None:
+        for rank, queue in enumerate(self._queues):
+            while queue:
+                w = heapq.heappop(queue)[2]
+                if not queue:
+                    # Class idle: forget per-tenant tags so the map holds active tenants only.
+                    self._finish[rank].clear()
+                if w.state == "queued":  # skip waiters that already gave up
+                    return w
+        return None
+
+
+def _resolve(fut: asyncio.Future[None]) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class _Scheduled:
+    def __init__(
+        self,
+        inner: LLMClient | AsyncLLMClient,
+        scheduler: Scheduler,
+        *,
+        tenant: str = DEFAULT_TENANT,
+        priority: Priority = "normal",
+        deadline_s: float | None = None,
+    ) -> None:
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self.priority = priority
+        self.deadline_s = deadline_s
+        self.model = getattr(inner, "model", None)
+        self.options = getattr(inner, "options", None)
+
+    def _slot_args(self, messages: list[Message]) -> dict[str, Any]:
+        call = _CALL.get() or _NO_OPTIONS
+        return {
+            "tenant": call.tenant or self.tenant,
+            "priority": call.priority or self.priority,
+            "deadline_s": call.deadline_s if call.deadline_s is not None else self.deadline_s,
+            "cost": estimate_prompt_tokens(messages),
+        }
+
+
+class ScheduledClient(_Scheduled):
+    """LLMClient that takes a Scheduler slot for each call (streams hold it to the end).
+
+    Tenant, priority and deadline default to the constructor's and can be set per
+    call with `scheduling(...)`.
+    """
+
+    def __init__(
+        self,
+        inner: LLMClient,
+        scheduler: Scheduler,
+        *,
+        tenant: str = DEFAULT_TENANT,
+        priority: Priority = "normal",
+        deadline_s: float | None = None,
+    ) -> None:
+        super().__init__(inner, scheduler, tenant=tenant, priority=priority, deadline_s=deadline_s)
+        self._inner = inner
+
+    def generate(self, messages: list[Message]) -> str:
+        with self.scheduler.slot(**self._slot_args(messages)):
+            return self._inner.generate(messages)
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        with self.scheduler.slot(**self._slot_args(messages)):
+            yield from iter_stream(self._inner, messages)
+
+
+class AsyncScheduledClient(_Scheduled):
+    def __init__(
+        self,
+        inner: AsyncLLMClient,
+        scheduler: Scheduler,
+        *,
+        tenant: str = DEFAULT_TENANT,
+        priority: Priority = "normal",
+        deadline_s: float | None = None,
+    ) -> None:
+        super().__init__(inner, scheduler, tenant=tenant, priority=priority, deadline_s=deadline_s)
+        self._inner = inner
+
+    async def generate(self, messages: list[Message]) -> str:
+        async with self.scheduler.aslot(**self._slot_args(messages)):
+            return await self._inner.generate(messages)
+
+    async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        async with self.scheduler.aslot(**self._slot_args(messages)):
+            stream = getattr(self._inner, "stream", None)
+            if stream is None:
+                yield await self._inner.generate(messages)
+                return
+            async for piece in stream(messages):
+                yield piece
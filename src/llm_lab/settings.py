@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-import socket
-import struct
+import functools
+import json
+import os
 from pathlib import Path
+from typing import Annotated, Literal
 
-from pydantic import Field, field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import BaseModel, Field, field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
+from llm_lab.json_codec import JsonBackend
+from llm_lab.ollama_local import keep_alive_seconds
 from llm_lab.types import Provider
 
+_BOOT_ID = Path("/proc/sys/kernel/random/boot_id")
+
 
 def _is_wsl() -> bool:
     # Works for WSL1/WSL2
@@ -17,11 +23,14 @@ def _is_wsl() -> bool:
             Path("/proc/version").exists()
             and "microsoft" in Path("/proc/version").read_text().lower()
         )
-        or ("WSL_DISTRO_NAME" in __import__("os").environ)
+        or ("WSL_DISTRO_NAME" in os.environ)
     )
 
 
 def _wsl_default_gateway() -> str | None:
+    import socket
+    import struct
+
     # Parse /proc/net/route (more reliable than /etc/resolv.conf in your setup)
     try:
         txt = Path("/proc/net/route").read_text().splitlines()
@@ -43,20 +52,62 @@ def _wsl_default_gateway() -> str | None:
     return None
 
 
-def _default_ollama_host() -> str:
-    # If env is set, pydantic will use it anyway; this is the fallback default.
+def _host_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "llm-lab" / "wsl-gateway.json"
+
+
+def _cached_wsl_gateway() -> str | None:
+    # The Windows host IP only changes when WSL restarts, i.e. with the kernel boot id.
+    try:
+        boot_id = _BOOT_ID.read_text().strip()
+    except OSError:
+        return _wsl_default_gateway()
+    path = _host_cache_path()
+    try:
+        cached = json.loads(path.read_text(encoding="utf-8"))
+        if cached.get("boot_id") == boot_id:
+            gw = cached.get("gateway")
+            return gw if isinstance(gw, str) else None
+    except (OSError, ValueError, AttributeError):
+        pass
+    gw = _wsl_default_gateway()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"boot_id": boot_id, "gateway": gw}), encoding="utf-8")
+    except OSError:
+        pass  # read-only home: just detect again next time
+    return gw
+
+
+@functools.lru_cache(maxsize=1)
+def _detected_ollama_host() -> str:
     if _is_wsl():
-        gw = _wsl_default_gateway()
+        gw = _cached_wsl_gateway()
         if gw:
             return f"http://{gw}:11434"
     return "http://127.0.0.1:11434"
 
 
+def _default_ollama_host() -> str:
+    # Settings only gets here when OLLAMA_HOST is unset; direct OllamaClient() calls
+    # check the env first too, so an explicit host never pays for WSL detection.
+    env = os.environ.get("OLLAMA_HOST", "").strip()
+    if env:
+        return _normalize_host(env)
+    return _detected_ollama_host()
+
+
 def default_ollama_host() -> str:
     """Backward-compatible public helper."""
     return _default_ollama_host()
 
 
+class RateLimitSpec(BaseModel):
+    rpm: float | None = None
+    tpm: float | None = None
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -64,15 +115,142 @@ class Settings(BaseSettings):
 
     ollama_host: str = Field(default_factory=_default_ollama_host)
     ollama_model: str = "mistral"
+    # Several Ollama boxes behind BalancedOllamaClient: OLLAMA_HOSTS=http://a:11434,http://b:11434
+    ollama_hosts: Annotated[list[str], NoDecode] = Field(default_factory=list)
+    ollama_probe_interval_s: float = 5.0
+    # Calls sharing a prompt prefix stick to one host unless it has this many more
+    # calls in flight than the least-loaded host; -1 = plain least-loaded routing.
+    ollama_affinity_slack: int = 2
+    # How long Ollama keeps the model loaded after a call ("30m", 1800, -1 = forever);
+    # unset = server default. A keeper interval re-warms the model in the background.
+    ollama_keep_alive: float | str | None = None
+    ollama_keeper_interval_s: float | None = None
+    # num_ctx ladder for adaptive context sizing (ContextSizer); empty = fixed num_ctx 2048
+    ollama_num_ctx_ladder: Annotated[list[int], NoDecode] = Field(
+        default_factory=lambda: [2048, 4096, 8192, 16384, 32768]
+    )
+    ollama_expected_output_tokens: int = 512
+    # Requests one Ollama server runs at once; match the server's OLLAMA_NUM_PARALLEL
+    ollama_num_parallel: int = 4
+
+    # History budgets for Conversation keyed "provider" or "provider:model", in tokens;
+    # unset Ollama models default to what fits the largest num_ctx rung.
+    conversation_budgets: dict[str, int] = Field(default_factory=dict)
 
     openai_api_key: str | None = None
     openai_base_url: str = "https://api.openai.com"
     openai_model: str = "gpt-5"
+    openai_timeout_s: float = 60.0
+
+    # Embeddings (LLMFactory.create_embedder): model per provider and per-request batch caps
+    ollama_embed_model: str = "nomic-embed-text"
+    openai_embed_model: str = "text-embedding-3-small"
+    embed_max_batch: int = 128
+    embed_max_batch_tokens: int = 32_768
+    # Persistent embedding cache (EmbeddingStore directory); workers may open it read-only
+    embed_cache_path: str | None = None
+    embed_cache_max_entries: int | None = None
+    embed_cache_readonly: bool = False
+
+    # Keep-alive connection pool shared by clients from LLMFactory
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_s: float = 5.0
+    http2: bool = False
+    # OpenAI request/response JSON: auto = msgspec, then orjson, then stdlib json
+    json_backend: JsonBackend = "auto"
+
+    # Retries with jittered exponential backoff + circuit breaker (ResilientClient)
+    retry_max_attempts: int = 3
+    retry_base_delay_s: float = 0.5
+    retry_max_delay_s: float = 20.0
+    retry_deadline_s: float | None = None
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout_s: float = 30.0
+
+    # Client-side rate limits keyed "provider" or "provider:model", e.g.
+    # RATE_LIMITS='{"openai": {"rpm": 500, "tpm": 200000}, "openai:gpt-5": {"tpm": 30000}}'
+    rate_limits: dict[str, RateLimitSpec] = Field(default_factory=dict)
+    rate_limit_output_tokens: int = 256
+
+    # Response cache (CachedLLMClient); cache_path enables the SQLite tier
+    cache_enabled: bool = False
+    cache_max_entries: int = 1024
+    cache_ttl_s: float | None = None
+    cache_path: str | None = None
+
+    # Single-flight: identical concurrent requests share one upstream call (CoalescingClient)
+    coalesce_enabled: bool = False
+
+    # Hedged requests (HedgedClient): after the HEDGE_PERCENTILE of recent primary
+    # first-token times, also ask HEDGE_SECONDARY ("openai", "ollama" or an Ollama host)
+    hedge_secondary: str | None = None
+    hedge_percentile: float = 0.95
+    hedge_initial_delay_s: float = 1.0
+    hedge_max_ratio: float = 0.1
+
+    # llm-lab serve: upstream calls in flight (total and per X-Tenant) and how many
+    # more may wait for a slot before new requests get 503
+    serve_max_concurrency: int = Field(default=8, ge=1)
+    serve_tenant_concurrency: int = Field(default=4, ge=1)
+    serve_max_queue: int = Field(default=64, ge=0)
+
+    # Priority scheduler in front of the backend (llm_lab.scheduler): at most
+    # OLLAMA_NUM_PARALLEL calls per Ollama host in flight, interactive before normal
+    # before batch, weighted fair shares between tenants, per-priority deadlines
+    scheduler_enabled: bool = False
+    scheduler_tenant_weights: dict[str, float] = Field(default_factory=dict)
+    scheduler_deadlines_s: dict[str, float] = Field(default_factory=dict)
+
+    # Record/replay HTTP traffic (llm_lab.cassette): CASSETTE_PATH enables it for
+    # factory clients; CASSETTE_SPEED=1 replays with the recorded timing
+    cassette_path: str | None = None
+    cassette_mode: Literal["record", "replay"] = "replay"
+    cassette_speed: float | None = None
 
     @field_validator("ollama_host")
     @classmethod
     def _normalize_ollama_host(cls, v: str) -> str:
-        v = v.strip()
-        if "://" not in v:
-            v = "http://" + v
-        return v.rstrip("/")
+        return _normalize_host(v)
+
+    @field_validator("ollama_keep_alive")
+    @classmethod
+    def _parse_keep_alive(cls, v: float | str | None) -> float | str | None:
+        return parse_keep_alive(v) if isinstance(v, str) else v
+
+    @field_validator("ollama_num_ctx_ladder", mode="before")
+    @classmethod
+    def _split_ladder(cls, v: object) -> object:
+        if isinstance(v, str):
+            return [int(x) for x in v.split(",") if x.strip()]
+        return v
+
+    @field_validator("ollama_hosts", mode="before")
+    @classmethod
+    def _split_ollama_hosts(cls, v: object) -> object:
+        if isinstance(v, str):
+            return split_hosts(v)
+        if isinstance(v, list | tuple):
+            return [_normalize_host(str(h)) for h in v if str(h).strip()]
+        return v
+
+
+def parse_keep_alive(v: str) -> float | str:
+    """'300' -> 300.0 (Ollama reads bare numbers as seconds only unquoted); '30m' stays."""
+    keep_alive_seconds(v)  # reject typos early
+    try:
+        return float(v)
+    except ValueError:
+        return v.strip()
+
+
+def split_hosts(v: str) -> list[str]:
+    """'a:11434, http://b:11434/' -> ['http://a:11434', 'http://b:11434']"""
+    return [_normalize_host(h) for h in v.split(",") if h.strip()]
+
+
+def _normalize_host(v: str) -> str:
+    v = v.strip()
+    if "://" not in v:
+        v = "http://" + v
+    return v.rstrip("/")
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from .types import Message
+
+# Without a tokenizer dependency we estimate: ~4 characters per token for
+# English-like text, plus a small per-message framing overhead.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message: Message) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_prompt_tokens(messages: Iterable[Message]) -> int:
+    return sum(estimate_message_tokens(m) for m in messages)
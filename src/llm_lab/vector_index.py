@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+Vectors = npt.NDArray[np.float32]
+
+_VECTORS_FILE = "vectors.npy"
+_IDS_FILE = "ids.json"
+
+
+class VectorIndex:
+    """In-memory top-k cosine search over one contiguous float32 matrix.
+
+    Rows are L2-normalized once on insert, so a query is a single matrix-vector
+    product plus argpartition, with no Python loop over stored vectors. Storage
+    grows by doubling. save() writes `vectors.npy` + `ids.json` into a directory;
+    load() memory-maps the matrix read-only, so opening a large index costs no
+    reads and several processes share the page cache (the first add() copies it).
+
+    Needs numpy: `pip install -e ".[vectors]"`.
+    """
+
+    def __init__(self, dim: int, *, capacity: int = 1024) -> None:
+        if dim <= 0:
+            raise ValueError("dim must be > 0")
+        self.dim = dim
+        self.ids: list[str] = []
+        self._data: Vectors = np.empty((max(capacity, 1), dim), dtype=np.float32)
+
+    @classmethod
+    def from_vectors(cls, ids: Sequence[str], vectors: npt.ArrayLike) -> VectorIndex:
+        matrix = _as_matrix(vectors)
+        index = cls(matrix.shape[1], capacity=matrix.shape[0])
+        index.add(ids, matrix)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def vectors(self) -> Vectors:
+        """The normalized rows in insertion order (a view, not a copy)."""
+        return self._data[: len(self.ids)]
+
+    def add(self, ids: Sequence[str], vectors: npt.ArrayLike) -> None:
+        matrix = _as_matrix(vectors, self.dim)
+        if len(ids) != matrix.shape[0]:
+            raise ValueError(f"{len(ids)} ids for {matrix.shape[0]} vectors")
+        n, m = len(self.ids), matrix.shape[0]
+        if n + m > self._data.shape[0] or not self._data.flags.writeable:
+            grown = np.empty((max(n + m, 2 * self._data.shape[0]), self.dim), dtype=np.float32)
+            grown[:n] = self._data[:n]
+            self._data = grown
+        rows = self._data[n : n + m]
+        rows[:] = matrix
+        _normalize(rows)
+        self.ids.extend(ids)
+
+    def search(self, query: npt.ArrayLike, k: int = 10) -> list[tuple[str, float]]:
+        """The `k` most similar ids with their cosine similarity, best first."""
+        return self.search_many(_as_matrix(query, self.dim), k)[0]
+
+    def search_many(self, queries: npt.ArrayLike, k: int = 10) -> list[list[tuple[str, float]]]:
+        """search() for each row of `queries` with one matrix-matrix product."""
+        q = np.array(_as_matrix(queries, self.dim))  # own copy: normalized in place
+        _normalize(q)
+        n = len(self.ids)
+        if n == 0 or k <= 0:
+            return [[] for _ in range(q.shape[0])]
+        k = min(k, n)
+        scores = q @ self.vectors.T  # (queries, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n), scores.shape)
+        results: list[list[tuple[str, float]]] = []
+        for row, cand in zip(scores, top, strict=True):
+            order = cand[np.argsort(-row[cand], kind="stable")]
+            results.append([(self.ids[i], float(row[i])) for i in order])
+        return results
+
+    def save(self, path: str | Path) -> None:
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / _VECTORS_FILE, self.vectors)
+        (directory / _IDS_FILE).write_text(json.dumps(self.ids, ensure_ascii=False), "utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path, *, mmap: bool = True) -> VectorIndex:
+        directory = Path(path)
+        data = np.load(directory / _VECTORS_FILE, mmap_mode="r" if mmap else None)
+        ids = json.loads((directory / _IDS_FILE).read_text("utf-8"))
+        if data.dtype != np.float32 or data.ndim != 2 or len(ids) != data.shape[0]:
+            raise ValueError(f"{directory}: not a VectorIndex directory")
+        index = cls(data.shape[1], capacity=1)
+        index._data = data
+        index.ids = [str(i) for i in ids]
+        return index
+
+
+def _as_matrix(vectors: npt.ArrayLike, dim: int | None = None) -> Vectors:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.ndim != 2 or (dim is not None and matrix.shape[1] != dim):
+        want = f"(n, {dim})" if dim is not None else "(n, dim)"
+        raise ValueError(f"expected vectors of shape {want}, got {matrix.shape}")
+    return matrix
+
+
+def _normalize(rows: Vectors) -> None:
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # zero vectors stay zero (similarity 0 to everything)
+    rows /= norms
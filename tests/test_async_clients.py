@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+
+from llm_lab.clients.ollama import AsyncOllamaClient
+from llm_lab.clients.openai import AsyncOpenAIClient
+from llm_lab.clients.pool import HttpPool
+from llm_lab.factory import LLMFactory
+from llm_lab.settings import Settings
+
+
+def _openai_handler(request: httpx.Request) -> httpx.Response:
+    assert request.url.path == "/v1/responses"
+    body = json.loads(request.content)
+    text = body["input"][-1]["content"].upper()
+    return httpx.Response(
+        200,
+        json={
+            "output": [
+                {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": text}],
+                }
+            ]
+        },
+    )
+
+
+def _ollama_handler(request: httpx.Request) -> httpx.Response:
+    assert request.url.path == "/api/chat"
+    body = json.loads(request.content)
+    return httpx.Response(
+        200,
+        json={
+            "model": body["model"],
+            "message": {"role": "assistant", "content": body["messages"][-1]["content"][::-1]},
+            "done": True,
+        },
+    )
+
+
+def test_async_openai_many_concurrent_generations() -> None:
+    async def run() -> list[str]:
+        http = httpx.AsyncClient(transport=httpx.MockTransport(_openai_handler))
+        async with AsyncOpenAIClient(api_key="k", model="m", _http=http) as c:
+            return await asyncio.gather(
+                *(c.generate([{"role": "user", "content": f"q{i}"}]) for i in range(200))
+            )
+
+    assert asyncio.run(run()) == [f"Q{i}" for i in range(200)]
+
+
+def test_async_ollama_generate() -> None:
+    async def run() -> str:
+        c = AsyncOllamaClient(
+            model="mistral",
+            host="http://example:11434",
+            transport=httpx.MockTransport(_ollama_handler),
+        )
+        async with c:
+            return await c.generate([{"role": "user", "content": "abc"}])
+
+    assert asyncio.run(run()) == "cba"
+
+
+def test_factory_create_async_with_pool() -> None:
+    s = Settings(openai_api_key="k", ollama_host="http://example:11434")
+
+    async def run() -> None:
+        async with HttpPool() as pool:
+            a = LLMFactory.create_async("openai", settings=s, pool=pool)
+            o = LLMFactory.create_async("ollama", settings=s, pool=pool)
+            assert isinstance(a, AsyncOpenAIClient)
+            assert isinstance(o, AsyncOllamaClient)
+            await a.aclose()
+            await o.aclose()
+            assert len(pool._async_transports) == 2
+
+    asyncio.run(run())
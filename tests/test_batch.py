@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from llm_lab import cli
+from llm_lab.batch import BatchItem, run_batch
+from llm_lab.observe import HistogramAggregator
+from llm_lab.types import Message
+
+
+class EchoClient:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate(self, messages: list[Message]) -> str:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            text = messages[-1]["content"]
+            if text == "boom":
+                raise RuntimeError("upstream failed")
+            time.sleep(0.02 if text.endswith("slow") else 0.001)
+            return text.upper()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        yield self.generate(messages)
+
+
+def _items(texts: list[str]) -> list[BatchItem]:
+    return [BatchItem(i, i, [{"role": "user", "content": t}]) for i, t in enumerate(texts, 1)]
+
+
+def test_run_batch_input_order_and_errors() -> None:
+    c = EchoClient()
+    items = _items(["a-slow", "boom", "c"]) + [BatchItem(4, error="invalid input: bad")]
+    results = list(run_batch(c, items, concurrency=3, order="input"))
+
+    assert [r.line for r in results] == [1, 2, 3, 4]
+    assert results[0].output == "A-SLOW"
+    assert results[1].error == "RuntimeError: upstream failed"
+    assert results[3].error == "invalid input: bad"
+
+
+def test_run_batch_completion_order() -> None:
+    results = list(run_batch(EchoClient(), _items(["a-slow", "b", "c"]), order="completion"))
+    assert results[-1].line == 1
+
+
+def test_run_batch_bounds_concurrency_and_reads_lazily() -> None:
+    c = EchoClient()
+    consumed = 0
+
+    def items() -> Iterator[BatchItem]:
+        nonlocal consumed
+        for item in _items([f"x{i}" for i in range(50)]):
+            consumed += 1
+            yield item
+
+    gen = run_batch(c, items(), concurrency=2)
+    next(gen)
+    assert consumed <= 5
+    assert len(list(gen)) == 49
+    assert c.max_in_flight <= 2
+
+
+def test_cli_batch(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    c = EchoClient()
+    monkeypatch.setattr(cli.LLMFactory, "create", lambda *a, **kw: c)
+    src = tmp_path / "in.jsonl"
+    dst = tmp_path / "out.jsonl"
+    src.write_text(
+        "\n".join(
+            [
+                json.dumps({"id": "a", "prompt": "hi"}),
+                json.dumps(
+                    {"id": "b", "messages": ["user:yo", {"role": "wizard", "content": "x"}]}
+                ),
+                "",
+                "not json",
+                json.dumps("bare"),
+                json.dumps({"id": "c", "messages": 5}),
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    cli.main(["batch", "--input", str(src), "--output", str(dst), "--concurrency", "2"])
+
+    rows = [json.loads(line) for line in dst.read_text(encoding="utf-8").splitlines()]
+    assert [r["line"] for r in rows] == [1, 2, 4, 5, 6]
+    assert rows[0]["output"] == "HI"
+    assert "unknown role" in rows[1]["error"]
+    assert rows[2]["error"].startswith("invalid input")
+    assert rows[3]["output"] == "BARE"
+    assert rows[4]["error"] == "invalid input: messages must be a list"
+    assert "2 ok, 3 failed" in capsys.readouterr().err
+
+
+def test_cli_batch_metrics(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    seen: dict[str, Any] = {}
+
+    def create(*a: Any, **kw: Any) -> EchoClient:
+        seen.update(kw)
+        return EchoClient()
+
+    monkeypatch.setattr(cli.LLMFactory, "create", create)
+    src = tmp_path / "in.jsonl"
+    src.write_text(json.dumps("hi") + "\n", encoding="utf-8")
+    prom = tmp_path / "metrics.prom"
+
+    cli.main(
+        ["batch", "--input", str(src), "--output", str(tmp_path / "o"), "--metrics", str(prom)]
+    )
+
+    (agg,) = seen["observers"]
+    assert isinstance(agg, HistogramAggregator)
+    assert prom.read_text(encoding="utf-8").startswith("# HELP llm_lab_calls_total")
+
+
+def test_run_batch_groups_shared_prefixes_but_keeps_input_order() -> None:
+    sent: list[str] = []
+
+    class Recording:
+        def generate(self, messages: list[Message]) -> str:
+            sent.append(messages[-1]["content"])
+            return messages[-1]["content"]
+
+    def conv(header: str, question: str) -> list[Message]:
+        return [{"role": "system", "content": header}, {"role": "user", "content": question}]
+
+    convs = [conv("A", "a1"), conv("B", "b1"), conv("A", "a2"), conv("B", "b2"), conv("A", "a3")]
+    items = [BatchItem(i, messages=m) for i, m in enumerate(convs, 1)]
+    results = list(run_batch(Recording(), items, concurrency=1, prefix_window=4))
+    assert sent == ["a1", "a2", "b1", "b2", "a3"]  # grouped within each 4-line window
+    assert [r.output for r in results] == ["a1", "b1", "a2", "b2", "a3"]
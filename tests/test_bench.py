@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from llm_lab import cli
+from llm_lab.bench import BenchConfig, percentile, run_bench, run_json_bench
+from llm_lab.clients.ollama import OllamaClient
+from llm_lab.clients.openai import OpenAIClient
+from llm_lab.fake_upstream import FakeUpstream, FakeUpstreamConfig
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+
+
+def test_fake_upstream_speaks_both_protocols() -> None:
+    with FakeUpstream(FakeUpstreamConfig(reply_tokens=3)) as up:
+        with OllamaClient("fake", up.url) as o:
+            assert o.generate(MSGS) == "t0 t1 t2 "
+            assert list(o.stream(MSGS)) == ["t0 ", "t1 ", "t2 "]
+            o.ping()
+        with OpenAIClient("k", "fake", up.url) as c:
+            assert c.generate(MSGS) == "t0 t1 t2"
+            assert list(c.stream(MSGS)) == ["t0 ", "t1 ", "t2 "]
+
+
+def test_fake_upstream_injects_errors() -> None:
+    cfg = FakeUpstreamConfig(error_rate=1.0, error_status=503)
+    with (
+        FakeUpstream(cfg) as up,
+        OpenAIClient("k", "fake", up.url) as c,
+        pytest.raises(httpx.HTTPStatusError) as ei,
+    ):
+        c.generate(MSGS)
+    assert ei.value.response.status_code == 503
+
+
+def test_percentile_nearest_rank() -> None:
+    xs = [float(i) for i in range(1, 101)]
+    assert percentile(xs, 50) == 50.0
+    assert percentile(xs, 99) == 99.0
+    assert percentile([], 50) is None
+
+
+def test_run_bench_report_shape() -> None:
+    cfg = BenchConfig(
+        concurrency=(1, 2),
+        requests=20,
+        alloc_requests=2,
+        upstream=FakeUpstreamConfig(error_rate=0.5, seed=1),
+    )
+    report = run_bench(cfg)
+    rows = report["results"]
+    assert [(r["provider"], r["concurrency"]) for r in rows] == [
+        ("ollama", 1),
+        ("ollama", 2),
+        ("openai", 1),
+        ("openai", 2),
+    ]
+    for r in rows:
+        assert r["requests"] == 20
+        assert 0 < r["errors"] < 20
+        assert set(r["latency_s"]) == {"mean", "p50", "p95", "p99"}
+        assert r["ttft_s"]["p50"] <= r["latency_s"]["p99"]
+        assert set(r["allocations"]) == {"peak_kib", "retained_kib_per_request"}
+    json.dumps(report)
+
+
+def test_cli_bench_writes_json(tmp_path: Path) -> None:
+    out = tmp_path / "bench.json"
+    cli.main(
+        [
+            "bench",
+            "--providers",
+            "openai",
+            "--concurrency",
+            "2",
+            "--requests",
+            "4",
+            "--alloc-requests",
+            "0",
+            "--output",
+            str(out),
+        ]
+    )
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert report["results"][0]["throughput_rps"] > 0
+    assert report["results"][0]["allocations"] is None
+
+
+def test_json_bench_covers_installed_backends() -> None:
+    report = run_json_bench(turns=4, chars_per_turn=100, events=8, rounds=2)
+    backends = [r["backend"] for r in report["results"]]
+    assert backends[-1] == "json" and report["results"][-1]["speedup"]["encode"] == 1.0
+    assert all(r["decode_response_us"] > 0 for r in report["results"])
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from llm_lab.cache import CachedLLMClient, MemoryCache, SQLiteCache, cache_key
+from llm_lab.settings import Settings
+from llm_lab.types import Message
+
+
+class CountingClient:
+    model = "m"
+    options = {"temperature": 0.2}
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def generate(self, messages: list[Message]) -> str:
+        self.calls += 1
+        return f"answer {self.calls}"
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        self.calls += 1
+        yield "str"
+        yield "eamed"
+
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+
+
+def test_cache_key_is_stable_and_sensitive() -> None:
+    ns = {"provider": "ollama", "model": "m", "options": {"b": 1, "a": 2}}
+    same = {"options": {"a": 2, "b": 1}, "model": "m", "provider": "ollama"}
+    assert cache_key(ns, MSGS) == cache_key(same, MSGS)
+    assert cache_key(ns, MSGS) != cache_key({**ns, "model": "x"}, MSGS)
+    assert cache_key(ns, MSGS) != cache_key(ns, [{"role": "system", "content": "hi"}])
+
+
+def test_memory_cache_lru_and_ttl() -> None:
+    now = [0.0]
+    c = MemoryCache(max_entries=2, ttl_s=10, clock=lambda: now[0])
+    c.set("a", "1")
+    c.set("b", "2")
+    assert c.get("a") == "1"
+    c.set("c", "3")  # evicts least recently used "b"
+    assert c.get("b") is None
+    now[0] = 11
+    assert c.get("a") is None
+
+
+def test_cached_client_counts_hits_and_misses() -> None:
+    inner = CountingClient()
+    c = CachedLLMClient(inner, provider="ollama")
+    assert c.generate(MSGS) == "answer 1"
+    assert c.generate(MSGS) == "answer 1"
+    assert inner.calls == 1
+    assert (c.stats.hits, c.stats.misses) == (1, 1)
+
+
+def test_cached_client_stream_fills_cache() -> None:
+    inner = CountingClient()
+    c = CachedLLMClient(inner)
+    assert list(c.stream(MSGS)) == ["str", "eamed"]
+    assert list(c.stream(MSGS)) == ["streamed"]
+    assert c.generate(MSGS) == "streamed"
+    assert inner.calls == 1
+
+
+def test_sqlite_tier_survives_restart(tmp_path: Path) -> None:
+    s = Settings(cache_path=str(tmp_path / "cache.sqlite"))
+    first = CachedLLMClient.from_settings(CountingClient(), s)
+    assert first.generate(MSGS) == "answer 1"
+    assert first.persistent is not None
+    first.persistent.close()
+
+    inner = CountingClient()
+    second = CachedLLMClient.from_settings(inner, s)
+    assert second.generate(MSGS) == "answer 1"
+    assert inner.calls == 0
+    assert second.stats.disk_hits == 1
+
+
+def test_sqlite_ttl(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    db = SQLiteCache(tmp_path / "c.sqlite", ttl_s=5)
+    db.set("k", "v")
+    assert db.get("k") == "v"
+    real = __import__("time").time
+    monkeypatch.setattr("llm_lab.cache.time.time", lambda: real() + 6)
+    assert db.get("k") is None
+    assert db.get("k") is None
+    rows = db._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    assert rows == 0  # the expired row is deleted, not just skipped
+
+
+def test_sqlite_prunes_expired_rows_on_write(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db = SQLiteCache(tmp_path / "c.sqlite", ttl_s=5, prune_every=3)
+    db.set("old", "v")
+    real = __import__("time").time
+    monkeypatch.setattr("llm_lab.cache.time.time", lambda: real() + 6)
+    db.set("a", "1")
+    assert db._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 2
+    db.set("b", "2")  # third write: prune
+    keys = {k for (k,) in db._db.execute("SELECT key FROM responses")}
+    assert keys == {"a", "b"}
+
+
+def test_stream_and_generate_cache_the_same_text() -> None:
+    class Padded:
+        model = "m"
+
+        def generate(self, messages: list[Message]) -> str:
+            return " answer\n"
+
+        def stream(self, messages: list[Message]) -> Iterator[str]:
+            yield " ans"
+            yield "wer\n"
+
+    for first in ("generate", "stream"):
+        c = CachedLLMClient(Padded())
+        if first == "generate":
+            assert c.generate(MSGS) == "answer"
+        else:
+            assert "".join(c.stream(MSGS)) == " answer\n"  # a live stream is passed through
+        assert c.generate(MSGS) == "".join(c.stream(MSGS)) == "answer"
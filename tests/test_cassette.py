@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from llm_lab import cli
+from llm_lab.cassette import Cassette, CassetteMissError, CassetteMode, CassettePool
+from llm_lab.factory import LLMFactory
+from llm_lab.fake_upstream import FakeUpstream, FakeUpstreamConfig
+from llm_lab.settings import Settings
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+DEAD = "http://127.0.0.1:9"  # nothing listens here: replay must not touch the network
+
+
+def _settings(url: str) -> Settings:
+    return Settings(
+        openai_api_key="k",
+        openai_base_url=url,
+        openai_model="fake",
+        ollama_host=url,
+        ollama_model="fake",
+    )
+
+
+def test_record_then_replay_both_providers(tmp_path: Path) -> None:
+    path = tmp_path / "tape.jsonl"
+    recorded: dict[str, tuple[str, str]] = {}
+    with FakeUpstream(FakeUpstreamConfig(reply_tokens=4)) as up, CassettePool(path, "record") as p:
+        for provider in ("ollama", "openai"):
+            c = LLMFactory.create(provider, settings=_settings(up.url), pool=p)
+            recorded[provider] = (c.generate(MSGS), "".join(c.stream(MSGS)))
+        assert up.requests == 4
+
+    lines = [json.loads(x) for x in path.read_text(encoding="utf-8").splitlines()]
+    assert len(lines) == 4 and {x["path"] for x in lines} == {"/api/chat", "/v1/responses"}
+    assert "k" not in {v for x in lines for v in x["headers"].values()}
+
+    with CassettePool(path) as p:
+        for provider in ("ollama", "openai"):
+            c = LLMFactory.create(provider, settings=_settings(DEAD), pool=p)
+            assert (c.generate(MSGS), "".join(c.stream(MSGS))) == recorded[provider]
+            assert c.generate(MSGS) == recorded[provider][0]  # last take repeats
+
+
+def test_replay_speed_reproduces_timing(tmp_path: Path) -> None:
+    path = tmp_path / "tape.jsonl"
+    cfg = FakeUpstreamConfig(latency_s=0.1, reply_tokens=2)
+    with FakeUpstream(cfg) as up, CassettePool(path, "record") as p:
+        LLMFactory.create("ollama", settings=_settings(up.url), pool=p).generate(MSGS)
+
+    def timed(speed: float | None) -> float:
+        c = LLMFactory.create(
+            "ollama", settings=_settings(DEAD), pool=CassettePool(path, speed=speed)
+        )
+        t0 = time.perf_counter()
+        c.generate(MSGS)
+        return time.perf_counter() - t0
+
+    assert timed(None) < 0.05
+    assert timed(1.0) >= 0.09
+
+
+def test_replay_miss_raises(tmp_path: Path) -> None:
+    c = LLMFactory.create(
+        "openai", settings=_settings(DEAD), pool=CassettePool(Cassette(tmp_path / "none.jsonl"))
+    )
+    with pytest.raises(CassetteMissError, match="/v1/responses"):
+        c.generate(MSGS)
+
+
+def test_async_record_and_replay(tmp_path: Path) -> None:
+    path = tmp_path / "tape.jsonl"
+
+    async def run(url: str, mode: str) -> tuple[str, str]:
+        async with CassettePool(path, "record" if mode == "record" else "replay") as p:
+            c = LLMFactory.create_async("openai", settings=_settings(url), pool=p)
+            async with c:
+                text = await c.generate(MSGS)
+                streamed = "".join([piece async for piece in c.stream(MSGS)])
+            return text, streamed
+
+    with FakeUpstream(FakeUpstreamConfig(reply_tokens=3)) as up:
+        recorded = asyncio.run(run(up.url, "record"))
+    assert asyncio.run(run(DEAD, "replay")) == recorded
+
+
+def test_async_factory_clients_follow_cassette_settings(tmp_path: Path) -> None:
+    path = str(tmp_path / "tape.jsonl")
+
+    def settings(url: str, mode: CassetteMode) -> Settings:
+        return _settings(url).model_copy(update={"cassette_path": path, "cassette_mode": mode})
+
+    async def run(s: Settings) -> list[str]:
+        out = []
+        for provider in ("ollama", "openai"):
+            async with LLMFactory.create_async(provider, settings=s) as c:
+                out.append(await c.generate(MSGS))
+        return out
+
+    with FakeUpstream(FakeUpstreamConfig(reply_tokens=3)) as up:
+        recorded = asyncio.run(run(settings(up.url, "record")))
+    assert asyncio.run(run(settings(DEAD, "replay"))) == recorded
+
+    async def embed() -> None:
+        async with LLMFactory.create_async_embedder(
+            "ollama", settings=settings(DEAD, "replay")
+        ) as e:
+            await e.embed(["x"])
+
+    with pytest.raises(CassetteMissError, match="/api/embed"):
+        asyncio.run(embed())
+
+
+def test_cli_record_replay(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    path = str(tmp_path / "tape.jsonl")
+    argv = ["--provider", "ollama", "--model", "fake", "--prompt", "hi", "--retries", "1"]
+    with FakeUpstream() as up:
+        cli.main([*argv, "--ollama-host", up.url, "--record", path])
+    cli.main([*argv, "--ollama-host", DEAD, "--replay", path])
+    first, second = capsys.readouterr().out.splitlines()
+    assert first == second and first.startswith("t0")
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import io
+import json
+from collections.abc import Iterator
+
+import pytest
+
+from llm_lab import cli
+from llm_lab.chat import ChatSession, run_jsonl, run_repl
+from llm_lab.conversation import Conversation
+from llm_lab.types import Message
+
+
+class EchoClient:
+    """Streams back 'echo:<last user message>' and remembers what it was sent."""
+
+    model = "m"
+
+    def __init__(self) -> None:
+        self.seen: list[list[Message]] = []
+
+    def generate(self, messages: list[Message]) -> str:
+        return "".join(self.stream(messages))
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        self.seen.append(messages)
+        text = messages[-1]["content"]
+        if text == "boom":
+            yield "partial"
+            raise RuntimeError("upstream died")
+        yield "echo:"
+        yield text
+
+
+def _session() -> tuple[EchoClient, ChatSession]:
+    c = EchoClient()
+    pinned: list[Message] = [{"role": "system", "content": "sys"}]
+    return c, ChatSession(c, Conversation(1000, pinned=pinned))
+
+
+def test_session_accumulates_history_and_discards_failed_turns() -> None:
+    c, session = _session()
+    assert "".join(session.send("a")) == "echo:a"
+    with pytest.raises(RuntimeError):
+        list(session.send("boom"))
+    assert "".join(session.send("b")) == "echo:b"
+    assert [m["content"] for m in c.seen[-1]] == ["sys", "a", "echo:a", "b"]
+    assert session.turns == 2
+
+    session.reset()
+    list(session.send("c"))
+    assert [m["content"] for m in c.seen[-1]] == ["sys", "c"]
+
+
+def test_repl() -> None:
+    _, session = _session()
+    script = iter(["a", "", "boom", "/reset", "b"])
+
+    def read(prompt: str) -> str:
+        try:
+            return next(script)
+        except StopIteration:
+            raise EOFError from None
+
+    out, err = io.StringIO(), io.StringIO()
+    run_repl(session, read=read, out=out, err=err)
+    assert out.getvalue().startswith("echo:a\npartial")
+    assert out.getvalue().endswith("echo:b\n\n")
+    assert "upstream died" in err.getvalue() and "history cleared" in err.getvalue()
+    assert session.turns == 1
+
+
+def test_jsonl_protocol() -> None:
+    _, session = _session()
+    lines = [
+        json.dumps({"id": 1, "prompt": "a", "stream": True}),
+        json.dumps("b"),
+        "[1]",
+        json.dumps({"id": 3, "prompt": "boom"}),
+        json.dumps({"id": 4, "reset": True}),
+    ]
+    out = io.StringIO()
+    run_jsonl(session, lines, out)
+    got = [json.loads(x) for x in out.getvalue().splitlines()]
+    assert [g.get("delta") for g in got[:2]] == ["echo:", "a"]
+    assert got[2]["reply"] == "echo:a" and got[2]["turns"] == 1
+    assert got[3]["reply"] == "echo:b" and got[3]["turns"] == 2 and got[3]["tokens"] > 0
+    assert got[4]["error"].startswith("invalid input")
+    assert got[5] == {"id": 3, "error": "RuntimeError: upstream died"}
+    assert got[6] == {"id": 4, "reset": True}
+
+
+def test_cli_chat_jsonl_uses_one_client(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    c = EchoClient()
+    created: list[object] = []
+
+    def create(*a: object, **kw: object) -> EchoClient:
+        created.append(c)
+        return c
+
+    monkeypatch.setattr(cli.LLMFactory, "create", create)
+    stdin = "\n".join(json.dumps({"prompt": p}) for p in ("x", "y")) + "\n"
+    monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+    closed: list[bool] = []
+    monkeypatch.setattr(c, "close", lambda: closed.append(True), raising=False)
+    cli.main(["chat", "--jsonl", "--provider", "ollama", "--retries", "1", "--system", "S"])
+    replies = [json.loads(x)["reply"] for x in capsys.readouterr().out.splitlines()]
+    assert replies == ["echo:x", "echo:y"]
+    assert len(created) == 1 and closed == [True]
+    assert [m["role"] for m in c.seen[-1]] == ["system", "developer", "user", "assistant", "user"]
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_lab.coalesce import AsyncCoalescingClient, CoalescingClient
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "warm-up"}]
+
+
+class GatedClient:
+    """Blocks every upstream call until `gate` is set."""
+
+    model = "m"
+
+    def __init__(self, fail: bool = False) -> None:
+        self.gate = threading.Event()
+        self.calls = 0
+        self.closed = False
+        self.fail = fail
+
+    def generate(self, messages: list[Message]) -> str:
+        self.calls += 1
+        self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return "answer:" + messages[-1]["content"]
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        self.calls += 1
+        try:
+            for piece in ("a", "b", "c"):
+                self.gate.wait(5)
+                yield piece
+        finally:
+            self.closed = True
+
+
+def _wait_for(cond: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + 5
+    while not cond():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_identical_generations_share_one_call() -> None:
+    inner = GatedClient()
+    c = CoalescingClient(inner)
+    with ThreadPoolExecutor(8) as ex:
+        futures = [ex.submit(c.generate, MSGS) for _ in range(8)]
+        _wait_for(lambda: c.stats.calls == 8)
+        inner.gate.set()
+        assert {f.result() for f in futures} == {"answer:warm-up"}
+    assert inner.calls == 1
+    assert c.stats.coalesced == 7
+
+    # nothing is kept after completion
+    c.generate(MSGS)
+    assert inner.calls == 2
+
+
+def test_different_messages_are_not_coalesced() -> None:
+    inner = GatedClient()
+    inner.gate.set()
+    c = CoalescingClient(inner)
+    with ThreadPoolExecutor(2) as ex:
+        list(ex.map(lambda t: c.generate([{"role": "user", "content": t}]), ["x", "y"]))
+    assert inner.calls == 2 and c.stats.coalesced == 0
+
+
+def test_error_fans_out_to_all_waiters() -> None:
+    inner = GatedClient(fail=True)
+    c = CoalescingClient(inner)
+    with ThreadPoolExecutor(4) as ex:
+        futures = [ex.submit(c.generate, MSGS) for _ in range(4)]
+        _wait_for(lambda: c.stats.calls == 4)
+        inner.gate.set()
+        for f in futures:
+            with pytest.raises(RuntimeError, match="upstream down"):
+                f.result()
+    assert inner.calls == 1
+
+
+def test_stream_is_multicast_and_replayed_to_late_joiners() -> None:
+    inner = GatedClient()
+    c = CoalescingClient(inner)
+    first = c.stream(MSGS)
+    inner.gate.set()
+    assert next(first) == "a"
+
+    late = c.stream(MSGS)  # joins mid-stream
+    assert list(late) == ["a", "b", "c"]
+    assert list(first) == ["b", "c"]
+    assert inner.calls == 1 and c.stats.coalesced == 1
+
+    assert list(c.stream(MSGS)) == ["a", "b", "c"]
+    assert inner.calls == 2
+
+
+def test_stream_survives_leader_leaving_and_stops_when_all_leave() -> None:
+    inner = GatedClient()
+    inner.gate.set()
+    c = CoalescingClient(inner)
+    leader, follower = c.stream(MSGS), c.stream(MSGS)
+    assert next(leader) == "a"
+    assert next(follower) == "a"
+    leader.close()
+    assert not inner.closed
+    assert next(follower) == "b"
+    follower.close()
+    assert inner.closed  # last reader gone: upstream generator closed
+
+
+class AsyncGated:
+    model = "m"
+
+    def __init__(self) -> None:
+        self.gate = asyncio.Event()
+        self.calls = 0
+        self.cancelled = False
+
+    async def generate(self, messages: list[Message]) -> str:
+        self.calls += 1
+        try:
+            await self.gate.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "answer"
+
+    async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        self.calls += 1
+        for piece in ("a", "b", "c"):
+            await self.gate.wait()
+            yield piece
+
+
+def test_async_generate_coalesces_and_survives_cancellation() -> None:
+    async def run() -> None:
+        inner = AsyncGated()
+        c = AsyncCoalescingClient(inner)
+        tasks = [asyncio.create_task(c.generate(MSGS)) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks[0].cancel()  # one impatient caller must not cancel the others
+        await asyncio.sleep(0)
+        inner.gate.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert results[1:] == ["answer", "answer"]
+        assert inner.calls == 1 and not inner.cancelled
+
+        inner.gate.clear()
+        lone = asyncio.create_task(c.generate(MSGS))
+        await asyncio.sleep(0)
+        lone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lone
+        await asyncio.sleep(0)
+        assert inner.cancelled  # the last waiter left: upstream call cancelled
+
+    asyncio.run(run())
+
+
+def test_async_stream_multicast() -> None:
+    async def run() -> None:
+        inner = AsyncGated()
+        c = AsyncCoalescingClient(inner)
+
+        async def collect() -> list[str]:
+            return [p async for p in c.stream(MSGS)]
+
+        tasks = [asyncio.create_task(collect()) for _ in range(3)]
+        await asyncio.sleep(0)
+        inner.gate.set()
+        assert await asyncio.gather(*tasks) == [["a", "b", "c"]] * 3
+        assert inner.calls == 1 and c.stats.coalesced == 2
+
+    asyncio.run(run())
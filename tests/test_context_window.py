@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import time
+
+import httpx
+import pytest
+
+from llm_lab.clients.ollama import OllamaClient
+from llm_lab.context_window import ContextSizer, conversation_key
+from llm_lab.settings import Settings
+from llm_lab.types import Message
+
+SYSTEM: Message = {"role": "system", "content": "You are terse."}
+
+
+def _turns(n: int, size: int) -> list[Message]:
+    msgs: list[Message] = [SYSTEM]
+    for i in range(n):
+        msgs.append({"role": "user", "content": f"q{i} " + "x" * size})
+        msgs.append({"role": "assistant", "content": "y" * size})
+    return msgs
+
+
+def test_smallest_rung_that_fits_prompt_and_output() -> None:
+    sizer = ContextSizer((2048, 4096, 8192), expected_output_tokens=500, headroom=1.0)
+    assert sizer.rung(2048) == 2048
+    assert sizer.rung(2049) == 4096
+    assert sizer.rung(100_000) == 8192  # capped at the top rung
+    short: list[Message] = [{"role": "user", "content": "hi"}]
+    assert sizer.num_ctx(short) == 2048
+    # ~1600 prompt tokens + 500 output > 2048
+    assert sizer.num_ctx([{"role": "user", "content": "z" * 6400}]) == 4096
+    # an explicit num_predict replaces the expected output
+    assert sizer.num_ctx([{"role": "user", "content": "q" * 6400}], max_output=100) == 2048
+
+
+def test_conversation_keeps_its_rung() -> None:
+    sizer = ContextSizer((2048, 4096, 8192), expected_output_tokens=256)
+    history = _turns(6, 1000)  # ~3.6k tokens with headroom
+    assert sizer.num_ctx(history) == 4096
+    # the same chat, with its long middle dropped, stays at 4096: no runner reload
+    assert conversation_key(history[:2]) == conversation_key(history)
+    assert sizer.num_ctx(history[:2]) == 4096
+    # another conversation starts small
+    assert sizer.num_ctx([SYSTEM, {"role": "user", "content": "other"}]) == 2048
+
+
+def test_sticky_memory_is_bounded() -> None:
+    sizer = ContextSizer((2048, 8192), max_conversations=2)
+    big = "w" * 20000
+    for i in range(3):
+        sizer.num_ctx([{"role": "user", "content": f"{i}{big}"}])
+    assert sizer.num_ctx([{"role": "user", "content": f"0{big}"[:10]}]) == 2048  # evicted
+
+
+def test_ollama_client_sends_adaptive_num_ctx() -> None:
+    sent: list[dict[str, object]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content)["options"])
+        msg = {"role": "assistant", "content": "ok"}
+        return httpx.Response(200, json={"model": "m", "message": msg, "done": True})
+
+    c = OllamaClient(
+        "m",
+        "http://x",
+        options={"num_predict": 64},
+        context_sizer=ContextSizer((2048, 4096)),
+        transport=httpx.MockTransport(handler),
+    )
+    c.warm()
+    c.generate([{"role": "user", "content": "hi"}])
+    c.generate([{"role": "user", "content": "v" * 8000}])
+    assert [o["num_ctx"] for o in sent] == [2048, 2048, 4096]
+    assert all(o["num_predict"] == 64 for o in sent)
+    assert c.options["num_ctx"] == 2048  # static options untouched
+
+
+def test_keeper_rewarms_at_the_last_num_ctx_sent() -> None:
+    sent: list[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content)["options"]["num_ctx"])
+        msg = {"role": "assistant", "content": "ok"}
+        return httpx.Response(200, json={"model": "m", "message": msg, "done": True})
+
+    c = OllamaClient(
+        "m",
+        "http://x",
+        context_sizer=ContextSizer((2048, 8192)),
+        transport=httpx.MockTransport(handler),
+    )
+    c.generate([{"role": "user", "content": "v" * 16000}])
+    c.start_keeper(0.01)
+    deadline = time.monotonic() + 5
+    while len(sent) < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    c.close()
+    assert set(sent) == {8192}  # no keeper tick reloads the runner at 2048
+
+
+def test_ladder_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OLLAMA_NUM_CTX_LADDER", "8192, 4096")
+    sizer = ContextSizer.from_settings(Settings())
+    assert sizer is not None and sizer.ladder == (4096, 8192)
+    monkeypatch.setenv("OLLAMA_NUM_CTX_LADDER", "")
+    assert ContextSizer.from_settings(Settings()) is None
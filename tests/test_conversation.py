@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from llm_lab.conversation import Conversation, conversation_budget
+from llm_lab.settings import Settings
+from llm_lab.tokens import estimate_prompt_tokens
+from llm_lab.types import Message
+
+SYSTEM: Message = {"role": "system", "content": "be brief"}
+
+
+def _chat(c: Conversation, turns: int, size: int = 40) -> None:
+    for i in range(turns):
+        c.user(f"q{i} " + "x" * size)
+        c.assistant(f"a{i} " + "y" * size)
+
+
+def test_running_count_matches_full_estimate() -> None:
+    c = Conversation(10_000, pinned=[SYSTEM])
+    _chat(c, 5)
+    assert c.tokens == estimate_prompt_tokens(c.messages())
+    assert len(c) == 11 and c.evicted_messages == 0
+
+
+def test_eviction_drops_whole_turns_down_to_watermark() -> None:
+    c = Conversation(100, pinned=[SYSTEM], low_watermark=0.5)
+    _chat(c, 6)
+    msgs = c.messages()
+    assert msgs[0] == SYSTEM
+    assert msgs[1]["role"] == "user"  # history always starts at a turn boundary
+    assert msgs[-1]["content"].startswith("a5")
+    assert c.tokens <= 100
+    assert c.tokens == estimate_prompt_tokens(msgs)
+    assert c.evicted_messages == 12 - (len(msgs) - 1)
+
+
+def test_newest_user_turn_is_never_dropped() -> None:
+    c = Conversation(20, pinned=[SYSTEM])
+    c.user("z" * 400)
+    assert [m["role"] for m in c.messages()] == ["system", "user"]
+    c.assistant("ok")
+    c.user("next")
+    assert [m["content"] for m in c.messages()] == ["be brief", "next"]
+
+
+def test_summarizer_folds_evicted_turns() -> None:
+    seen: list[tuple[str, int]] = []
+
+    def summarize(previous: str, dropped: list[Message]) -> str:
+        seen.append((previous, len(dropped)))
+        return f"{previous}+{len(dropped)}"
+
+    c = Conversation(100, pinned=[SYSTEM], summarizer=summarize, low_watermark=0.5)
+    _chat(c, 8)
+    assert len(seen) >= 2 and seen[1][0] == seen[0][0] + f"+{seen[0][1]}"
+    msgs = c.messages()
+    assert msgs[1]["role"] == "system" and msgs[1]["content"].endswith(c.summary or "?")
+    assert c.tokens == estimate_prompt_tokens(msgs)
+
+    c.clear()
+    assert c.messages() == [SYSTEM] and c.summary is None
+
+
+def test_budget_lookup() -> None:
+    s = Settings(conversation_budgets={"ollama:big": 20000, "openai": 50000})
+    assert conversation_budget(s, "ollama", "big") == 20000
+    assert conversation_budget(s, "openai", "gpt") == 50000
+    # Ollama falls back to what fits the largest num_ctx rung with the reply.
+    assert conversation_budget(s, "ollama", "small") == int((32768 - 512) / 1.2)
+    assert Conversation.from_settings(s, "ollama", "big").budget_tokens == 20000
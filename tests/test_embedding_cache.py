@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Sequence
+from pathlib import Path
+
+import pytest
+
+from llm_lab.embedding_cache import (
+    AsyncCachedEmbedder,
+    CachedEmbedder,
+    EmbeddingStore,
+    embedding_key,
+)
+
+
+class FakeEmbedder:
+    model = "fake"
+
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.5] for t in texts]
+
+
+class AsyncFakeEmbedder:
+    model = "fake"
+
+    def __init__(self) -> None:
+        self.sync = FakeEmbedder()
+
+    async def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        return self.sync.embed(texts)
+
+
+def test_only_unique_misses_go_upstream_and_survive_reopen(tmp_path: Path) -> None:
+    inner = FakeEmbedder()
+    with EmbeddingStore(tmp_path) as store:
+        cached = CachedEmbedder(inner, store)
+        assert cached.embed(["a", "bb", "a"]) == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+        assert cached.embed(["bb", "ccc"]) == [[2.0, 0.5], [3.0, 0.5]]
+        assert inner.calls == [["a", "bb"], ["ccc"]]
+        assert (cached.stats.hits, cached.stats.misses) == (2, 3)
+
+    inner2 = FakeEmbedder()
+    with EmbeddingStore(tmp_path) as store:
+        assert len(store) == 3 and store.dim == 2
+        assert CachedEmbedder(inner2, store).embed(["ccc", "a"]) == [[3.0, 0.5], [1.0, 0.5]]
+    assert inner2.calls == []
+
+
+def test_async_cached_embedder(tmp_path: Path) -> None:
+    inner = AsyncFakeEmbedder()
+    cached = AsyncCachedEmbedder(inner, EmbeddingStore(tmp_path))
+    asyncio.run(cached.embed(["x", "yy"]))
+    assert asyncio.run(cached.embed(["yy", "x"])) == [[2.0, 0.5], [1.0, 0.5]]
+    assert inner.sync.calls == [["x", "yy"]]
+
+
+def test_readonly_reader_follows_appends_and_compaction(tmp_path: Path) -> None:
+    writer = EmbeddingStore(tmp_path)
+    reader = EmbeddingStore(tmp_path, readonly=True)
+    k1, k2, k3 = (embedding_key("ns", t) for t in ("one", "two", "three"))
+    assert reader.get_many([k1]) == [None]
+
+    writer.put_many([(k1, [1.0, 0.0]), (k2, [0.0, 1.0])])
+    assert reader.get_many([k2, k1]) == [[0.0, 1.0], [1.0, 0.0]]  # picked up on the miss
+    with pytest.raises(PermissionError):
+        reader.put_many([(k3, [1.0, 1.0])])
+
+    writer.put_many([(k3, [1.0, 1.0])])
+    writer.compact(keep=1)
+    assert writer.generation == 1 and len(writer) == 1
+    assert reader.get_many([k1, k3]) == [None, [1.0, 1.0]]
+    assert reader.generation == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "index-1.bin",
+        "meta.json",
+        "vectors-1.f32",
+    ]
+
+
+def test_max_entries_compacts_keeping_recently_used(tmp_path: Path) -> None:
+    store = EmbeddingStore(tmp_path, max_entries=4, low_watermark=0.5)
+    keys = [embedding_key("ns", str(i)) for i in range(5)]
+    store.put_many([(k, [float(i)]) for i, k in enumerate(keys[:4])])
+    store.get_many([keys[0]])  # a hit makes the oldest key the most recent
+    store.put_many([(keys[4], [4.0])])  # 5 > 4: compact down to 2
+    assert len(store) == 2
+    assert store.get_many(keys) == [[0.0], None, None, None, [4.0]]
+
+
+def test_torn_tail_is_dropped_on_open(tmp_path: Path) -> None:
+    with EmbeddingStore(tmp_path) as store:
+        store.put_many([(embedding_key("ns", "a"), [1.0, 2.0])])
+    with (tmp_path / "vectors-0.f32").open("ab") as f:
+        f.write(b"\x00\x00\x80")  # half a row from an interrupted append
+    with (tmp_path / "index-0.bin").open("ab") as f:
+        f.write(b"\x01" * 7)
+    with EmbeddingStore(tmp_path) as store:
+        store.put_many([(embedding_key("ns", "b"), [3.0, 4.0])])
+        keys = [embedding_key("ns", "a"), embedding_key("ns", "b")]
+        assert store.get_many(keys) == [[1.0, 2.0], [3.0, 4.0]]
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+from array import array
+from pathlib import Path
+
+import httpx
+import pytest
+
+from llm_lab.clients.ollama import OllamaEmbedder
+from llm_lab.clients.openai import AsyncOpenAIEmbedder, OpenAIEmbedder
+from llm_lab.embeddings import plan_batches
+
+
+def test_plan_batches_respects_item_and_token_caps() -> None:
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 400, "e"]  # 10, 10, 10, 100, 1 tokens
+    assert plan_batches(texts, max_items=2, max_tokens=1000) == [
+        range(0, 2),
+        range(2, 4),
+        range(4, 5),
+    ]
+    # The oversized text still goes out, alone.
+    assert plan_batches(texts, max_items=10, max_tokens=50) == [
+        range(0, 3),
+        range(3, 4),
+        range(4, 5),
+    ]
+    assert plan_batches([]) == []
+
+
+def _b64(vec: list[float]) -> str:
+    return base64.b64encode(array("f", vec).tobytes()).decode()
+
+
+def _openai_handler(sizes: list[int], *, max_ok: int = 100) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/v1/embeddings"
+        body = json.loads(request.content)
+        assert body["encoding_format"] == "base64"
+        inputs: list[str] = body["input"]
+        sizes.append(len(inputs))
+        if len(inputs) > max_ok:
+            return httpx.Response(413, json={"error": "too large"})
+        # Out of order on purpose: the client must place vectors by "index".
+        data = [
+            {"index": i, "embedding": _b64([float(len(t)), 1.0])}
+            for i, t in reversed(list(enumerate(inputs)))
+        ]
+        return httpx.Response(200, json={"data": data, "usage": {"prompt_tokens": 3}})
+
+    return httpx.MockTransport(handler)
+
+
+def test_openai_embedder_batches_and_decodes_base64() -> None:
+    sizes: list[int] = []
+    http = httpx.Client(transport=_openai_handler(sizes))
+    e = OpenAIEmbedder(api_key="k", max_batch=2, _http=http)
+    vectors = e.embed(["a", "bb", "ccc", "dddd", "eeeee"])
+    assert sizes == [2, 2, 1]
+    assert vectors == [[float(n), 1.0] for n in range(1, 6)]
+
+
+def test_openai_embedder_rejects_bad_indexes() -> None:
+    def embedder(indexes: list[object]) -> OpenAIEmbedder:
+        def handler(request: httpx.Request) -> httpx.Response:
+            data = [{"index": i, "embedding": _b64([1.0])} for i in indexes]
+            return httpx.Response(200, json={"data": data})
+
+        http = httpx.Client(transport=httpx.MockTransport(handler))
+        return OpenAIEmbedder(api_key="k", _http=http)
+
+    assert embedder([1, 0]).embed(["a", "b"]) == [[1.0], [1.0]]
+    for indexes, match in (
+        ([0, 2], "bad index 2"),
+        ([0, -1], "bad index -1"),
+        ([0, "1"], "bad index '1'"),
+        ([1, 1], "duplicate index 1"),
+        ([0], "1 embeddings for 2 inputs"),
+    ):
+        with pytest.raises(ValueError, match=match):
+            embedder(indexes).embed(["a", "b"])
+
+
+def test_openai_embedder_halves_a_batch_rejected_with_413() -> None:
+    sizes: list[int] = []
+    http = httpx.AsyncClient(transport=_openai_handler(sizes, max_ok=2))
+    e = AsyncOpenAIEmbedder(api_key="k", max_batch=8, _http=http)
+    vectors = asyncio.run(e.embed(["x"] * 5))
+    assert sizes == [5, 2, 3, 1, 2]
+    assert len(vectors) == 5
+
+
+def test_ollama_embedder_posts_batches_to_api_embed() -> None:
+    bodies: list[dict[str, object]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/embed"
+        body = json.loads(request.content)
+        bodies.append(body)
+        inputs = body["input"]
+        return httpx.Response(
+            200,
+            json={"model": "e", "embeddings": [[float(len(t))] for t in inputs]},
+        )
+
+    with OllamaEmbedder("e", "http://x", max_batch=3, transport=httpx.MockTransport(handler)) as e:
+        assert e.embed(["a", "bb", "ccc", "dddd"]) == [[1.0], [2.0], [3.0], [4.0]]
+    assert [b["input"] for b in bodies] == [["a", "bb", "ccc"], ["dddd"]]
+    assert bodies[0]["truncate"] is True
+
+
+def test_vector_index_top_k_cosine() -> None:
+    np = pytest.importorskip("numpy")
+    from llm_lab.vector_index import VectorIndex
+
+    index = VectorIndex(2, capacity=1)  # forces growth
+    index.add(["x", "y"], [[1.0, 0.0], [0.0, 3.0]])
+    index.add(["xy"], [[1.0, 1.0]])
+    assert index.vectors.dtype == np.float32 and index.vectors.flags.c_contiguous
+
+    top = index.search([2.0, 0.1], k=2)
+    assert [i for i, _ in top] == ["x", "xy"]
+    assert top[0][1] == pytest.approx(0.99875, abs=1e-4)
+    assert [i for i, _ in index.search([0.0, 1.0], k=10)] == ["y", "xy", "x"]
+    many = index.search_many([[1.0, 0.0], [0.0, 1.0]], k=1)
+    assert [[i for i, _ in r] for r in many] == [["x"], ["y"]]
+    with pytest.raises(ValueError):
+        index.search([1.0, 2.0, 3.0])
+
+
+def test_vector_index_save_and_mmap_load(tmp_path: Path) -> None:
+    np = pytest.importorskip("numpy")
+    from llm_lab.vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((50, 8)).astype(np.float32)
+    index = VectorIndex.from_vectors([f"d{i}" for i in range(50)], vectors)
+    index.save(tmp_path / "idx")
+
+    loaded = VectorIndex.load(tmp_path / "idx")
+    assert isinstance(loaded.vectors, np.memmap) and not loaded.vectors.flags.writeable
+    assert loaded.search(vectors[7], k=3)[0][0] == "d7"
+
+    loaded.add(["new"], [vectors[7] * 2])  # copies out of the read-only map
+    assert {i for i, _ in loaded.search(vectors[7], k=2)} == {"d7", "new"}
+    assert len(VectorIndex.load(tmp_path / "idx")) == 50
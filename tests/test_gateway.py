@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from llm_lab import cli
+from llm_lab.clients.ollama import AsyncOllamaClient
+from llm_lab.clients.openai import AsyncOpenAIClient
+from llm_lab.fake_upstream import FakeUpstream, FakeUpstreamConfig
+from llm_lab.gateway import Gateway, serve
+from llm_lab.scheduler import AsyncScheduledClient, Scheduler
+from llm_lab.settings import Settings
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+REPLY = "t0 t1 t2 "
+
+
+def test_both_shapes_roundtrip_through_our_clients() -> None:
+    async def run(upstream: str) -> list[str]:
+        async with (
+            AsyncOllamaClient("fake", upstream) as backend,
+            Gateway(backend) as gw,
+            AsyncOllamaClient("ignored", gw.url) as ollama,
+            AsyncOpenAIClient(api_key="k", model="ignored", base_url=gw.url) as openai,
+        ):
+            out = [await ollama.generate(MSGS), await openai.generate(MSGS)]
+            out.append("".join([p async for p in ollama.stream(MSGS)]))
+            out.append("".join([p async for p in openai.stream(MSGS)]))
+            assert gw.stats.requests == 4 and gw.stats.in_flight == 0
+            return out
+
+    with FakeUpstream(FakeUpstreamConfig(reply_tokens=3)) as up:
+        # OpenAIClient.generate strips the final text
+        assert asyncio.run(run(up.url)) == [REPLY, REPLY.strip(), REPLY, REPLY]
+
+
+class Gated:
+    """Async backend whose calls wait for `gate`; streams until closed."""
+
+    model = "gated"
+
+    def __init__(self) -> None:
+        self.gate = asyncio.Event()
+        self.running = 0
+        self.closed = 0
+
+    async def generate(self, messages: list[Message]) -> str:
+        self.running += 1
+        try:
+            await self.gate.wait()
+            if messages[-1]["content"] == "fail":
+                raise RuntimeError("backend down")
+            return "ok"
+        finally:
+            self.running -= 1
+
+    async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        if messages[-1]["content"] == "fail":
+            raise RuntimeError("backend down")
+        try:
+            while True:
+                yield "x" * 1024
+                await asyncio.sleep(0.001)
+        finally:
+            self.closed += 1
+
+
+def _chat(content: str, *, stream: bool = False) -> dict[str, object]:
+    return {"messages": [{"role": "user", "content": content}], "stream": stream}
+
+
+async def _until(cond: object) -> None:
+    for _ in range(500):
+        if callable(cond) and cond():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_queue_bound_and_tenant_limits() -> None:
+    async def run() -> None:
+        backend = Gated()
+        gw = Gateway(backend, max_concurrency=2, max_queue=2, tenant_concurrency=1)
+        async with gw, httpx.AsyncClient(base_url=gw.url) as http:
+
+            def post(tenant: str) -> asyncio.Task[httpx.Response]:
+                headers = {"X-Tenant": tenant}
+                return asyncio.create_task(http.post("/api/chat", json=_chat("q"), headers=headers))
+
+            a1, a2, b1 = post("a"), post("a"), post("b")
+            # tenant a is capped at 1, so b gets the second global slot
+            await _until(lambda: backend.running == 2 and gw.stats.queued == 1)
+            assert gw.stats.tenants == {"a": 1, "b": 1}
+            a3 = post("a")
+            await _until(lambda: gw.stats.queued == 2)
+            rejected = await post("c")
+            assert rejected.status_code == 503 and rejected.headers["retry-after"] == "1"
+
+            backend.gate.set()
+            for t in (a1, a2, a3, b1):
+                r = await t
+                assert r.json()["message"]["content"] == "ok"
+            stats = (await http.get("/stats")).json()
+            assert stats["rejected"] == 1 and stats["queued"] == 0 and stats["tenants"] == {}
+
+    asyncio.run(run())
+
+
+def test_zero_queue_still_serves_free_slots() -> None:
+    async def run() -> None:
+        backend = Gated()
+        gw = Gateway(backend, max_concurrency=1, max_queue=0)
+        async with gw, httpx.AsyncClient(base_url=gw.url) as http:
+            first = asyncio.create_task(http.post("/api/chat", json=_chat("q")))
+            await _until(lambda: backend.running == 1)
+            assert (await http.post("/api/chat", json=_chat("q"))).status_code == 503
+            backend.gate.set()
+            assert (await first).status_code == 200
+            assert (await http.post("/api/chat", json=_chat("q"))).status_code == 200
+            assert gw.stats.rejected == 1 and gw.stats.queued == 0
+
+    asyncio.run(run())
+    with pytest.raises(ValidationError):
+        Settings(serve_max_queue=-1)
+
+
+def test_errors_map_to_status_codes() -> None:
+    async def run() -> None:
+        backend = Gated()
+        backend.gate.set()
+        async with Gateway(backend) as gw, httpx.AsyncClient(base_url=gw.url) as http:
+            assert (await http.post("/api/chat", content=b"{")).status_code == 400
+            bad_role = {"messages": [{"role": "tool", "content": "x"}]}
+            assert (await http.post("/api/chat", json=bad_role)).status_code == 400
+            assert (await http.post("/v1/other", json={})).status_code == 404
+            r = await http.post("/v1/responses", json={"input": "fail"})
+            assert r.status_code == 502 and "backend down" in r.json()["error"]
+            r = await http.post("/api/chat", json=_chat("fail", stream=True))
+            assert r.status_code == 502  # failed before the first chunk: no 200 sent
+            assert gw.stats.upstream_errors == 2
+            for length in (b"abc", b"-5"):
+                reader, writer = await asyncio.open_connection(*gw.url[7:].split(":"))
+                writer.write(b"POST /api/chat HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+                status_line = await reader.readline()
+                writer.close()
+                assert status_line.split()[1] == b"400"
+
+    asyncio.run(run())
+
+
+def test_priority_header_reaches_the_scheduler() -> None:
+    async def run() -> None:
+        backend = Gated()
+        backend.gate.set()
+        sched = Scheduler(1)
+        gw = Gateway(AsyncScheduledClient(backend, sched), scheduler=sched)
+        async with gw, httpx.AsyncClient(base_url=gw.url) as http:
+            headers = {"X-Tenant": "ui", "X-Priority": "Interactive"}
+            r = await http.post("/api/chat", json=_chat("q"), headers=headers)
+            assert r.json()["message"]["content"] == "ok"
+            r = await http.post("/api/chat", json=_chat("q"), headers={"X-Priority": "asap"})
+            assert r.status_code == 400
+            classes = (await http.get("/stats")).json()["scheduler"]["classes"]
+            assert classes["interactive"]["dispatched"] == 1
+            assert classes["normal"]["dispatched"] == 0
+
+    asyncio.run(run())
+
+
+def test_stream_backpressure_and_disconnect_stop_upstream() -> None:
+    async def run() -> None:
+        backend = Gated()
+        async with Gateway(backend) as gw:
+            host, port = gw.url.removeprefix("http://").split(":")
+            reader, writer = await asyncio.open_connection(host, int(port))
+            body = json.dumps(_chat("q", stream=True)).encode()
+            writer.write(
+                b"POST /api/chat HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+            )
+            assert (await reader.readline()).startswith(b"HTTP/1.1 200")
+            await reader.read(4096)
+            # Nobody reads now: drain() blocks once the socket buffers fill, so the
+            # endless upstream stream is paused instead of piling up in memory.
+            await asyncio.sleep(0.2)
+            assert gw.stats.in_flight == 1 and backend.closed == 0
+            writer.close()
+            await _until(lambda: backend.closed == 1)
+            await _until(lambda: gw.stats.in_flight == 0)
+            assert gw.stats.disconnects == 1
+
+    asyncio.run(run())
+
+
+def test_serve_builds_backend_from_settings() -> None:
+    async def run(upstream: str) -> str:
+        s = Settings(ollama_host=upstream, ollama_model="fake", coalesce_enabled=True)
+        started: asyncio.Future[Gateway] = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(serve(s, "ollama", port=0, ready=started.set_result))
+        gw = await started
+        async with httpx.AsyncClient(base_url=gw.url) as http:
+            r = await http.post("/v1/responses", json={"input": MSGS, "model": "x"})
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        body = r.json()
+        assert body["model"] == "fake" and body["status"] == "completed"
+        return str(body["output"][0]["content"][0]["text"])
+
+    with FakeUpstream(FakeUpstreamConfig(reply_tokens=3)) as up:
+        assert asyncio.run(run(up.url)) == REPLY
+
+
+def test_serve_hedges_to_the_secondary_and_rejects_unsupported_flags(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    async def run(primary: str, secondary: str) -> int:
+        s = Settings(
+            ollama_host=primary,
+            ollama_model="fake",
+            hedge_secondary=secondary,
+            hedge_initial_delay_s=0.05,
+        )
+        started: asyncio.Future[Gateway] = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(serve(s, "ollama", port=0, ready=started.set_result))
+        gw = await started
+        async with httpx.AsyncClient(base_url=gw.url) as http:
+            r = await http.post("/api/chat", json=_chat("q"))
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return r.status_code
+
+    slow = FakeUpstreamConfig(latency_s=1.0)
+    with FakeUpstream(slow) as primary, FakeUpstream() as secondary:
+        assert asyncio.run(run(primary.url, secondary.url)) == 200
+        assert secondary.requests == 1
+
+    for flag in (["--cache"], ["--cache-path", "c.sqlite"], ["--ollama-hosts", "a,b"]):
+        with pytest.raises(SystemExit):
+            cli.main(["serve", *flag])
+        assert f"{flag[0]} is not supported by serve" in capsys.readouterr().err
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Iterator
+
+import pytest
+
+from llm_lab.factory import LLMFactory
+from llm_lab.fake_upstream import FakeUpstream, FakeUpstreamConfig
+from llm_lab.hedge import AsyncHedgedClient, HedgedClient, HedgePolicy
+from llm_lab.settings import Settings
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+FAST = HedgePolicy(initial_delay_s=0.05, max_ratio=1.0)
+
+
+class Slow:
+    """Streams `name` after `delay_s`, in two chunks."""
+
+    def __init__(self, name: str, delay_s: float, fail: bool = False) -> None:
+        self.name = name
+        self.delay_s = delay_s
+        self.fail = fail
+        self.calls = 0
+        self.closed = False
+
+    def generate(self, messages: list[Message]) -> str:
+        return "".join(self.stream(messages))
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        self.calls += 1
+        try:
+            time.sleep(self.delay_s)
+            if self.fail:
+                raise RuntimeError(f"{self.name} failed")
+            yield self.name
+            time.sleep(self.delay_s / 10)
+            yield "!"
+        finally:
+            self.closed = True
+
+
+def test_fast_primary_is_not_hedged_and_delay_follows_percentile() -> None:
+    primary, secondary = Slow("p", 0.0), Slow("s", 0.0)
+    c = HedgedClient(primary, secondary, HedgePolicy(min_samples=5, min_delay_s=0.0))
+    for _ in range(5):
+        assert c.generate(MSGS) == "p!"
+    assert secondary.calls == 0 and c.stats.hedged == 0 and c.stats.calls == 5
+    assert c.delay_s() < 0.05  # learned from the observed first-token times
+
+
+def test_slow_primary_loses_to_hedge_and_is_cancelled() -> None:
+    primary, secondary = Slow("p", 0.3), Slow("s", 0.01)
+    c = HedgedClient(primary, secondary, FAST)
+    t0 = time.perf_counter()
+    assert c.generate(MSGS) == "s!"
+    assert time.perf_counter() - t0 < 0.25
+    assert (c.stats.hedged, c.stats.hedge_wins) == (1, 1)
+    deadline = time.monotonic() + 2
+    while not primary.closed:  # stopped at its next chunk
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_stream_commits_to_first_leg_with_a_chunk() -> None:
+    c = HedgedClient(Slow("p", 0.3), Slow("s", 0.01), FAST)
+    assert list(c.stream(MSGS)) == ["s", "!"]
+    c = HedgedClient(Slow("p", 0.0), Slow("s", 0.0), FAST)
+    assert list(c.stream(MSGS)) == ["p", "!"]
+
+
+def test_max_ratio_caps_hedges() -> None:
+    secondary = Slow("s", 0.0)
+    c = HedgedClient(Slow("p", 0.06), secondary, HedgePolicy(initial_delay_s=0.01, max_ratio=0.5))
+    results = [c.generate(MSGS) for _ in range(4)]
+    assert c.stats.hedged == 2 and c.stats.denied == 2 and secondary.calls == 2
+    assert results.count("p!") == 2
+    assert c.stats.hedge_rate == 0.5 and c.stats.win_rate == 1.0
+
+
+def test_errors() -> None:
+    # A primary failing before the delay is not hedged (retries belong to ResilientClient).
+    c = HedgedClient(Slow("p", 0.0, fail=True), Slow("s", 0.0), FAST)
+    with pytest.raises(RuntimeError, match="p failed"):
+        c.generate(MSGS)
+    # After the hedge fired, one failing leg leaves the other to answer.
+    c = HedgedClient(Slow("p", 0.1, fail=True), Slow("s", 0.15), FAST)
+    assert c.generate(MSGS) == "s!"
+    c = HedgedClient(Slow("p", 0.1, fail=True), Slow("s", 0.1, fail=True), FAST)
+    with pytest.raises(RuntimeError, match="p failed"):
+        c.generate(MSGS)
+
+
+class AsyncSlow:
+    def __init__(self, name: str, delay_s: float) -> None:
+        self.name = name
+        self.delay_s = delay_s
+        self.cancelled = False
+
+    async def generate(self, messages: list[Message]) -> str:
+        return "".join([p async for p in self.stream(messages)])
+
+    async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+        try:
+            await asyncio.sleep(self.delay_s)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        yield self.name
+
+
+def test_async_hedge_cancels_loser() -> None:
+    async def run() -> None:
+        primary = AsyncSlow("p", 5.0)
+        c = AsyncHedgedClient(primary, AsyncSlow("s", 0.01), FAST)
+        assert await c.generate(MSGS) == "s"
+        assert primary.cancelled
+        assert [p async for p in c.stream(MSGS)] == ["s"]
+        assert c.stats.hedged == 2 and c.stats.hedge_wins == 2
+
+    asyncio.run(run())
+
+
+def test_from_settings_hedges_to_another_ollama_host() -> None:
+    slow_cfg = FakeUpstreamConfig(latency_s=0.5, reply_tokens=1)
+    with FakeUpstream(slow_cfg) as slow, FakeUpstream(FakeUpstreamConfig(reply_tokens=2)) as fast:
+        s = Settings(
+            ollama_host=slow.url,
+            ollama_model="fake",
+            hedge_secondary=fast.url,
+            hedge_initial_delay_s=0.05,
+        )
+        c = HedgedClient.from_settings(LLMFactory.create("ollama", settings=s), s)
+        assert c.generate(MSGS) == "t0 t1 "
+        assert fast.requests == 1 and c.stats.hedge_wins == 1
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from llm_lab.clients.ollama import OllamaClient
+from llm_lab.clients.openai import OpenAIClient
+from llm_lab.clients.pool import HttpPool, PoolLimits
+from llm_lab.factory import LLMFactory
+from llm_lab.settings import Settings
+
+
+def _ok(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={
+            "output": [
+                {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": "ok"}],
+                }
+            ]
+        },
+    )
+
+
+def test_openai_client_reuses_connection_across_calls() -> None:
+    seen: list[int] = []
+
+    class CountingTransport(httpx.MockTransport):
+        def handle_request(self, request: httpx.Request) -> httpx.Response:
+            seen.append(id(self))
+            return super().handle_request(request)
+
+    http = httpx.Client(transport=CountingTransport(_ok))
+    c = OpenAIClient(api_key="k", model="m", _http=http)
+    for _ in range(3):
+        assert c.generate([{"role": "user", "content": "hi"}]) == "ok"
+    assert len(set(seen)) == 1
+
+
+def test_openai_client_close_releases_its_wrapper_but_not_the_pool() -> None:
+    class Shared(httpx.MockTransport):
+        closed = False
+
+        def close(self) -> None:
+            self.closed = True
+
+    shared = Shared(_ok)
+    with HttpPool() as pool:
+        pool._transports["https://api.openai.com"] = shared  # type: ignore[assignment]
+        http = pool.client("https://api.openai.com", timeout=5.0)
+        with OpenAIClient(api_key="k", model="m", _http=http) as c:
+            assert c.generate([{"role": "user", "content": "hi"}]) == "ok"
+        assert http.is_closed and not shared.closed
+    assert shared.closed
+
+    with OpenAIClient(api_key="k", model="m") as owned:
+        conn = owned._conn
+    assert conn.is_closed
+
+
+def test_pool_shares_transport_per_base_url() -> None:
+    pool = HttpPool(PoolLimits(max_connections=4))
+    pool.transport("https://api.openai.com/")
+    pool.transport("https://API.openai.com")
+    pool.transport("http://127.0.0.1:11434")
+    assert len(pool._transports) == 2
+
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.transport("https://api.openai.com")
+
+
+def test_factory_shares_pool_between_clients() -> None:
+    s = Settings(openai_api_key="k", ollama_host="http://example:11434")
+    with HttpPool() as pool:
+        a = LLMFactory.create("openai", settings=s, pool=pool)
+        b = LLMFactory.create("openai", settings=s, pool=pool)
+        o = LLMFactory.create("ollama", settings=s, pool=pool)
+        a.close()
+        b.close()
+        o.close()
+        assert set(pool._transports) == {"https://api.openai.com", "http://example:11434"}
+
+
+def test_ollama_client_owns_transport_by_default() -> None:
+    c = OllamaClient(host="http://example:11434")
+    assert c._owns_transport
+    c.close()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from llm_lab import cli
+from llm_lab.clients.ollama import AsyncOllamaClient, OllamaClient
+from llm_lab.fake_upstream import FakeUpstream, FakeUpstreamConfig
+from llm_lab.observe import HistogramAggregator
+from llm_lab.ollama_local import keep_alive_seconds
+from llm_lab.settings import Settings, parse_keep_alive
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+
+
+def test_keep_alive_parsing() -> None:
+    assert keep_alive_seconds("1h30m") == 5400
+    assert keep_alive_seconds("500ms") == 0.5
+    assert keep_alive_seconds(-1) == keep_alive_seconds("-1") == float("inf")
+    assert keep_alive_seconds(None) is None
+    with pytest.raises(ValueError):
+        keep_alive_seconds("5 minutes")
+    assert parse_keep_alive("300") == 300.0
+    assert parse_keep_alive(" 30m ") == "30m"
+    assert Settings(ollama_keep_alive="600").ollama_keep_alive == 600.0
+
+
+def test_keep_alive_is_sent_and_warm_posts_empty_chat() -> None:
+    bodies: list[dict[str, object]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(
+            200,
+            json={"model": "m", "message": {"role": "assistant", "content": "ok"}, "done": True},
+        )
+
+    c = OllamaClient("m", "http://x", keep_alive="30m", transport=httpx.MockTransport(handler))
+    c.generate(MSGS)
+    c.warm()
+    assert [b["keep_alive"] for b in bodies] == ["30m", "30m"]
+    assert bodies[1]["messages"] == []
+
+
+def test_warm_reports_cold_start() -> None:
+    metrics = HistogramAggregator()
+    with (
+        FakeUpstream(FakeUpstreamConfig(load_s=0.15)) as up,
+        OllamaClient("fake", up.url, keep_alive="10m", observers=[metrics]) as c,
+    ):
+        assert c.warm() == pytest.approx(0.15)
+        assert c.warm() == 0.0  # resident now
+        c.generate(MSGS)
+    (series,) = metrics.snapshot().values()
+    assert series.calls == 3 and series.cold_starts == 1
+    assert "llm_lab_cold_starts_total" in metrics.prometheus_text()
+
+
+def test_keeper_refreshes_until_close() -> None:
+    with FakeUpstream() as up:
+        c = OllamaClient("fake", up.url)
+        c.start_keeper(0.02)
+        deadline = time.monotonic() + 5
+        while up.requests < 3:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        c.close()
+        seen = up.requests
+        time.sleep(0.1)
+        assert up.requests == seen
+
+
+def test_async_warm_and_keeper() -> None:
+    async def run(url: str) -> float | None:
+        async with AsyncOllamaClient("fake", url, keep_alive=-1) as c:
+            c.start_keeper(0.01)
+            load = await c.warm()
+            await asyncio.sleep(0.05)
+            return load
+
+    with FakeUpstream(FakeUpstreamConfig(load_s=0.01)) as up:
+        assert asyncio.run(run(up.url)) == pytest.approx(0.01)
+        assert up.requests >= 2 and up.loads == 1  # keep_alive=-1: never unloaded
+
+
+def test_cli_warm(capsys: pytest.CaptureFixture[str]) -> None:
+    with FakeUpstream(FakeUpstreamConfig(load_s=0.01)) as up:
+        argv = ["warm", "--provider", "ollama", "--ollama-host", up.url, "--model", "fake"]
+        cli.main([*argv, "--keep-alive", "5m"])
+        cli.main(argv)
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith(f"fake on {up.url}: loaded in")
+    assert out[1] == f"fake on {up.url}: already loaded"
+
+
+def test_cli_rejects_bad_keep_alive(capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.raises(SystemExit) as ei:
+        cli.main(["warm", "--keep-alive", "5 minutes"])
+    assert ei.value.code == 2
+    err = capsys.readouterr().err
+    assert "--keep-alive" in err and "Traceback" not in err
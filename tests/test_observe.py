@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from llm_lab.cache import CachedLLMClient
+from llm_lab.clients.ollama import AsyncOllamaClient, OllamaClient
+from llm_lab.clients.openai import AsyncOpenAIClient, OpenAIClient
+from llm_lab.fake_upstream import FakeUpstream, FakeUpstreamConfig
+from llm_lab.observe import CallEvent, HistogramAggregator, prometheus_text
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "hello there, how are you?"}]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.events: list[CallEvent] = []
+
+    def on_event(self, event: CallEvent) -> None:
+        self.events.append(event)
+
+
+class Broken:
+    def on_event(self, event: CallEvent) -> None:
+        raise RuntimeError("observer bug")
+
+
+def test_openai_events_carry_usage_ttft_and_connect() -> None:
+    rec = Recorder()
+    with (
+        FakeUpstream(FakeUpstreamConfig(reply_tokens=4)) as up,
+        OpenAIClient("k", "fake", up.url, observers=(rec, Broken())) as c,
+    ):
+        assert c.generate(MSGS) == "t0 t1 t2 t3"
+        assert list(c.stream(MSGS)) == ["t0 ", "t1 ", "t2 ", "t3 "]
+
+    gen, stream = rec.events
+    assert (gen.provider, gen.model, gen.operation, gen.ok) == ("openai", "fake", "generate", True)
+    assert gen.prompt_tokens == 6 and gen.completion_tokens == 4
+    assert gen.ttft_s is not None  # generate() streams too, so it sees the first token
+    assert gen.connect_s is not None and gen.connect_s > 0  # fresh connection
+    assert stream.operation == "stream" and stream.completion_tokens == 4
+    assert stream.ttft_s is not None and stream.ttft_s <= stream.latency_s
+    assert stream.connect_s == 0.0  # keep-alive connection reused
+    assert stream.tokens_per_s is not None and stream.tokens_per_s > 0
+
+
+def test_ollama_events_use_server_stats() -> None:
+    rec = Recorder()
+    with (
+        FakeUpstream(FakeUpstreamConfig(reply_tokens=3, tokens_per_s=1000)) as up,
+        OllamaClient("fake", up.url, observers=[rec]) as c,
+    ):
+        c.generate(MSGS)
+        list(c.stream(MSGS))
+
+    for e in rec.events:
+        assert e.ok and e.provider == "ollama"
+        assert e.prompt_tokens == 6 and e.completion_tokens == 3
+        assert e.load_s == 0.0
+        assert e.tokens_per_s == pytest.approx(1000, rel=0.01)  # from eval_duration
+    assert rec.events[1].ttft_s is not None
+
+
+def test_async_ollama_stream_event() -> None:
+    rec = Recorder()
+
+    async def run(url: str) -> list[str]:
+        async with AsyncOllamaClient("fake", url, observers=[rec]) as c:
+            return [p async for p in c.stream(MSGS)]
+
+    with FakeUpstream(FakeUpstreamConfig(reply_tokens=2)) as up:
+        assert asyncio.run(run(up.url)) == ["t0 ", "t1 "]
+    (e,) = rec.events
+    assert e.operation == "stream" and e.completion_tokens == 2 and e.ttft_s is not None
+
+
+def test_failed_call_is_reported() -> None:
+    rec = Recorder()
+    http = httpx.Client(transport=httpx.MockTransport(lambda r: httpx.Response(503)))
+    c = OpenAIClient("k", "m", observers=(rec,), _http=http)
+    with pytest.raises(httpx.HTTPStatusError):
+        c.generate(MSGS)
+    (e,) = rec.events
+    assert not e.ok and e.error is not None and e.error.startswith("HTTPStatusError")
+    assert e.connect_s is None  # MockTransport does not trace
+
+
+def test_abandoned_stream_is_reported_as_cancelled() -> None:
+    rec = Recorder()
+
+    async def abandon(c: AsyncOllamaClient | AsyncOpenAIClient) -> None:
+        async with c:
+            stream = c.stream(MSGS)
+            await anext(stream)
+            await stream.aclose()
+
+    with FakeUpstream(FakeUpstreamConfig(reply_tokens=3)) as up:
+        for c in (
+            OllamaClient("fake", up.url, observers=[rec]),
+            OpenAIClient("k", "fake", up.url, observers=(rec,)),
+        ):
+            with c:
+                stream = c.stream(MSGS)
+                next(stream)
+                stream.close()
+        asyncio.run(abandon(AsyncOllamaClient("fake", up.url, observers=[rec])))
+        asyncio.run(abandon(AsyncOpenAIClient("k", "fake", up.url, observers=(rec,))))
+    assert [(e.ok, e.error) for e in rec.events] == [(False, "cancelled")] * 4
+    assert all(e.ttft_s is not None for e in rec.events)
+
+
+def test_cache_hit_event() -> None:
+    class Echo:
+        model = "m"
+
+        def generate(self, messages: list[Message]) -> str:
+            return "answer"
+
+    rec = Recorder()
+    c = CachedLLMClient(Echo(), provider="fake", observers=[rec])
+    c.generate(MSGS)
+    c.generate(MSGS)
+    (e,) = rec.events
+    assert e.cache_hit and e.provider == "fake" and e.model == "m"
+
+
+def test_histogram_aggregator_and_prometheus_text() -> None:
+    agg = HistogramAggregator(buckets=(0.1, 1.0))
+    for latency in (0.05, 0.5, 5.0):
+        agg.on_event(CallEvent("openai", "m", "generate", True, latency, prompt_tokens=10))
+    agg.on_event(CallEvent("openai", "m", "generate", False, 0.2, error="X: y"))
+
+    (series,) = agg.snapshot().values()
+    assert (series.calls, series.errors, series.prompt_tokens) == (4, 1, 30)
+    latency = series.histograms["latency_s"]
+    assert latency.counts == [1, 2, 1]
+    assert latency.quantile(0.5) == 1.0
+    assert "ttft_s" not in series.histograms
+
+    text = prometheus_text(agg)
+    labels = 'provider="openai",model="m"'
+    assert f"llm_lab_calls_total{{{labels}}} 4" in text
+    assert f"llm_lab_errors_total{{{labels}}} 1" in text
+    assert f'llm_lab_call_latency_seconds_bucket{{{labels},le="1.0"}} 3' in text
+    assert f'llm_lab_call_latency_seconds_bucket{{{labels},le="+Inf"}} 4' in text
+    assert f"llm_lab_call_latency_seconds_count{{{labels}}} 4" in text
+    assert "# TYPE llm_lab_call_latency_seconds histogram" in text
+
+
+def test_openai_cached_tokens_and_ratio() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        usage = {"input_tokens": 1000, "input_tokens_details": {"cached_tokens": 768}}
+        output = [
+            {
+                "type": "message",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": "ok"}],
+            }
+        ]
+        return httpx.Response(200, json={"output": output, "usage": usage})
+
+    rec, agg = Recorder(), HistogramAggregator()
+    http = httpx.Client(transport=httpx.MockTransport(handler))
+    OpenAIClient("k", "m", _http=http, observers=(rec, agg)).generate(MSGS)
+    assert rec.events[0].cached_tokens == 768
+    assert agg.cached_token_ratio() == pytest.approx(0.768)
+    assert 'llm_lab_cached_prompt_tokens_total{provider="openai",model="m"} 768' in (
+        agg.prometheus_text()
+    )
+    agg.on_event(CallEvent("ollama", "m", "generate", ok=True, latency_s=0.1, prompt_tokens=500))
+    assert agg.cached_token_ratio() == pytest.approx(0.768)  # no cache info: not counted
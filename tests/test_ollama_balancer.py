@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Callable
+
+import httpx
+import pytest
+from ollama import ResponseError
+
+from llm_lab.clients.ollama import BalancedOllamaClient
+from llm_lab.settings import Settings
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+def _reply(text: str) -> Handler:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": []})
+        body = json.loads(request.content)
+        return httpx.Response(
+            200,
+            json={"model": body["model"], "message": {"role": "assistant", "content": text}},
+        )
+
+    return handler
+
+
+def _client(handlers: dict[str, Handler]) -> BalancedOllamaClient:
+    return BalancedOllamaClient(
+        list(handlers),
+        transport_for=lambda host: httpx.MockTransport(handlers[host]),
+        probe_interval_s=60,
+    )
+
+
+def test_settings_parse_comma_separated_hosts(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OLLAMA_HOSTS", "a:11434, http://b:11434/")
+    assert Settings().ollama_hosts == ["http://a:11434", "http://b:11434"]
+
+
+def test_routes_to_least_outstanding_host() -> None:
+    release = threading.Event()
+    entered = threading.Event()
+    slow = _reply("a")
+
+    def blocking(request: httpx.Request) -> httpx.Response:
+        entered.set()
+        release.wait(5)
+        return slow(request)
+
+    c = _client({"http://a:1": blocking, "http://b:1": _reply("b")})
+    t = threading.Thread(target=c.generate, args=(MSGS,))
+    t.start()
+    entered.wait(5)
+    try:
+        assert c.generate(MSGS) == "b"
+    finally:
+        release.set()
+        t.join()
+    assert [h["in_flight"] for h in c.hosts] == [0, 0]
+
+
+def test_connect_failure_fails_over_and_probe_restores() -> None:
+    down = True
+
+    def flaky(request: httpx.Request) -> httpx.Response:
+        if down:
+            raise httpx.ConnectError("refused", request=request)
+        return _reply("a")(request)
+
+    c = _client({"http://a:1": flaky, "http://b:1": _reply("b")})
+    assert c.generate(MSGS) == "b"
+    a, b = c.hosts
+    assert (a["healthy"], a["failures"], b["healthy"]) == (False, 1, True)
+
+    down = False
+    c.probe()
+    assert c.hosts[0]["healthy"]
+    c.close()
+
+
+def test_server_error_takes_host_out_without_retry() -> None:
+    def broken(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(500, json={"error": "runner crashed"})
+
+    c = _client({"http://a:1": broken, "http://b:1": _reply("b")})
+    with pytest.raises(ResponseError):
+        c.generate(MSGS)
+    assert c.generate(MSGS) == "b"
+    assert not c.hosts[0]["healthy"]
+    c.close()
+
+
+def test_shared_prefix_sticks_to_one_host_until_it_is_busy() -> None:
+    hits: list[str] = []
+    release = threading.Event()
+
+    def on(host: str) -> Handler:
+        def handler(request: httpx.Request) -> httpx.Response:
+            hits.append(host)
+            if len(hits) == 1 and not release.is_set():
+                release.wait(5)
+            return _reply(host)(request)
+
+        return handler
+
+    hosts = [f"http://h{i}:1" for i in range(4)]
+    c = BalancedOllamaClient(
+        hosts,
+        transport_for=lambda host: httpx.MockTransport(on(host)),
+        probe_interval_s=60,
+        affinity_slack=0,
+    )
+    header: Message = {"role": "system", "content": "long shared header"}
+
+    def ask(q: str) -> str:
+        return c.generate([header, {"role": "user", "content": q}])
+
+    release.set()
+    assert len({ask(q) for q in ("q1", "q2", "q3")}) == 1
+    home = hits[0]
+
+    # With the home host busy (slack 0), the next call goes elsewhere.
+    hits.clear()
+    release.clear()
+    t = threading.Thread(target=ask, args=("slow",))
+    t.start()
+    while not hits:
+        time.sleep(0.001)
+    try:
+        assert ask("q4") != home
+    finally:
+        release.set()
+        t.join()
+    c.close()
+
+
+def test_abandoned_stream_frees_the_slot_without_a_latency_sample() -> None:
+    def streaming(request: httpx.Request) -> httpx.Response:
+        lines = [
+            {"model": "m", "message": {"role": "assistant", "content": piece}, "done": False}
+            for piece in ("a", "b")
+        ]
+        return httpx.Response(200, text="".join(json.dumps(x) + "\n" for x in lines))
+
+    c = _client({"http://a:1": streaming})
+    stream = c.stream(MSGS)
+    assert next(stream) == "a"
+    time.sleep(0.02)
+    stream.close()
+    (host,) = c.hosts
+    assert host["in_flight"] == 0 and host["ewma_latency_s"] == 0.0
+    assert "".join(c.stream(MSGS)) == "ab"
+    assert c.hosts[0]["ewma_latency_s"] > 0.0
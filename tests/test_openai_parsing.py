@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import json
+from collections.abc import Mapping
+
 import httpx
+import pytest
 
 from llm_lab.clients.openai import OpenAIClient
+from llm_lab.clients.openai_client import _SSEParser
+from llm_lab.json_codec import JsonBackend, ResponseBody, Usage, available_backends, get_codec
+from llm_lab.types import Message
 
 
 def test_openai_generate_parses_output_text() -> None:
@@ -25,3 +32,128 @@ def test_openai_generate_parses_output_text() -> None:
     http = httpx.Client(transport=transport)
     c = OpenAIClient(api_key="k", model="m", base_url="https://api.openai.com", _http=http)
     assert c.generate([{"role": "user", "content": "hi"}]) == "hello"
+
+
+def _sse(*events: Mapping[str, object], crlf: bool = False) -> bytes:
+    nl = "\r\n" if crlf else "\n"
+    frames = [f"event: {e['type']}{nl}data: {json.dumps(e)}{nl}{nl}" for e in events]
+    return "".join(frames).encode()
+
+
+def _delta(text: str) -> dict[str, object]:
+    return {"type": "response.output_text.delta", "delta": text}
+
+
+COMPLETED = {"type": "response.completed", "response": {"output": [], "usage": {}}}
+
+
+def _client(body: bytes, ctype: str = "text/event-stream") -> OpenAIClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, headers={"content-type": ctype}, content=body)
+
+    return OpenAIClient(
+        api_key="k", model="m", _http=httpx.Client(transport=httpx.MockTransport(handler))
+    )
+
+
+def test_sse_parser_handles_arbitrary_chunk_boundaries() -> None:
+    raw = _sse(_delta("при"), _delta("вет"), crlf=True) + b": ping\n\ndata: [DONE]"
+    expected = [("response.output_text.delta", json.dumps(_delta(t))) for t in ("при", "вет")]
+    for size in (1, 3, 7, len(raw)):
+        p = _SSEParser()
+        frames = [f for i in range(0, len(raw), size) for f in p.feed(raw[i : i + size])]
+        assert frames == expected
+        assert p.close() == [("", "[DONE]")]  # unterminated last frame is flushed
+
+
+def test_generate_accumulates_streamed_deltas() -> None:
+    c = _client(_sse(_delta(" hel"), _delta("lo "), COMPLETED))
+    assert c.generate([{"role": "user", "content": "hi"}]) == "hello"
+
+
+def test_completed_response_without_deltas_is_used() -> None:
+    full = {
+        "type": "message",
+        "role": "assistant",
+        "content": [{"type": "output_text", "text": "whole"}],
+    }
+    done = {"type": "response.completed", "response": {"output": [full]}}
+    assert _client(_sse(done)).generate([{"role": "user", "content": "hi"}]) == "whole"
+
+
+def test_end_of_stream_validation() -> None:
+    msgs: list[Message] = [{"role": "user", "content": "hi"}]
+    with pytest.raises(ValueError, match="missing 'output'"):
+        _client(_sse({"type": "response.created"})).generate(msgs)
+    with pytest.raises(ValueError, match="empty output_text"):
+        _client(_sse(_delta("  "), COMPLETED)).generate(msgs)
+    with pytest.raises(ValueError, match="empty output_text"):
+        list(_client(_sse(COMPLETED)).stream(msgs))
+
+
+def test_only_event_stream_responses_are_parsed_as_sse() -> None:
+    msgs: list[Message] = [{"role": "user", "content": "hi"}]
+    sse = _sse(_delta("ok"), COMPLETED)
+    assert _client(sse, "Text/Event-Stream; charset=utf-8").generate(msgs) == "ok"
+    page = b"<html><body>502 Bad Gateway</body></html>"
+    for ctype in ("text/html", "text/plain", ""):
+        with pytest.raises(ValueError, match="unexpected content-type|not JSON"):
+            _client(page, ctype).generate(msgs)
+        with pytest.raises(ValueError, match="unexpected content-type|not JSON"):
+            list(_client(page, ctype).stream(msgs))
+    body = json.dumps({"output": [], "usage": {}}).encode()
+    with pytest.raises(ValueError, match="empty output_text"):  # JSON path, not SSE
+        list(_client(body, "application/json").stream(msgs))
+
+
+RESPONSE = {
+    "instructions": "ignored",
+    "output": [
+        {"type": "reasoning", "summary": [{"type": "summary_text", "text": "no"}]},
+        {
+            "type": "message",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": "a"}, {"type": "output_text", "text": "b"}],
+        },
+    ],
+    "usage": {"input_tokens": 10, "output_tokens": 2, "input_tokens_details": {"cached_tokens": 8}},
+}
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_json_backends_decode_the_same_fields(backend: JsonBackend) -> None:
+    codec = get_codec(backend)
+    std = get_codec("json")
+    raw = json.dumps(RESPONSE).encode()
+    body = codec.response(raw)
+    assert body == std.response(raw)
+    assert body.texts == ["a", "b"] and body.usage == Usage(10, 2, 8)
+
+    delta = json.dumps({"type": "response.output_text.delta", "delta": "привет"})
+    assert codec.event(delta).delta == "привет"
+    done = codec.event(json.dumps({"type": "response.completed", "response": RESPONSE}))
+    assert done.response == body
+    # Off-spec shapes (content as a string, non-int tokens) still decode leniently.
+    odd = json.dumps(
+        {"output": [{"type": "message", "content": "x"}], "usage": {"input_tokens": "?"}}
+    )
+    assert codec.response(odd) == ResponseBody([], Usage())
+    assert json.loads(codec.dumps({"k": ["ü", 1]})) == {"k": ["ü", 1]}
+
+
+def test_client_sends_and_reads_through_the_selected_backend() -> None:
+    seen: list[dict[str, object]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(json.loads(request.content))
+        assert request.headers["content-type"] == "application/json"
+        return httpx.Response(200, json=RESPONSE)
+
+    msgs: list[Message] = [{"role": "user", "content": "ü"}]
+    for backend in available_backends():
+        http = httpx.Client(transport=httpx.MockTransport(handler))
+        assert OpenAIClient("k", "m", json_backend=backend, _http=http).generate(msgs) == "ab"
+    assert all(body == {"model": "m", "input": msgs, "stream": True} for body in seen)
+    with pytest.raises(ValueError):
+        get_codec("yaml")  # type: ignore[arg-type]
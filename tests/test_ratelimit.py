@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_lab.factory import LLMFactory
+from llm_lab.ratelimit import RateLimiter, TokenBucket, shared_limiter
+from llm_lab.settings import Settings
+from llm_lab.types import Message
+
+
+def test_bucket_throttles_to_rate() -> None:
+    b = TokenBucket(rate_per_s=50, capacity=1)
+    t0 = time.perf_counter()
+    for _ in range(4):
+        b.acquire()
+    assert time.perf_counter() - t0 >= 0.055  # 3 refills of 20ms
+
+
+def test_bucket_serves_callers_in_arrival_order() -> None:
+    b = TokenBucket(rate_per_s=100, capacity=10)
+    b.acquire(10)
+    order: list[str] = []
+
+    big = threading.Thread(target=lambda: (b.acquire(10), order.append("big")))
+    big.start()
+    time.sleep(0.01)
+    small = threading.Thread(target=lambda: (b.acquire(1), order.append("small")))
+    small.start()
+    big.join()
+    small.join()
+    assert order == ["big", "small"]
+
+
+def test_async_bucket_survives_cancelled_waiter() -> None:
+    async def run() -> float:
+        b = TokenBucket(rate_per_s=100, capacity=1)
+        await b.acquire_async()
+        stuck = asyncio.create_task(b.acquire_async(1))
+        await asyncio.sleep(0)
+        stuck.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await stuck
+        return await asyncio.wait_for(b.acquire_async(1), timeout=1)
+
+    assert asyncio.run(run()) < 1
+
+
+def test_limiter_charges_estimated_tokens() -> None:
+    limiter = RateLimiter(tpm=6000, expected_output_tokens=10)
+    msgs: list[Message] = [{"role": "user", "content": "x" * 40}]
+    assert limiter.cost(msgs) == 10 + 4 + 10
+    limiter.acquire(msgs)
+    assert limiter.tokens is not None and limiter.tokens._tokens == pytest.approx(6000 - 24, abs=1)
+
+
+def test_settings_limits_are_shared_per_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(
+        "RATE_LIMITS", '{"openai": {"rpm": 60}, "openai:gpt-5-mini": {"rpm": 5, "tpm": 1000}}'
+    )
+    s = Settings(openai_api_key="k", openai_model="gpt-5")
+    a = LLMFactory.create("openai", settings=s)
+    b = LLMFactory.create("openai", settings=s)
+    assert a.rate_limiter is not None and a.rate_limiter is b.rate_limiter
+    assert a.rate_limiter.tokens is None
+
+    mini = shared_limiter(s, "openai", "gpt-5-mini")
+    assert mini is not None and mini.tokens is not None
+    assert shared_limiter(s, "ollama", "mistral") is None
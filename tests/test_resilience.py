@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+
+import httpx
+import pytest
+
+from llm_lab.resilience import (
+    AsyncResilientClient,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    ResilientClient,
+    RetryPolicy,
+    retry_after_s,
+)
+from llm_lab.types import Message
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+
+
+def _status_error(code: int, headers: dict[str, str] | None = None) -> httpx.HTTPStatusError:
+    req = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    resp = httpx.Response(code, headers=headers, request=req)
+    return httpx.HTTPStatusError(f"HTTP {code}", request=req, response=resp)
+
+
+class Scripted:
+    """Raises the scripted errors in order, then answers."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate(self, messages: list[Message]) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        yield self.generate(messages)
+
+
+def _client(inner: Scripted, sleeps: list[float], **policy: float) -> ResilientClient:
+    return ResilientClient(
+        inner,
+        RetryPolicy(**policy),  # type: ignore[arg-type]
+        CircuitBreaker(failure_threshold=3),
+        sleep=sleeps.append,
+        rand=lambda: 1.0,
+    )
+
+
+def test_retries_throttling_and_respects_retry_after() -> None:
+    sleeps: list[float] = []
+    c = _client(Scripted(_status_error(429, {"Retry-After": "7"}), _status_error(503)), sleeps)
+    assert c.generate(MSGS) == "ok"
+    assert sleeps == [7.0, 1.0]  # Retry-After wins over 0.5s backoff; then 0.5 * 2
+    assert (c.stats.retries, c.stats.throttled, c.stats.server_errors) == (2, 1, 1)
+    assert c.breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried() -> None:
+    inner = Scripted(_status_error(400))
+    with pytest.raises(httpx.HTTPStatusError):
+        _client(inner, []).generate(MSGS)
+    assert inner.calls == 1
+
+
+def test_breaker_opens_then_half_opens() -> None:
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=10, clock=lambda: now[0])
+    down = httpx.ConnectError("refused")
+    inner = Scripted(down, down, down)
+    c = ResilientClient(inner, RetryPolicy(max_attempts=1), breaker, sleep=lambda s: None)
+
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            c.generate(MSGS)
+    with pytest.raises(CircuitOpenError):
+        c.generate(MSGS)
+    assert inner.calls == 2
+    assert (c.stats.breaker_opens, c.stats.short_circuited, c.stats.transport_errors) == (1, 1, 2)
+
+    now[0] = 11
+    assert breaker.state == "half_open"
+    with pytest.raises(httpx.ConnectError):
+        c.generate(MSGS)  # failed trial re-opens immediately
+    assert breaker.state == "open"
+    now[0] = 22
+    assert c.generate(MSGS) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_deadline_stops_retrying() -> None:
+    c = _client(Scripted(_status_error(429, {"Retry-After": "30"})), [], deadline_s=5)
+    with pytest.raises(DeadlineExceeded):
+        c.generate(MSGS)
+    assert c.stats.deadline_exceeded == 1
+
+
+def test_stream_retries_before_first_chunk() -> None:
+    sleeps: list[float] = []
+    c = _client(Scripted(httpx.ReadTimeout("slow")), sleeps)
+    assert list(c.stream(MSGS)) == ["ok"]
+    assert c.stats.retries == 1
+
+
+def test_retry_after_http_date() -> None:
+    e = _status_error(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert retry_after_s(e) == 0.0
+
+
+def test_async_resilient_client() -> None:
+    class AsyncScripted:
+        def __init__(self) -> None:
+            self.sync = Scripted(_status_error(502))
+
+        async def generate(self, messages: list[Message]) -> str:
+            return self.sync.generate(messages)
+
+    async def no_sleep(s: float) -> None:
+        return None
+
+    c = AsyncResilientClient(AsyncScripted(), sleep=no_sleep)
+    assert asyncio.run(c.generate(MSGS)) == "ok"
+    assert c.stats.retries == 1
+
+
+def _half_open_client(inner: Scripted) -> tuple[ResilientClient, list[float]]:
+    now = [0.0]
+    breaker = CircuitBreaker(1, 10, clock=lambda: now[0])
+    c = ResilientClient(inner, RetryPolicy(max_attempts=1), breaker, sleep=lambda s: None)
+    with pytest.raises(httpx.HTTPStatusError):
+        c.generate(MSGS)  # 503 opens the breaker
+    now[0] = 10.0
+    assert breaker.state == "half_open"
+    return c, now
+
+
+@pytest.mark.parametrize("code", [400, 429])
+def test_half_open_trial_answered_with_4xx_closes_the_breaker(code: int) -> None:
+    c, _ = _half_open_client(Scripted(_status_error(503), _status_error(code)))
+    with pytest.raises(httpx.HTTPStatusError):
+        c.generate(MSGS)
+    assert c.breaker.state == "closed"
+    assert c.generate(MSGS) == "ok"
+
+
+def test_half_open_trial_without_verdict_frees_the_trial() -> None:
+    c, _ = _half_open_client(Scripted(_status_error(503), ValueError("bad body")))
+    with pytest.raises(ValueError):
+        c.generate(MSGS)  # a local error says nothing about the upstream
+    assert c.breaker.state == "half_open"
+
+    stream = c.stream(MSGS)
+    assert next(stream) == "ok"
+    stream.close()  # abandoned stream: still no verdict, the next call may try
+    assert c.breaker.state == "half_open"
+    assert c.generate(MSGS) == "ok" and c.breaker.state == "closed"
+
+
+def test_async_abandoned_stream_frees_the_trial() -> None:
+    class AsyncScripted:
+        async def generate(self, messages: list[Message]) -> str:
+            return "ok"
+
+        async def stream(self, messages: list[Message]) -> AsyncIterator[str]:
+            yield "a"
+            yield "b"
+
+    now = [0.0]
+    breaker = CircuitBreaker(1, 10, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 10.0
+    c = AsyncResilientClient(AsyncScripted(), RetryPolicy(max_attempts=1), breaker)
+
+    async def run() -> None:
+        stream = c.stream(MSGS)
+        assert await anext(stream) == "a"
+        await stream.aclose()
+        assert breaker.allow()  # the trial slot was released
+
+    asyncio.run(run())
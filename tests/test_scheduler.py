@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from llm_lab.scheduler import (
+    Priority,
+    RequestDropped,
+    ScheduledClient,
+    Scheduler,
+    scheduling,
+)
+from llm_lab.types import Message
+
+
+def test_priority_first_then_weighted_fair_share_between_tenants() -> None:
+    sched = Scheduler(1, tenant_weights={"a": 3.0})
+    order: list[str] = []
+
+    async def call(name: str, tenant: str, priority: Priority = "normal") -> None:
+        async with sched.aslot(tenant=tenant, priority=priority):
+            order.append(name)
+
+    async def run() -> None:
+        with sched.slot(tenant="holder"):
+            tasks = [asyncio.create_task(call(f"b{i}", "b", "batch")) for i in range(2)]
+            tasks += [asyncio.create_task(call(f"a{i}", "a")) for i in range(4)]
+            tasks += [asyncio.create_task(call(f"n{i}", "n")) for i in range(4)]
+            tasks.append(asyncio.create_task(call("urgent", "n", "interactive")))
+            await asyncio.sleep(0)  # every task is queued before the slot frees up
+            assert sched.stats.classes["normal"].queued == 8
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    # Weight 3 gives tenant a three calls for each of n's; batch waits for the rest.
+    assert order == ["urgent", "a0", "n0", "a1", "a2", "a3", "n1", "n2", "n3", "b0", "b1"]
+    stats = sched.stats
+    assert stats.in_flight == 0 and stats.classes["normal"].max_queued == 8
+    assert stats.classes["normal"].dispatched == 9  # with the holder
+
+
+def test_drops_calls_that_cannot_meet_their_deadline() -> None:
+    now = [0.0]
+    sched = Scheduler(1, clock=lambda: now[0])
+    with sched.slot(priority="batch"):
+        now[0] += 5.0  # recent batch service time: 5s
+
+    async def call(deadline_s: float) -> str:
+        async with sched.aslot(priority="batch", deadline_s=deadline_s):
+            return "ran"
+
+    async def run() -> list[str | BaseException]:
+        with sched.slot(priority="batch"):
+            tasks = [asyncio.create_task(call(d)) for d in (2.0, 10.0)]
+            await asyncio.sleep(0)
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    short, long = asyncio.run(run())
+    assert isinstance(short, RequestDropped) and long == "ran"
+    batch = sched.stats.classes["batch"]
+    assert (batch.dispatched, batch.dropped, batch.queued) == (3, 1, 0)
+    text = sched.stats.prometheus_text()
+    assert 'llm_lab_scheduler_dropped_total{priority="batch"} 1' in text
+    assert 'llm_lab_scheduler_wait_seconds_count{priority="batch"} 3' in text
+
+
+def test_a_call_still_queued_at_its_deadline_is_dropped() -> None:
+    sched = Scheduler(1, deadlines_s={"normal": 0.05})
+    with sched.slot(deadline_s=60.0), pytest.raises(RequestDropped), sched.slot():
+        pass
+    # The dropped waiter does not hold the slot; with it free, the ~0.05s service
+    # estimate left by the holder does not drop a call that queues behind nobody.
+    with sched.slot() as waited:
+        assert waited == pytest.approx(0.0, abs=0.05)
+    assert sched.stats.classes["normal"].dropped == 1
+    with pytest.raises(ValueError):
+        Scheduler(deadlines_s={"urgent": 1.0})
+
+
+def test_a_slow_call_does_not_shut_its_class_out() -> None:
+    now = [0.0]
+    sched = Scheduler(2, clock=lambda: now[0], deadlines_s={"interactive": 2.0})
+    with sched.slot(priority="interactive"):
+        now[0] += 3.0  # slower than the class deadline
+    for _ in range(5):  # free slots, empty queue: every call runs
+        with sched.slot(priority="interactive"):
+            now[0] += 0.5
+    interactive = sched.stats.classes["interactive"]
+    assert (interactive.dispatched, interactive.dropped) == (6, 0)
+
+    async def queued() -> None:
+        async with sched.aslot(priority="interactive"):
+            pass
+
+    async def run() -> list[BaseException | None]:
+        with sched.slot(priority="interactive"), sched.slot(priority="interactive"):
+            tasks = [asyncio.create_task(queued()) for _ in range(2)]
+            await asyncio.sleep(0)
+            now[0] += 1.9  # the waiters cannot fit a >0.1s call before their deadline
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Calls that did wait are still dropped when the estimate says they cannot make it.
+    assert all(isinstance(r, RequestDropped) for r in asyncio.run(run()))
+
+
+class Echo:
+    model = "echo"
+
+    def generate(self, messages: list[Message]) -> str:
+        return messages[-1]["content"]
+
+
+def test_scheduled_client_takes_per_call_options_from_context() -> None:
+    sched = Scheduler(2)
+    client = ScheduledClient(Echo(), sched, tenant="svc", priority="batch")
+    msgs: list[Message] = [{"role": "user", "content": "hi"}]
+    assert client.generate(msgs) == "hi"
+    with scheduling(priority="interactive"):
+        assert "".join(client.stream(msgs)) == "hi"
+    classes = sched.stats.classes
+    assert classes["batch"].dispatched == 1 and classes["interactive"].dispatched == 1
+    assert client.model == "echo"
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from llm_lab import settings
+
+# Cumulative `python -X importtime` budget for `import llm_lab.cli`, in ms. Today it is
+# ~30ms; importing httpx, pydantic-settings or ollama eagerly would blow well past it.
+IMPORT_BUDGET_MS = float(os.environ.get("LLM_LAB_IMPORT_BUDGET_MS", "120"))
+
+
+def _run(code: str, *args: str, **env: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, **env},
+    )
+
+
+def _loaded_after(code: str) -> set[str]:
+    out = _run(code + "\nimport sys; print('\\n'.join(sys.modules))").stdout
+    return set(out.split())
+
+
+def test_cli_import_defers_heavy_modules() -> None:
+    loaded = _loaded_after("import llm_lab.cli")
+    for heavy in ("httpx", "ollama", "pydantic_settings", "llm_lab.clients.openai_client"):
+        assert heavy not in loaded
+
+
+def test_factory_imports_only_the_selected_provider() -> None:
+    openai = _loaded_after(
+        "from llm_lab.factory import LLMFactory\n"
+        "from llm_lab.settings import Settings\n"
+        "LLMFactory.create('openai', settings=Settings(openai_api_key='k'))"
+    )
+    assert "llm_lab.clients.openai_client" in openai and "ollama" not in openai
+
+    ollama = _loaded_after(
+        "from llm_lab.factory import LLMFactory\nLLMFactory.create('ollama')",
+    )
+    assert "ollama" in ollama and "llm_lab.clients.openai_client" not in ollama
+
+
+def test_cli_import_time_budget() -> None:
+    best = float("inf")
+    for _ in range(3):
+        err = _run("import llm_lab.cli", "-X", "importtime").stderr
+        m = re.search(r"\|\s*(\d+)\s*\|\s*llm_lab\.cli$", err, re.MULTILINE)
+        assert m, err[-500:]
+        best = min(best, int(m.group(1)) / 1000)
+    assert best < IMPORT_BUDGET_MS, f"import llm_lab.cli took {best:.1f}ms"
+
+
+def test_ollama_host_env_skips_wsl_detection(monkeypatch: pytest.MonkeyPatch) -> None:
+    def boom() -> bool:
+        raise AssertionError("WSL detection should not run")
+
+    monkeypatch.setattr(settings, "_is_wsl", boom)
+    monkeypatch.setenv("OLLAMA_HOST", "10.0.0.5:11434/")
+    assert settings.default_ollama_host() == "http://10.0.0.5:11434"
+    assert settings.Settings().ollama_host == "http://10.0.0.5:11434"
+
+
+def test_wsl_gateway_cached_per_boot(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    boot_id = tmp_path / "boot_id"
+    boot_id.write_text("boot-1\n")
+    monkeypatch.setattr(settings, "_BOOT_ID", boot_id)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    calls: list[int] = []
+
+    def detect() -> str:
+        calls.append(1)
+        return f"172.20.0.{len(calls)}"
+
+    monkeypatch.setattr(settings, "_wsl_default_gateway", detect)
+
+    assert settings._cached_wsl_gateway() == "172.20.0.1"
+    assert settings._cached_wsl_gateway() == "172.20.0.1"
+    assert len(calls) == 1
+
+    boot_id.write_text("boot-2\n")  # WSL restarted: the gateway may have moved
+    assert settings._cached_wsl_gateway() == "172.20.0.2"
+    assert len(calls) == 2
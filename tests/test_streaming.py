@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+
+import httpx
+import pytest
+
+from llm_lab import cli
+from llm_lab.clients.ollama import AsyncOllamaClient, OllamaClient
+from llm_lab.clients.openai import AsyncOpenAIClient, OpenAIClient
+from llm_lab.types import Message
+
+SSE = (
+    "event: response.created\n"
+    'data: {"type":"response.created","response":{}}\n'
+    "\n"
+    "event: response.output_text.delta\n"
+    'data: {"type":"response.output_text.delta","delta":"Hel"}\n'
+    "\n"
+    ": keep-alive comment\n"
+    "event: response.output_text.delta\n"
+    'data: {"type":"response.output_text.delta","delta":"lo"}\n'
+    "\n"
+    "event: response.completed\n"
+    'data: {"type":"response.completed","response":{}}\n'
+    "\n"
+)
+
+NDJSON = "".join(
+    json.dumps({"model": "m", "message": {"role": "assistant", "content": t}, "done": d}) + "\n"
+    for t, d in [("x", False), ("y", False), ("", True)]
+)
+
+
+def _openai(request: httpx.Request) -> httpx.Response:
+    assert json.loads(request.content)["stream"] is True
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, text=SSE)
+
+
+def _ollama(request: httpx.Request) -> httpx.Response:
+    assert json.loads(request.content)["stream"] is True
+    return httpx.Response(200, headers={"content-type": "application/x-ndjson"}, text=NDJSON)
+
+
+MSGS: list[Message] = [{"role": "user", "content": "hi"}]
+
+
+def test_openai_stream_yields_deltas() -> None:
+    c = OpenAIClient(
+        api_key="k", model="m", _http=httpx.Client(transport=httpx.MockTransport(_openai))
+    )
+    assert list(c.stream(MSGS)) == ["Hel", "lo"]
+
+
+def test_openai_stream_error_event() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = 'event: error\ndata: {"type":"error","message":"boom"}\n\n'
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    c = OpenAIClient(
+        api_key="k", model="m", _http=httpx.Client(transport=httpx.MockTransport(handler))
+    )
+    with pytest.raises(ValueError, match="stream error"):
+        list(c.stream(MSGS))
+
+
+def test_openai_stream_http_error_body_is_readable() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, json={"error": "slow down"})
+
+    c = OpenAIClient(
+        api_key="k", model="m", _http=httpx.Client(transport=httpx.MockTransport(handler))
+    )
+    with pytest.raises(httpx.HTTPStatusError) as ei:
+        list(c.stream(MSGS))
+    assert "slow down" in ei.value.response.text
+
+
+def test_async_openai_stream() -> None:
+    async def run() -> list[str]:
+        http = httpx.AsyncClient(transport=httpx.MockTransport(_openai))
+        c = AsyncOpenAIClient(api_key="k", model="m", _http=http)
+        return [p async for p in c.stream(MSGS)]
+
+    assert asyncio.run(run()) == ["Hel", "lo"]
+
+
+def test_ollama_stream() -> None:
+    c = OllamaClient(host="http://example:11434", transport=httpx.MockTransport(_ollama))
+    assert list(c.stream(MSGS)) == ["x", "y"]
+
+
+def test_async_ollama_stream() -> None:
+    async def run() -> list[str]:
+        c = AsyncOllamaClient(host="http://example:11434", transport=httpx.MockTransport(_ollama))
+        return [p async for p in c.stream(MSGS)]
+
+    assert asyncio.run(run()) == ["x", "y"]
+
+
+def test_cli_stream_flag(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    c = OllamaClient(host="http://example:11434", transport=httpx.MockTransport(_ollama))
+    monkeypatch.setattr(cli.LLMFactory, "create", lambda *a, **kw: c)
+    monkeypatch.setattr(
+        sys, "argv", ["llm-lab", "--provider", "ollama", "--stream", "--prompt", "hi"]
+    )
+    cli.main()
+    assert capsys.readouterr().out == "xy\n"
@@ -15,3 +15,12 @@ reveal_type(olm)  # N: Revealed type is "llm_lab.clients.ollama_client.OllamaCli
 provider: Literal["openai", "ollama"] = "openai"
 any_client = LLMFactory.create(provider)
 reveal_type(any_client)  # N: Revealed type is "OpenAIClient | OllamaClient"
+
+aoai = LLMFactory.create_async("openai")
+reveal_type(aoai)  # N: Revealed type is "llm_lab.clients.openai_client.AsyncOpenAIClient"
+
+aolm = LLMFactory.create_async("ollama")
+reveal_type(aolm)  # N: Revealed type is "llm_lab.clients.ollama_client.AsyncOllamaClient"
+
+any_async = LLMFactory.create_async(provider)
+reveal_type(any_async)  # N: Revealed type is "AsyncOpenAIClient | AsyncOllamaClient"
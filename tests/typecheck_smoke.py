@@ -19,3 +19,9 @@ if TYPE_CHECKING:
     p2: Literal["openai", "ollama"] = "openai"
     c4 = LLMFactory.create(p2)
     reveal_type(c4)  # OpenAIClient | OllamaClient
+
+    a1 = LLMFactory.create_async("ollama")
+    reveal_type(a1)  # AsyncOllamaClient
+
+    a2 = LLMFactory.create_async(p2)
+    reveal_type(a2)  # AsyncOpenAIClient | AsyncOllamaClient